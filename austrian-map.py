@@ -6,6 +6,10 @@ import json
 import os
 from dotenv import load_dotenv
 
+from geometry_cache import load_simplified_geojson
+from static_assets import write_figure_html
+from state_polygons import STATE_PROPERTY, assign_towns
+
 # Load environment variables from .env
 load_dotenv()
 
@@ -20,19 +24,8 @@ GEODATA_DATABASE = "geodata"
 # GeoJSON file path
 GEOJSON_PATH = "geo_data/austria_federal_states.geojson"
 OUTPUT_HTML_PATH = "austrian-map.html"
-
-# Mapping from full federal state names (from GeoJSON) to abbreviations (from DB)
-state_abbreviations = {
-    'Burgenland': 'B',
-    'Kärnten': 'K',
-    'Niederösterreich': 'NÖ',
-    'Oberösterreich': 'OÖ',
-    'Salzburg': 'S',
-    'Steiermark': 'ST',
-    'Tirol': 'T',
-    'Vorarlberg': 'V',
-    'Wien': 'W'
-}
+# Zoom level whose simplified polygons are embedded in the map (see geometry_cache.py)
+MAP_GEOMETRY_ZOOM = 7
 
 def create_austrian_map():
     # 1. Database connection
@@ -43,18 +36,16 @@ def create_austrian_map():
         print(f"Error connecting to database: {e}")
         return
 
-    # 2. Fetch town data (for choropleth)
+    # 2. Fetch town coordinates (for choropleth)
     try:
-        with engine.connect() as connection:!!
+        with engine.connect() as connection:
             query = """
-            SELECT state, COUNT(town) as town_count
+            SELECT town, longitude, latitude
             FROM all_towns
             WHERE country = 'AT'
-            GROUP BY state
             """
-            df_town_counts = pd.read_sql(text(query), connection)
+            df_all_towns = pd.read_sql(text(query), connection)
         print("✓ Austrian town data for choropleth fetched successfully.")
-        print(df_town_counts)
     except Exception as e:
         print(f"Error fetching choropleth town data: {e}")
         return
@@ -75,11 +66,10 @@ def create_austrian_map():
         return
 
 
-    # 3. Load GeoJSON
+    # 3. Load GeoJSON (simplified and cached per source file hash)
     try:
-        with open(GEOJSON_PATH, 'r', encoding='utf-8') as f:
-            geojson_data = json.load(f)
-        print(f"✓ GeoJSON data loaded from {GEOJSON_PATH}.")
+        geojson_data = load_simplified_geojson(GEOJSON_PATH, zoom=MAP_GEOMETRY_ZOOM)
+        print(f"✓ Simplified GeoJSON data (zoom {MAP_GEOMETRY_ZOOM}) loaded for {GEOJSON_PATH}.")
     except FileNotFoundError:
         print(f"Error: GeoJSON file not found at {GEOJSON_PATH}. Please ensure it exists.")
         return
@@ -87,18 +77,13 @@ def create_austrian_map():
         print(f"Error: Could not decode GeoJSON file at {GEOJSON_PATH}. Check file validity.")
         return
 
-    # 4. Process GeoJSON to add abbreviations and prepare for plotting
-    for feature in geojson_data['features']:
-        full_state_name = feature['properties'].get('BL') # 'BL' is the federal state name
-        if full_state_name and full_state_name in state_abbreviations:
-            feature['properties']['state_abbr'] = state_abbreviations[full_state_name]
-        else:
-            # Handle cases where state name might not be found or mapped
-            feature['properties']['state_abbr'] = None
-            print(f"Warning: Could not map federal state '{full_state_name}' to an abbreviation.")
-
-    # Remove features that couldn't be mapped (optional, but good for clean data)
-    geojson_data['features'] = [f for f in geojson_data['features'] if f['properties']['state_abbr']]
+    # 4. Count towns per federal state by point-in-polygon on their coordinates
+    df_all_towns = assign_towns(df_all_towns, path=GEOJSON_PATH, column='state')
+    df_town_counts = df_all_towns.dropna(subset=['state']).groupby('state').size().reset_index(name='town_count')
+    print(df_town_counts)
+    outside = df_all_towns['state'].isna().sum()
+    if outside:
+        print(f"Warning: {outside} towns lie outside all federal state polygons.")
 
     # 5. Create Plotly Choropleth Map
     fig = px.choropleth_mapbox(
@@ -106,7 +91,7 @@ def create_austrian_map():
         geojson=geojson_data,
         locations="state",  # Column in df_town_counts that matches the GeoJSON featureidkey
         color="town_count",  # Data to color the map regions
-        featureidkey="properties.state_abbr",  # Path to the ID in GeoJSON features
+        featureidkey=f"properties.{STATE_PROPERTY}",  # Path to the ID in GeoJSON features
         color_continuous_scale="Viridis",
         mapbox_style="open-street-map",
         zoom=50,
@@ -175,7 +160,7 @@ def create_austrian_map():
     fig.show() # Commented out as per instruction
 
     # 6. Save the map as an HTML file with the injected JavaScript
-    fig.write_html(OUTPUT_HTML_PATH, post_script=js_code, full_html=True)
+    write_figure_html(fig, OUTPUT_HTML_PATH, post_script=js_code, full_html=True)
     print(f"✓ Map saved to {OUTPUT_HTML_PATH} with click handler.")
     
 
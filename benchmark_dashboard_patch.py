@@ -0,0 +1,84 @@
+"""Compares full-figure responses with dash.Patch updates for the dashboard gauges.
+
+Measures the JSON payload a callback sends for the four gauges and the wind rose
+and the server-side time to produce it: building the figures, serving them from
+the figure cache, and building the partial updates. Runs on synthetic rows, so
+no database is needed.
+"""
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+
+from dashboard_figures import DEFAULT_THEME, FIGURE_NAMES, town_figure_patches, town_figures_json
+from figure_cache import FigureCache
+
+TOWNS = 50
+ROUNDS = 5
+
+
+def synthetic_rows(towns=TOWNS, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'town': [f"Ort {i}" for i in range(towns)],
+        'recorded_at': "2025-01-01 12:00:00",
+        'temperature_2m': rng.uniform(-10, 30, towns),
+        'relative_humidity_2m': rng.uniform(20, 100, towns),
+        'pressure_msl': rng.uniform(995, 1035, towns),
+        'cloud_cover': rng.uniform(0, 100, towns),
+        'wind_speed_10m': rng.uniform(0, 20, towns),
+        'wind_gusts_10m': rng.uniform(0, 30, towns),
+        'wind_direction_10m': rng.uniform(0, 360, towns),
+    })
+
+
+def payload_bytes(outputs):
+    """Size of the callback response body for these outputs, as Dash serializes it."""
+    return len(json.dumps(outputs, cls=PlotlyJSONEncoder).encode('utf-8'))
+
+
+def full_outputs(city_data, cache=None):
+    if cache is None:
+        serialized = town_figures_json(city_data, DEFAULT_THEME)
+    else:
+        key = (city_data['town'], city_data['recorded_at'], DEFAULT_THEME)
+        serialized = cache.get_or_build(key, lambda: town_figures_json(city_data, DEFAULT_THEME))
+    figures = json.loads(serialized)
+    return [figures[name] for name in FIGURE_NAMES]
+
+
+def patch_outputs(city_data):
+    patches = town_figure_patches(city_data)
+    return [patches[name].to_plotly_json() for name in FIGURE_NAMES]
+
+
+def timed(label, rows, produce):
+    """Runs produce(row) for every row ROUNDS times; returns per-call ms and the mean payload size."""
+    sizes = []
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for _, city_data in rows.iterrows():
+            sizes.append(payload_bytes(produce(city_data)))
+    elapsed = (time.perf_counter() - start) * 1000 / (ROUNDS * len(rows))
+    size = sum(sizes) / len(sizes)
+    print(f"  {label:<22} {elapsed:8.2f} ms/callback {size:10.0f} bytes")
+    return elapsed, size
+
+
+if __name__ == "__main__":
+    rows = synthetic_rows()
+    cache = FigureCache(max_entries=len(rows))
+    print(f"{len(rows)} towns x {ROUNDS} rounds, {len(FIGURE_NAMES)} figures per response")
+
+    full_ms, full_size = timed("full (build)", rows, full_outputs)
+    for _, city_data in rows.iterrows():
+        full_outputs(city_data, cache)
+    cached_ms, _ = timed("full (figure cache)", rows, lambda city_data: full_outputs(city_data, cache))
+    patch_ms, patch_size = timed("dash.Patch", rows, patch_outputs)
+
+    print(f"✓ Patch payload is {full_size / patch_size:.1f}x smaller "
+          f"({full_size - patch_size:.0f} bytes less per update)")
+    print(f"✓ Patch callback is {full_ms / patch_ms:.1f}x faster than building, "
+          f"{cached_ms / patch_ms:.1f}x faster than the figure cache")
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
 import os
 from dotenv import load_dotenv
 
@@ -11,125 +11,112 @@ MYSQL_HOST = os.getenv("MYSQL_HOST")
 MYSQL_PORT = int(os.getenv("MYSQL_PORT"))
 GEODATA_DATABASE = "geodata"
 
+# all_towns is rebuilt into a shadow table and swapped in with one RENAME,
+# so readers never see a missing or half-filled table
+TABLE_NAME = "all_towns"
+SHADOW_TABLE = "all_towns_new"
+OLD_TABLE = "all_towns_old"
+
 # Create SQLAlchemy engine for the geodata database
 engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{GEODATA_DATABASE}")
 
-print(f"Connecting to {GEODATA_DATABASE} database on beker.club...")
+# The unique key's (country, state) prefix also serves per-state lookups
+create_table_sql = f"""
+CREATE TABLE {SHADOW_TABLE} (
+    ID INT AUTO_INCREMENT PRIMARY KEY,
+    town VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+    state VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+    longitude FLOAT,
+    latitude FLOAT,
+    inhabitants INT,
+    country VARCHAR(50) NOT NULL,
+    location POINT NOT NULL SRID 4326,
+    UNIQUE KEY uq_country_state_town (country, state, town),
+    KEY idx_town (town),
+    SPATIAL KEY idx_location (location)
+) DEFAULT CHARSET=utf8mb4
+"""
+
+# One set-based statement: union of the source tables, state names mapped to
+# abbreviations through state_codes, existing IDs carried over by natural key.
+# Rows with known IDs go first so new AUTO_INCREMENT values never collide.
+insert_sql = f"""
+INSERT INTO {SHADOW_TABLE} (ID, town, state, longitude, latitude, inhabitants, country, location)
+SELECT
+    old.ID,
+    src.town,
+    COALESCE(sc.abbreviation, src.state) AS state,
+    src.longitude,
+    src.latitude,
+    src.inhabitants,
+    src.country,
+    -- SRID 4326 is latitude-first in MySQL 8: ST_SRID() only tags the point, so X must be the latitude
+    ST_SRID(POINT(src.latitude, src.longitude), 4326)
+FROM (
+    SELECT town, federal_state AS state, longitude, latitude, inhabitants, 'AT' AS country FROM austrian_towns_new
+    UNION ALL
+    SELECT town, canton AS state, longitude, latitude, inhabitants, 'CH' AS country FROM swiss_towns_new
+    UNION ALL
+    SELECT town, federal_state AS state, longitude, latitude, inhabitants, 'DE' AS country FROM german_towns_new
+) AS src
+LEFT JOIN state_codes sc
+    ON sc.country = src.country
+   AND src.state IN (sc.name, sc.name_en, sc.abbreviation)
+LEFT JOIN (
+    SELECT MIN(ID) AS ID, country, state, town FROM {TABLE_NAME} GROUP BY country, state, town
+) AS old
+    ON old.country = src.country
+   AND old.state = COALESCE(sc.abbreviation, src.state)
+   AND old.town = src.town
+WHERE src.longitude IS NOT NULL AND src.latitude IS NOT NULL
+ORDER BY old.ID IS NULL, old.ID
+"""
+
+print(f"Connecting to {GEODATA_DATABASE} database on {MYSQL_HOST}...")
 
 try:
     with engine.connect() as connection:
-        # Drop the all_towns table if it exists
-        connection.execute(text("DROP TABLE IF EXISTS all_towns"))
-        connection.commit()
-        print("✓ Table 'all_towns' deleted if it existed.")
-
-        # Create the all_towns table
-        create_table_sql = """
-        CREATE TABLE all_towns (
-            ID INT AUTO_INCREMENT PRIMARY KEY,
-            town VARCHAR(255),
-            state VARCHAR(255),
-            longitude FLOAT,
-            latitude FLOAT,
-            inhabitants INT,
-            country VARCHAR(50)
-        )
-        """
+        # Leftovers of an interrupted build
+        connection.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}, {OLD_TABLE}"))
         connection.execute(text(create_table_sql))
+        print(f"✓ Shadow table '{SHADOW_TABLE}' created.")
+
+        # First build: an empty all_towns with the same layout keeps the ID join and the swap uniform
+        if not inspect(connection).has_table(TABLE_NAME):
+            connection.execute(text(f"CREATE TABLE {TABLE_NAME} LIKE {SHADOW_TABLE}"))
+
+        result = connection.execute(text(insert_sql))
         connection.commit()
-        print("✓ Table 'all_towns' created successfully.")
-
-        # Insert data from austrian_towns_new
-        insert_austrian_sql = """
-        INSERT INTO all_towns (town, state, longitude, latitude, inhabitants, country)
-        SELECT 
-            town,
-            CASE
-                WHEN federal_state = 'Burgenland' THEN 'B'
-                WHEN federal_state = 'Kärnten' THEN 'K'
-                WHEN federal_state = 'Niederösterreich' THEN 'NÖ'
-                WHEN federal_state = 'Oberösterreich' THEN 'OÖ'
-                WHEN federal_state = 'Salzburg' THEN 'S'
-                WHEN federal_state = 'Steiermark' THEN 'ST'
-                WHEN federal_state = 'Tirol' THEN 'T'
-                WHEN federal_state = 'Vorarlberg' THEN 'V'
-                WHEN federal_state = 'Wien' THEN 'W'
-                ELSE federal_state
-            END AS state,
-            longitude,
-            latitude,
-            inhabitants,
-            'AT' AS country
-        FROM 
-            austrian_towns_new;
-        """
-        connection.execute(text(insert_austrian_sql))
-        connection.commit()
-        print("✓ Data from 'austrian_towns_new' inserted into 'all_towns'.")
-
-        # Insert data from swiss_towns
-        insert_swiss_sql = """
-                INSERT INTO all_towns (town, state, longitude, latitude, inhabitants, country)
-                SELECT
-                    town,
-                    canton AS state,
-                    longitude,
-                    latitude,
-                    inhabitants,
-                    'CH' AS country
-                FROM
-                    swiss_towns_new;        """
-        connection.execute(text(insert_swiss_sql))
-        connection.commit()
-        print("✓ Data from 'swiss_towns' inserted into 'all_towns'.")
-
-        # Insert data from german_towns_new
-        insert_german_sql = """
-        INSERT INTO all_towns (town, state, longitude, latitude, inhabitants, country)
-        SELECT 
-            town,
-            CASE
-                WHEN federal_state = 'Baden-Württemberg' THEN 'BW'
-                WHEN federal_state = 'Bavaria' THEN 'BY'
-                WHEN federal_state = 'Berlin' THEN 'BE'
-                WHEN federal_state = 'Brandenburg' THEN 'BB'
-                WHEN federal_state = 'Bremen' THEN 'HB'
-                WHEN federal_state = 'Hamburg' THEN 'HH'
-                WHEN federal_state = 'Hesse' THEN 'HE'
-                WHEN federal_state = 'Mecklenburg-Vorpommern' THEN 'MV'
-                WHEN federal_state = 'Lower Saxony' THEN 'NI'
-                WHEN federal_state = 'North Rhine-Westphalia' THEN 'NW'
-                WHEN federal_state = 'Rhineland-Palatinate' THEN 'RP'
-                WHEN federal_state = 'Saarland' THEN 'SL'
-                WHEN federal_state = 'Saxony' THEN 'SN'
-                WHEN federal_state = 'Saxony-Anhalt' THEN 'ST'
-                WHEN federal_state = 'Schleswig-Holstein' THEN 'SH'
-                WHEN federal_state = 'Thuringia' THEN 'TH'
-                ELSE federal_state
-            END AS state,
-            longitude,
-            latitude,
-            inhabitants,
-            'DE' AS country
-        FROM 
-            german_towns_new;
-        """
-        connection.execute(text(insert_german_sql))
+        print(f"✓ {result.rowcount} towns inserted into '{SHADOW_TABLE}'.")
+
+        unmapped = connection.execute(text(f"""
+            SELECT s.country, s.state, COUNT(*) AS towns
+            FROM {SHADOW_TABLE} s
+            LEFT JOIN state_codes sc ON sc.country = s.country AND sc.abbreviation = s.state
+            WHERE sc.abbreviation IS NULL
+            GROUP BY s.country, s.state
+        """)).fetchall()
+        for row in unmapped:
+            print(f"  Warning: state '{row.state}' ({row.country}, {row.towns} towns) is not in state_codes")
+
+        # Atomic swap, then drop the previous generation
+        connection.execute(text(f"RENAME TABLE {TABLE_NAME} TO {OLD_TABLE}, {SHADOW_TABLE} TO {TABLE_NAME}"))
+        connection.execute(text(f"DROP TABLE {OLD_TABLE}"))
         connection.commit()
-        print("✓ Data from 'german_towns_new' inserted into 'all_towns'.")
+        print(f"✓ '{SHADOW_TABLE}' swapped in as '{TABLE_NAME}'.")
 
         # Verify insertion and content
-        print("\nSample data from 'all_towns' (first 10 rows):")
-        result = connection.execute(text("SELECT * FROM all_towns LIMIT 10"))
-        
+        print(f"\nSample data from '{TABLE_NAME}' (first 10 rows):")
+        result = connection.execute(text(f"SELECT ID, town, state, longitude, latitude, inhabitants, country FROM {TABLE_NAME} LIMIT 10"))
+
         # Fetch column names
         column_names = result.keys()
         print(column_names)
-        
+
         for row in result:
             print(row)
-        
-        print(f"\nTotal rows in 'all_towns': {connection.execute(text('SELECT COUNT(*) FROM all_towns')).scalar()}")
+
+        print(f"\nTotal rows in '{TABLE_NAME}': {connection.execute(text(f'SELECT COUNT(*) FROM {TABLE_NAME}')).scalar()}")
 
 except Exception as e:
     print(f"✗ Error: {e}")
@@ -0,0 +1,59 @@
+from sqlalchemy import create_engine, text
+import os
+from dotenv import load_dotenv
+
+load_dotenv() # Load environment variables from .env
+
+# Import state/canton codes
+from state_codes import STATE_CODES
+
+# MySQL connection settings
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT"))
+GEODATA_DATABASE = "geodata"
+
+# Create SQLAlchemy engine for the geodata database
+engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{GEODATA_DATABASE}")
+
+print(f"Connecting to {GEODATA_DATABASE} database on {MYSQL_HOST}...")
+
+try:
+    with engine.connect() as connection:
+        # Create the state_codes dimension table (kept across runs)
+        create_table_sql = """
+        CREATE TABLE IF NOT EXISTS state_codes (
+            country CHAR(2) NOT NULL,
+            abbreviation VARCHAR(8) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+            name VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+            name_en VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+            PRIMARY KEY (country, abbreviation)
+        ) DEFAULT CHARSET=utf8mb4
+        """
+        connection.execute(text(create_table_sql))
+        connection.commit()
+        print("✓ Table 'state_codes' created if it did not exist.")
+
+        # Upsert all codes in one batch so re-runs are idempotent
+        print("Inserting state codes...")
+        upsert_sql = text("""
+            INSERT INTO state_codes (country, abbreviation, name, name_en)
+            VALUES (:country, :abbreviation, :name, :name_en)
+            ON DUPLICATE KEY UPDATE name = VALUES(name), name_en = VALUES(name_en)
+        """)
+        connection.execute(upsert_sql, [
+            {"country": country, "abbreviation": abbreviation, "name": name, "name_en": name_en}
+            for country, abbreviation, name, name_en in STATE_CODES
+        ])
+        connection.commit()
+        print(f"✓ Successfully upserted {len(STATE_CODES)} state codes.")
+
+        # Verify insertion
+        result = connection.execute(text("SELECT country, COUNT(*) AS states FROM state_codes GROUP BY country"))
+        print("\nStates per country in 'state_codes':")
+        for row in result:
+            print(f"  {row.country}: {row.states}")
+
+except Exception as e:
+    print(f"✗ Error: {e}")
@@ -0,0 +1,73 @@
+from sqlalchemy import create_engine, text
+import os
+from dotenv import load_dotenv
+
+load_dotenv() # Load environment variables from .env
+
+# MySQL connection settings
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT"))
+MYSQL_DATABASE = "OpenMeteo"
+TABLE_NAME = "weather_records"
+
+# Create SQLAlchemy engine for the OpenMeteo database
+engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}")
+
+# to_sql() creates TEXT columns, which MySQL can't index without a prefix length.
+# recorded_at is an ISO timestamp string, so string order is time order.
+COLUMN_TYPES = {
+    'town': "VARCHAR(255)",
+    'recorded_at': "VARCHAR(32)",
+}
+
+# Index name -> columns
+INDEXES = {
+    # Time range of one town for the dashboard's history panel
+    'idx_town_recorded_at': ['town', 'recorded_at'],
+    # Snapshot of all towns at one ingest for the dashboard's time slider
+    'idx_recorded_at': ['recorded_at'],
+}
+
+
+def column_types(connection):
+    result = connection.execute(text("""
+        SELECT COLUMN_NAME, COLUMN_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table
+    """), {'schema': MYSQL_DATABASE, 'table': TABLE_NAME})
+    return {name: column_type.lower() for name, column_type in result}
+
+
+def existing_indexes(connection):
+    result = connection.execute(text("""
+        SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table
+    """), {'schema': MYSQL_DATABASE, 'table': TABLE_NAME})
+    return {row[0] for row in result}
+
+
+print(f"Indexing {MYSQL_DATABASE}.{TABLE_NAME}...")
+
+try:
+    with engine.connect() as connection:
+        types = column_types(connection)
+        changes = [f"MODIFY `{column}` {sql_type}" for column, sql_type in COLUMN_TYPES.items()
+                   if types.get(column) != sql_type.lower()]
+        if changes:
+            connection.execute(text(f"ALTER TABLE {TABLE_NAME} {', '.join(changes)}"))
+            connection.commit()
+            print(f"✓ Changed column types: {', '.join(changes)}")
+
+        present = existing_indexes(connection)
+        for index_name, columns in INDEXES.items():
+            if index_name in present:
+                print(f"✓ Index '{index_name}' already exists.")
+                continue
+            column_list = ', '.join(f"`{c}`" for c in columns)
+            connection.execute(text(f"CREATE INDEX {index_name} ON {TABLE_NAME} ({column_list})"))
+            connection.commit()
+            print(f"✓ Created index '{index_name}' on ({column_list}).")
+
+except Exception as e:
+    print(f"✗ Error: {e}")
@@ -0,0 +1,283 @@
+"""Figure builders for the Dash weather dashboard (gauges, wind rose, history and map)."""
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+from dash import Patch
+from plotly.subplots import make_subplots
+from plotly.utils import PlotlyJSONEncoder
+
+# Farben je Theme; der Theme-Name ist Teil des Figure-Cache-Schlüssels
+THEMES = {
+    'dark': {'text': '#FFFFFF', 'font': 'white'},
+}
+DEFAULT_THEME = 'dark'
+
+# Definition der Gauges: (Schlüssel, Spalte, Titel, Einheit, Bereich, Farbstufen, Balkenfarbe)
+GAUGE_SPECS = [
+    ('temperature', 'temperature_2m', "Temperatur", "°C", [-20, 40],
+     [{'range': [-20, 0], 'color': "#1E90FF"}, {'range': [0, 15], 'color': "#00CED1"}, {'range': [15, 25], 'color': "#FFD700"}, {'range': [25, 40], 'color': "#FF4500"}],
+     "#FF6B6B"),
+    ('humidity', 'relative_humidity_2m', "Luftfeuchtigkeit", "%", [0, 100],
+     [{'range': [0, 30], 'color': "#FFD700"}, {'range': [30, 60], 'color': "#90EE90"}, {'range': [60, 100], 'color': "#00BFFF"}],
+     "#00CED1"),
+    ('pressure', 'pressure_msl', "Luftdruck", "hPa", [990, 1040],
+     [{'range': [990, 1010], 'color': "#FF6347"}, {'range': [1010, 1025], 'color': "#FFD700"}, {'range': [1025, 1040], 'color': "#90EE90"}],
+     "#FFB6C1"),
+    ('cloud_cover', 'cloud_cover', "Bewölkung", "%", [0, 100],
+     [{'range': [0, 33], 'color': "#87CEEB"}, {'range': [33, 66], 'color': "#B0C4DE"}, {'range': [66, 100], 'color': "#808080"}],
+     "#4169E1"),
+]
+
+
+def create_gauge(value, title, unit, value_range, colors, bar_color, theme=DEFAULT_THEME):
+    min_val, max_val = value_range
+    text_color = THEMES[theme]['text']
+
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=value,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={
+            'text': title,
+            'font': {'size': 16, 'color': text_color, 'family': 'Arial Black'}
+        },
+        number={
+            'font': {'size': 44, 'color': text_color, 'family': 'Arial Black'},
+            'suffix': f" {unit}",
+            'valueformat': '.1f'
+        },
+        gauge={
+            'axis': {
+                'range': [min_val, max_val],
+                'tickwidth': 3,
+                'tickcolor': text_color,
+                'ticklen': 12,
+                'tickfont': {'size': 11, 'color': text_color, 'family': 'Arial'}
+            },
+            'bar': {
+                'color': '#FFD700',
+                'thickness': 1.0,
+                'line': {'color': text_color, 'width': 3}
+            },
+            'bgcolor': 'rgba(50,50,80,0.4)',
+            'borderwidth': 6,
+            'bordercolor': '#00D9FF',
+            'steps': colors,
+            'threshold': {
+                'line': {'color': text_color, 'width': 4},
+                'thickness': 1.0,
+                'value': value
+            }
+        }
+    ))
+
+    fig.update_layout(
+        height=320,
+        margin=dict(l=20, r=20, t=70, b=20),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(25,25,50,0.5)',
+        font={'color': THEMES[theme]['font'], 'family': 'Arial, sans-serif'}
+    )
+
+    return fig
+
+
+def _wind_title(wind_speed, wind_gusts):
+    return f"Wind: {wind_speed:.1f} km/h | Gusts: {wind_gusts:.1f} km/h"
+
+
+def create_wind_rose(wind_speed, wind_gusts, wind_direction, theme=DEFAULT_THEME):
+    font_color = THEMES[theme]['font']
+    wind_rose_fig = go.Figure()
+
+    # Add wind speed bar
+    wind_rose_fig.add_trace(go.Barpolar(
+        r=[wind_speed],
+        theta=[wind_direction],
+        width=[12],
+        name='Wind Speed',
+        marker_color=["#2E91E5"],
+        marker_line_color="white",
+        marker_line_width=1,
+        opacity=0.8
+    ))
+
+    # Add wind gusts bar
+    wind_rose_fig.add_trace(go.Barpolar(
+        r=[wind_gusts],
+        theta=[wind_direction],
+        width=[12],
+        name='Wind Gusts',
+        marker_color=["#FF6B6B"],
+        marker_line_color="white",
+        marker_line_width=1,
+        opacity=0.6
+    ))
+
+    wind_rose_fig.update_layout(
+        title={'text': _wind_title(wind_speed, wind_gusts), 'x': 0.5, 'font': {'color': font_color}},
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color=font_color,
+        polar=dict(
+            bgcolor='rgba(0,0,0,0)',
+            angularaxis=dict(
+                tickfont_size=12,
+                rotation=90,  # 0 Grad nach oben (Norden)
+                direction="clockwise",
+                showline=True,
+                showticklabels=True,
+                ticks='outside',
+                tickvals=[0, 45, 90, 135, 180, 225, 270, 315],
+                ticktext=['N', 'NO', 'O', 'SO', 'S', 'SW', 'W', 'NW']
+            ),
+            radialaxis=dict(
+                visible=True,
+                range=[0, 20]  # Fixed maximum at 20 km/h
+            )
+        )
+    )
+
+    return wind_rose_fig
+
+
+# Reihenfolge der Figuren im Dashboard-Layout
+FIGURE_NAMES = [spec[0] for spec in GAUGE_SPECS] + ['wind_rose']
+
+
+def build_town_figures(city_data, theme=DEFAULT_THEME):
+    """Builds all gauges and the wind rose for one town's row; returns {name: go.Figure}."""
+    figures = {}
+    for key, column, title, unit, value_range, colors, bar_color in GAUGE_SPECS:
+        figures[key] = create_gauge(city_data[column], title, unit, value_range, colors, bar_color, theme)
+    figures['wind_rose'] = create_wind_rose(
+        city_data['wind_speed_10m'], city_data['wind_gusts_10m'], city_data['wind_direction_10m'], theme
+    )
+    return figures
+
+
+def town_figures_json(city_data, theme=DEFAULT_THEME):
+    """Serialized form of build_town_figures(), as stored in the figure cache."""
+    figures = build_town_figures(city_data, theme)
+    return json.dumps({name: fig.to_plotly_json() for name, fig in figures.items()}, cls=PlotlyJSONEncoder)
+
+
+def town_figure_patches(city_data):
+    """Partial updates for figures already on the client: only values, thresholds and wind r/theta change."""
+    patches = {}
+    for key, column, *_ in GAUGE_SPECS:
+        value = city_data[column]
+        patch = Patch()
+        patch['data'][0]['value'] = value
+        patch['data'][0]['gauge']['threshold']['value'] = value
+        patches[key] = patch
+
+    wind_speed = city_data['wind_speed_10m']
+    wind_gusts = city_data['wind_gusts_10m']
+    wind_direction = city_data['wind_direction_10m']
+    patch = Patch()
+    patch['data'][0]['r'] = [wind_speed]
+    patch['data'][0]['theta'] = [wind_direction]
+    patch['data'][1]['r'] = [wind_gusts]
+    patch['data'][1]['theta'] = [wind_direction]
+    patch['layout']['title']['text'] = _wind_title(wind_speed, wind_gusts)
+    patches['wind_rose'] = patch
+    return patches
+
+
+# Verlaufsdiagramm: (Spalte, Name, Zeile, Farbe)
+HISTORY_TRACES = [
+    ('temperature_2m', "Temperatur (°C)", 1, "#FF6B6B"),
+    ('relative_humidity_2m', "Luftfeuchtigkeit (%)", 2, "#00CED1"),
+    ('pressure_msl', "Luftdruck (hPa)", 3, "#FFB6C1"),
+    ('wind_speed_10m', "Wind (km/h)", 4, "#2E91E5"),
+    ('wind_gusts_10m', "Böen (km/h)", 4, "#FFD700"),
+]
+
+
+def create_history_figure(series, town, rows, theme=DEFAULT_THEME):
+    """Line chart per variable from downsampled {column: (x, y)} series."""
+    font_color = THEMES[theme]['font']
+    fig = make_subplots(rows=4, cols=1, shared_xaxes=True, vertical_spacing=0.04,
+                        subplot_titles=["Temperatur", "Luftfeuchtigkeit", "Luftdruck", "Wind"])
+    for column, name, row, color in HISTORY_TRACES:
+        x, y = series[column]
+        fig.add_trace(go.Scatter(x=x, y=y, name=name, mode='lines', line={'color': color, 'width': 1.5}),
+                      row=row, col=1)
+
+    points = max((len(series[column][0]) for column, *_ in HISTORY_TRACES), default=0)
+    fig.update_layout(
+        title={'text': f"Verlauf {town}: {rows} Messungen, {points} Punkte dargestellt", 'x': 0.5},
+        height=900,
+        margin=dict(l=50, r=20, t=90, b=40),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(25,25,50,0.5)',
+        font={'color': font_color, 'family': 'Arial, sans-serif'},
+        legend={'orientation': 'h', 'y': -0.05},
+    )
+    fig.update_xaxes(gridcolor='rgba(255,255,255,0.1)')
+    fig.update_yaxes(gridcolor='rgba(255,255,255,0.1)')
+    return fig
+
+
+def history_figure_json(series, town, rows, theme=DEFAULT_THEME):
+    return json.dumps(create_history_figure(series, town, rows, theme).to_plotly_json(), cls=PlotlyJSONEncoder)
+
+
+# Kartenfarben je Modus: (Farbskala, Minimum, Maximum)
+MAP_COLOR_SCALES = {
+    'temperature': ('RdYlBu_r', -20, 40),
+    'weather_code': ('Turbo', 0, 99),
+}
+MAP_NO_DATA_COLOR = '#888888'
+
+
+def create_town_map_traces(clustered, markers, color_mode, color_label, column=None):
+    """Scattermap (WebGL) traces for grid clusters or single towns; towns without weather in grey."""
+    colorscale, cmin, cmax = MAP_COLOR_SCALES[color_mode]
+    if clustered:
+        lons, lats, values = markers['lon'], markers['lat'], markers['value']
+        sizes = (8 + 4 * np.log2(markers['count'])).round(1)
+        hover = [f"{count} Orte<br>{color_label}: {value:.1f}" if value == value else f"{count} Orte"
+                 for count, value in zip(markers['count'], values)]
+    else:
+        lons, lats, values = markers['longitude'], markers['latitude'], markers[column]
+        sizes = np.full(len(markers), 9)
+        hover = [f"{town} ({state}, {country})<br>{color_label}: {value:.1f}" if value == value
+                 else f"{town} ({state}, {country})"
+                 for town, state, country, value in zip(markers['town'], markers['state'], markers['country'], values)]
+
+    has_value = values.notna().to_numpy()
+    hover = np.asarray(hover, dtype=object)
+    sizes = np.asarray(sizes)
+    traces = [
+        go.Scattermap(
+            lon=lons[~has_value], lat=lats[~has_value], mode='markers', name="Keine Wetterdaten",
+            marker={'size': sizes[~has_value], 'color': MAP_NO_DATA_COLOR, 'opacity': 0.6},
+            hovertext=hover[~has_value], hoverinfo='text',
+        ),
+        go.Scattermap(
+            lon=lons[has_value], lat=lats[has_value], mode='markers', name=color_label,
+            marker={'size': sizes[has_value], 'color': values[has_value], 'colorscale': colorscale,
+                    'cmin': cmin, 'cmax': cmax, 'opacity': 0.85,
+                    'colorbar': {'title': {'text': color_label}}},
+            hovertext=hover[has_value], hoverinfo='text',
+        ),
+    ]
+    return traces
+
+
+def create_town_map_figure(traces, view, theme=DEFAULT_THEME):
+    font_color = THEMES[theme]['font']
+    fig = go.Figure(traces)
+    fig.update_layout(
+        map={'style': 'carto-darkmatter', 'center': view['center'], 'zoom': view['zoom']},
+        height=700,
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor='rgba(0,0,0,0)',
+        font={'color': font_color, 'family': 'Arial, sans-serif'},
+        showlegend=False,
+        # Behält Zoom und Ausschnitt des Benutzers, wenn nur die Marker ersetzt werden
+        uirevision='town-map',
+    )
+    return fig
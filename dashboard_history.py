@@ -0,0 +1,53 @@
+"""Per-town observation history for the dashboard, downsampled to a fixed point budget.
+
+The query reads one town's time range from weather_records through the
+(town, recorded_at) index (see create_weather_records_indexes.py); the rows
+are then reduced per column with LTTB, so the payload stays the same size
+for a day or a year of observations.
+"""
+from datetime import datetime, timedelta
+
+from dashboard_metrics import stage
+from downsampling import downsample
+from weather_loader import read_weather
+
+# Columns of the history panel
+HISTORY_COLUMNS = ['temperature_2m', 'relative_humidity_2m', 'pressure_msl', 'wind_speed_10m', 'wind_gusts_10m']
+
+# Selectable ranges: key -> (label, length)
+HISTORY_RANGES = {
+    '24h': ("24 Stunden", timedelta(hours=24)),
+    '7d': ("7 Tage", timedelta(days=7)),
+    '30d': ("30 Tage", timedelta(days=30)),
+    '90d': ("90 Tage", timedelta(days=90)),
+    '365d': ("1 Jahr", timedelta(days=365)),
+}
+DEFAULT_RANGE = '7d'
+
+# Points per series sent to the browser
+POINT_BUDGET = 500
+
+HISTORY_QUERY = """
+SELECT {columns}
+FROM weather_records
+WHERE town = :town AND recorded_at >= :start
+ORDER BY recorded_at
+"""
+
+
+def load_town_history(engine, town, start, columns=HISTORY_COLUMNS):
+    """Rows of one town since `start` (a datetime), with recorded_at parsed to datetimes."""
+    # recorded_at is stored as datetime.isoformat(), so the bound compares as a string
+    with stage('history_db'):
+        return read_weather(engine, HISTORY_QUERY, ['recorded_at', *columns],
+                            params={'town': town, 'start': start.isoformat()},
+                            parse_dates=('recorded_at',), label='history')
+
+
+def town_history(engine, town, range_key=DEFAULT_RANGE, point_budget=POINT_BUDGET, now=None):
+    """Returns (rows in range, {column: (x, y)}) with at most point_budget points per column."""
+    _, length = HISTORY_RANGES[range_key]
+    start = (now or datetime.now()) - length
+    df = load_town_history(engine, town, start)
+    with stage('downsample'):
+        return len(df), downsample(df, 'recorded_at', HISTORY_COLUMNS, point_budget)
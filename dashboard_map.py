@@ -0,0 +1,174 @@
+"""All-towns map layer for the dashboard: viewport filtering and grid clustering.
+
+The towns from geodata.all_towns are loaded once and joined
+with the current weather snapshot. Every pan/zoom only sends the towns inside
+the visible bounds; below CLUSTER_MAX_ZOOM they are aggregated into grid
+clusters of roughly CLUSTER_CELL_PIXELS screen pixels, so the browser never
+draws more than a few hundred markers at country scale.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from dashboard_metrics import stage
+from geometry_cache import degrees_per_pixel
+from single_flight import SingleFlight
+
+ALL_TOWNS_QUERY = "SELECT ID, country, state, town, longitude, latitude, inhabitants FROM all_towns"
+
+# Initial view: Austria and its neighbours
+DEFAULT_VIEW = {'center': {'lon': 13.3, 'lat': 47.6}, 'zoom': 5.5}
+
+# Below this zoom towns are clustered, at and above it drawn individually
+CLUSTER_MAX_ZOOM = 8
+CLUSTER_CELL_PIXELS = 48
+
+# Viewport size assumed when the browser only reports center and zoom
+ASSUMED_VIEWPORT_PIXELS = (1200, 700)
+
+# Selectable marker colours: key -> (label, snapshot column, cluster aggregate).
+# WMO codes grow with severity, so a cluster shows its most severe weather.
+COLOR_MODES = {
+    'temperature': ("Temperatur (°C)", 'temperature_2m', 'mean'),
+    'weather_code': ("Wettercode (WMO)", 'weather_code', 'max'),
+}
+
+# weather_records only holds the Austrian towns fetched by fetch_weather.py
+WEATHER_COUNTRY = 'AT'
+
+
+def viewport_from_relayout(relayout_data, previous=None):
+    """Returns {'center', 'zoom', 'bounds': [west, south, east, north]} from a map's relayoutData.
+
+    Events without map keys (e.g. autosize) return `previous` unchanged.
+    """
+    relayout_data = relayout_data or {}
+    if 'map.center' not in relayout_data and 'map.zoom' not in relayout_data:
+        return previous
+    base = previous or viewport_for(DEFAULT_VIEW['center'], DEFAULT_VIEW['zoom'])
+    center = relayout_data.get('map.center', base['center'])
+    zoom = relayout_data.get('map.zoom', base['zoom'])
+    derived = relayout_data.get('map._derived', {}).get('coordinates')
+    if derived:
+        lons = [p[0] for p in derived]
+        lats = [p[1] for p in derived]
+        return {'center': center, 'zoom': zoom, 'bounds': [min(lons), min(lats), max(lons), max(lats)]}
+    return viewport_for(center, zoom)
+
+
+def viewport_for(center, zoom):
+    """Approximate bounds for center/zoom at ASSUMED_VIEWPORT_PIXELS."""
+    width, height = ASSUMED_VIEWPORT_PIXELS
+    half_lon = width / 2 * degrees_per_pixel(zoom)
+    half_lat = height / 2 * degrees_per_pixel(zoom) * math.cos(math.radians(center['lat']))
+    return {'center': center, 'zoom': zoom, 'bounds': [center['lon'] - half_lon, center['lat'] - half_lat,
+                                                       center['lon'] + half_lon, center['lat'] + half_lat]}
+
+
+def in_bounds(lons, lats, bounds):
+    west, south, east, north = bounds
+    return (lons >= west) & (lons <= east) & (lats >= south) & (lats <= north)
+
+
+def cluster_grid(lons, lats, values, zoom, aggregate='mean', cell_pixels=CLUSTER_CELL_PIXELS):
+    """Aggregates points into square grid cells; returns a DataFrame with lon, lat, count, value.
+
+    lon/lat are the mean position of a cell's towns, value the `aggregate` of
+    the non-missing values (NaN if none of them has weather).
+    """
+    cell = cell_pixels * degrees_per_pixel(zoom)
+    frame = pd.DataFrame({
+        'cx': np.floor(lons / cell).astype(np.int64),
+        'cy': np.floor(lats / cell).astype(np.int64),
+        'lon': lons,
+        'lat': lats,
+        'value': values,
+    })
+    grouped = frame.groupby(['cx', 'cy'], sort=False)
+    clusters = grouped.agg(lon=('lon', 'mean'), lat=('lat', 'mean'), count=('lon', 'size'), value=('value', aggregate))
+    return clusters.reset_index(drop=True)
+
+
+def join_weather(towns, weather, columns, numeric=None, country=WEATHER_COUNTRY):
+    """towns plus the given weather columns, matched on the natural key (country, town).
+
+    The weather rows all belong to `country`. The `numeric` columns (default:
+    all of them) are coerced to floats; towns without a matching observation get NaN.
+    """
+    if all(c in weather for c in ['town', *columns]):
+        # Plain strings: categorical town columns would merge only on identical categories
+        weather = weather[['town', *columns]].assign(country=country, town=weather['town'].astype(str))
+        weather = weather.drop_duplicates(['country', 'town'])
+    else:
+        weather = pd.DataFrame(columns=['country', 'town', *columns])
+
+    frame = towns.merge(weather, on=['country', 'town'], how='left')
+    for column in (columns if numeric is None else numeric):
+        frame[column] = pd.to_numeric(frame[column], errors='coerce')
+    return frame
+
+
+class TownLayer:
+    """All towns with the snapshot's weather, reloaded from geodata every `ttl` seconds."""
+
+    def __init__(self, engine, ttl=3600):
+        self.engine = engine
+        self.ttl = ttl
+        self._towns = None
+        self._loaded_at = 0.0
+        self._joined = (None, None)   # ((snapshot version, watermark), joined frame)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def towns(self):
+        if self._towns is None or time.time() - self._loaded_at > self.ttl:
+            self._flight.do('towns', self._load)
+        return self._towns
+
+    def _load(self):
+        with stage('towns_db'):
+            towns = pd.read_sql_query(ALL_TOWNS_QUERY, self.engine)
+        towns = towns.dropna(subset=['longitude', 'latitude']).reset_index(drop=True)
+        self._towns = towns
+        self._loaded_at = time.time()
+        with self._lock:
+            self._joined = (None, None)
+        return towns
+
+    def joined(self, snapshot):
+        """all_towns plus the snapshot's weather columns, matched on (country, town) (cached per snapshot)."""
+        towns = self.towns()
+        # Historical snapshots all have version 0, so the watermark is part of the key
+        key = (snapshot.version, snapshot.watermark)
+        with self._lock:
+            cached_key, frame = self._joined
+            if cached_key == key and frame is not None:
+                return frame
+
+        with stage('join'):
+            frame = self._join(towns, snapshot)
+        with self._lock:
+            self._joined = (key, frame)
+        return frame
+
+    def _join(self, towns, snapshot):
+        return join_weather(towns, snapshot.df, [column for _, column, _ in COLOR_MODES.values()])
+
+    def visible(self, snapshot, viewport, color_mode):
+        """Markers for the viewport: individual towns (clustered=False) or grid clusters (clustered=True)."""
+        frame = self.joined(snapshot)
+        _, column, aggregate = COLOR_MODES[color_mode]
+        with stage('filter'):
+            return self._visible(frame, viewport, column, aggregate)
+
+    def _visible(self, frame, viewport, column, aggregate):
+        lons = frame['longitude'].to_numpy(dtype=float)
+        lats = frame['latitude'].to_numpy(dtype=float)
+        mask = in_bounds(lons, lats, viewport['bounds'])
+        if viewport['zoom'] < CLUSTER_MAX_ZOOM:
+            values = frame[column].to_numpy(dtype=float)[mask]
+            return True, cluster_grid(lons[mask], lats[mask], values, viewport['zoom'], aggregate)
+        return False, frame.loc[mask, ['town', 'state', 'country', 'longitude', 'latitude', column]]
@@ -0,0 +1,254 @@
+"""Latency histograms per Dash callback and stage, Server-Timing headers and a /metrics endpoint.
+
+Callbacks are wrapped with instrument(); inside them (and in loaders they
+call) `with stage('db'):` blocks time the individual steps. Every measurement
+goes into a histogram keyed by (callback, stage), and within a request also
+into the response's Server-Timing header, so the browser's network panel
+shows where a slow interaction spent its time. Stages outside a callback,
+e.g. the background snapshot refresh, are recorded under 'background'.
+
+Histograms are kept per process. With a shared_dir (see init_app) every
+worker writes its histograms to metrics-<pid>.json there, at most every
+FLUSH_INTERVAL seconds, and /metrics merges the files of all running workers,
+so under gunicorn it shows the whole server, not just the worker that
+answered. Counts of workers that have exited are dropped with their files.
+"""
+import bisect
+import contextvars
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+from file_utils import atomic_write_text
+
+# Upper bucket bounds in milliseconds; the last bucket is unbounded
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Seconds between two writes of a worker's histograms to the shared directory
+FLUSH_INTERVAL = 2.0
+
+_current_callback = contextvars.ContextVar('current_callback', default='background')
+
+
+class LatencyHistogram:
+    def __init__(self, bounds=BUCKET_BOUNDS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def state(self):
+        return {'counts': list(self.counts), 'count': self.count, 'total': self.total, 'max': self.max}
+
+    def merge(self, state):
+        """Adds the counts of another process's histogram (from state())."""
+        self.counts = [a + b for a, b in zip(self.counts, state['counts'])]
+        self.count += state['count']
+        self.total += state['total']
+        self.max = max(self.max, state['max'])
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (max for the open last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 3) if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'max_ms': round(self.max, 3),
+            'buckets': {('inf' if i == len(self.bounds) else str(self.bounds[i])): n
+                        for i, n in enumerate(self.counts) if n},
+        }
+
+
+def _process_alive(pid):
+    if os.name == 'nt':
+        # os.kill() would terminate it; the dashboard runs in one process on Windows anyway
+        return pid == os.getpid()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metrics:
+    """Registry of LatencyHistograms keyed by (callback, stage), optionally merged across processes."""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.shared_dir = None
+        self.flush_interval = flush_interval
+        self._flushed_at = 0.0
+
+    def share(self, directory):
+        """Publishes this process's histograms to `directory` and merges the other workers' in summary()."""
+        os.makedirs(directory, exist_ok=True)
+        self.shared_dir = directory
+
+    def observe(self, callback, stage_name, ms):
+        with self._lock:
+            histogram = self._histograms.get((callback, stage_name))
+            if histogram is None:
+                histogram = self._histograms[(callback, stage_name)] = LatencyHistogram()
+            histogram.observe(ms)
+
+    def _path(self, pid):
+        return os.path.join(self.shared_dir, f"metrics-{pid}.json")
+
+    def flush(self, force=False):
+        """Writes this process's histograms to the shared directory, at most every flush_interval seconds."""
+        now = time.time()
+        if not self.shared_dir or (not force and now - self._flushed_at < self.flush_interval):
+            return
+        self._flushed_at = now
+        with self._lock:
+            states = [[callback, stage_name, histogram.state()]
+                      for (callback, stage_name), histogram in self._histograms.items()]
+        atomic_write_text(self._path(os.getpid()), json.dumps(states))
+
+    def _other_workers(self):
+        """Histogram states of the other running workers; files of exited ones are removed."""
+        workers = []
+        for path in glob.glob(os.path.join(self.shared_dir, "metrics-*.json")):
+            try:
+                pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            if not _process_alive(pid):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    workers.append(json.load(f))
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+        return workers
+
+    def summary(self):
+        with self._lock:
+            merged = {}
+            for key, histogram in self._histograms.items():
+                merged[key] = LatencyHistogram(histogram.bounds)
+                merged[key].merge(histogram.state())
+        if self.shared_dir:
+            for states in self._other_workers():
+                for callback, stage_name, state in states:
+                    merged.setdefault((callback, stage_name), LatencyHistogram()).merge(state)
+        result = {}
+        for (callback, stage_name), histogram in sorted(merged.items()):
+            result.setdefault(callback, {})[stage_name] = histogram.summary()
+        return result
+
+
+METRICS = Metrics()
+
+
+def _record(stage_name, ms, metrics=METRICS):
+    metrics.observe(_current_callback.get(), stage_name, ms)
+    if has_request_context():
+        g.setdefault('server_timing', []).append((stage_name, ms))
+
+
+@contextmanager
+def stage(stage_name):
+    """Times the enclosed block as one stage of the current callback."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage_name, (time.perf_counter() - start) * 1000)
+
+
+def instrument(func):
+    """Decorator for Dash callbacks: records the total callback time and names nested stages."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current_callback.set(func.__name__)
+        if has_request_context():
+            g.callback_name = func.__name__
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            _record('callback', ms)
+            if has_request_context():
+                g.callback_ms = ms
+            _current_callback.reset(token)
+    return wrapper
+
+
+def _server_timing_header(entries):
+    return ', '.join(f'{name};dur={ms:.2f}' for name, ms in entries)
+
+
+def init_app(server, metrics=METRICS, shared_dir=None):
+    """Adds Server-Timing headers to every response and the /metrics endpoint to a Flask server.
+
+    With a shared_dir, /metrics covers all worker processes that use the same directory.
+    """
+    if shared_dir:
+        metrics.share(shared_dir)
+
+    @server.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @server.after_request
+    def _server_timing(response):
+        start = g.get('request_start')
+        if start is None:
+            return response
+        total_ms = (time.perf_counter() - start) * 1000
+        entries = list(g.get('server_timing', []))
+        callback = g.get('callback_name')
+        if callback is not None:
+            # Time outside the callback: Dash's dispatch and JSON serialization of the outputs
+            serialize_ms = max(0.0, total_ms - g.get('callback_ms', 0.0))
+            metrics.observe(callback, 'serialize', serialize_ms)
+            metrics.observe(callback, 'request', total_ms)
+            entries.append(('serialize', serialize_ms))
+        else:
+            # Rule, not path: fingerprinted asset URLs would create a histogram each
+            rule = request.url_rule.rule if request.url_rule else 'unmatched'
+            metrics.observe(f"route {rule}", 'request', total_ms)
+        entries.append(('total', total_ms))
+        response.headers['Server-Timing'] = _server_timing_header(entries)
+        metrics.flush()
+        return response
+
+    @server.route('/metrics')
+    def _metrics():
+        return metrics.summary()
@@ -0,0 +1,265 @@
+"""Background-refreshed snapshot of the latest observation per town for the Dash app.
+
+The snapshot is an immutable value that is replaced as a whole, so callbacks
+always see a consistent DataFrame without locking. Refreshes only query rows
+newer than the last seen recorded_at (the watermark) and merge them in.
+
+With a shared_path, worker processes share one snapshot file: a worker only
+queries the database when the file is older than the TTL, and otherwise adopts
+the snapshot another worker has written. The query runs under a lock file, so
+when the file goes stale one worker refreshes and the others adopt its result.
+
+With an arrow_dir, new rows come from the Arrow snapshot that fetch_weather.py
+publishes at ingest (see snapshot_arrow.py) as long as it is fresh, and from the
+database otherwise; a stale file still serves when the database is down.
+"""
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from dashboard_metrics import stage
+from file_utils import atomic_write_bytes, file_lock
+from single_flight import SingleFlight
+from snapshot_arrow import SNAPSHOT_MAX_AGE, read_snapshot
+from weather_loader import compact, read_weather
+
+# Latest row per town, optionally only among rows newer than the watermark
+LATEST_PER_TOWN_QUERY = """
+SELECT {columns} FROM (
+    SELECT {columns},
+           ROW_NUMBER() OVER(PARTITION BY town ORDER BY recorded_at DESC) as rn
+    FROM verbose_weather_records
+    {where}
+) AS subquery
+WHERE rn = 1
+"""
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    df: pd.DataFrame        # latest observation per town; treat as read-only
+    states: tuple           # sorted federal states in df
+    state_towns: dict       # federal state -> sorted tuple of its towns
+    watermark: object       # max recorded_at in df, None before the first load
+    version: int            # incremented whenever df changes
+    loaded_at: float        # time.time() of the load that produced df
+
+
+def _state_index(df):
+    """Returns (sorted states, {state: sorted towns}), computed once per refresh."""
+    if 'federal_state' not in df or 'town' not in df:
+        return (), {}
+    pairs = df[['federal_state', 'town']].dropna().drop_duplicates().astype(str).sort_values(['federal_state', 'town'])
+    state_towns = {state: tuple(group['town']) for state, group in pairs.groupby('federal_state', sort=True)}
+    return tuple(state_towns), state_towns
+
+
+def _snapshot(df, watermark, version):
+    states, state_towns = _state_index(df)
+    return Snapshot(df, states, state_towns, watermark, version, time.time())
+
+
+class SnapshotStore:
+    """Holds the current Snapshot and refreshes it from the database every `ttl` seconds.
+
+    Only `columns` are loaded (all of them if None), with compact dtypes (see weather_loader.py).
+    """
+
+    def __init__(self, engine, ttl=300, empty_columns=(), shared_path=None, columns=None, arrow_dir=None,
+                 arrow_max_age=SNAPSHOT_MAX_AGE):
+        self.engine = engine
+        self.ttl = ttl
+        self.shared_path = shared_path
+        self.arrow_dir = arrow_dir
+        self.arrow_max_age = arrow_max_age
+        self.columns = list(columns) if columns else ['*']
+        self._snapshot = Snapshot(pd.DataFrame(columns=list(empty_columns)), (), {}, None, 0, 0.0)
+        self._refresh_lock = threading.Lock()
+        # Concurrent refresh() calls share one database query
+        self._flight = SingleFlight()
+        self._stop = threading.Event()
+        self._thread = None
+        self._metrics = {
+            'refreshes': 0,
+            'failures': 0,
+            'rows_loaded': 0,
+            'shared_loads': 0,
+            'lock_waits': 0,
+            'arrow_loads': 0,
+            'last_duration': None,
+            'max_duration': 0.0,
+            'total_duration': 0.0,
+            'last_refresh_at': None,
+            'last_error': None,
+        }
+
+    def get(self):
+        # A plain attribute read; the snapshot is swapped, never mutated
+        return self._snapshot
+
+    def is_stale(self):
+        return time.time() - self._snapshot.loaded_at > self.ttl
+
+    def _load_arrow(self, watermark, max_age):
+        """Rows newer than the watermark from the Arrow snapshot, or None if there is no usable one."""
+        snapshot = read_snapshot(None if self.columns == ['*'] else self.columns, directory=self.arrow_dir,
+                                 max_age=max_age, label='snapshot-arrow')
+        if snapshot is None:
+            return None
+        self._metrics['arrow_loads'] += 1
+        df = snapshot[0]
+        return df if watermark is None else df[df['recorded_at'] > watermark].reset_index(drop=True)
+
+    def _load(self, watermark):
+        if self.arrow_dir:
+            rows = self._load_arrow(watermark, self.arrow_max_age)
+            if rows is not None:
+                return rows
+        try:
+            return self._load_db(watermark)
+        except Exception as e:
+            rows = self._load_arrow(watermark, None) if self.arrow_dir else None
+            if rows is None:
+                raise
+            print(f"✗ Snapshot query failed, using the Arrow snapshot instead: {e}")
+            return rows
+
+    def _load_db(self, watermark):
+        if watermark is None:
+            return read_weather(self.engine, LATEST_PER_TOWN_QUERY, self.columns, where="", label='snapshot')
+        return read_weather(self.engine, LATEST_PER_TOWN_QUERY, self.columns, params={'watermark': watermark},
+                            where="WHERE recorded_at > :watermark", label='snapshot')
+
+    def _read_shared(self):
+        """Returns (age in seconds, {'df', 'watermark', 'version'}) of the shared file, or None."""
+        try:
+            age = time.time() - os.stat(self.shared_path).st_mtime
+            with open(self.shared_path, 'rb') as f:
+                return age, pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Truncated, or pickled by another pandas version; the next refresh overwrites it
+            print(f"✗ Shared snapshot {self.shared_path} unreadable, ignoring it: {e}")
+            return None
+
+    def _write_shared(self, snapshot):
+        data = {'df': snapshot.df, 'watermark': snapshot.watermark, 'version': snapshot.version}
+        atomic_write_bytes(self.shared_path, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _adopt(self, current, shared):
+        if shared['version'] == current.version:
+            return Snapshot(current.df, current.states, current.state_towns, current.watermark,
+                            current.version, time.time())
+        return _snapshot(shared['df'], shared['watermark'], shared['version'])
+
+    def refresh(self):
+        """Loads rows newer than the watermark and swaps in a new snapshot if anything changed."""
+        return self._flight.do('refresh', self._refresh)
+
+    def _check_shared(self, current):
+        """Adopts the shared snapshot if it is newer or fresh; returns (snapshot, whether it is fresh)."""
+        shared = self._read_shared()
+        if shared is None:
+            return current, False
+        age, data = shared
+        if data['version'] > current.version or age < self.ttl:
+            # Continue from the newest state any worker has seen
+            current = self._adopt(current, data)
+            self._snapshot = current
+        if age < self.ttl:
+            self._metrics['shared_loads'] += 1
+            return current, True
+        return current, False
+
+    def _refresh(self):
+        with self._refresh_lock:
+            current = self._snapshot
+            start = time.perf_counter()
+            if not self.shared_path:
+                return self._load_and_swap(current, start)
+
+            current, fresh = self._check_shared(current)
+            if fresh:
+                return current
+            lock_start = time.perf_counter()
+            with file_lock(self.shared_path + '.lock'):
+                if time.perf_counter() - lock_start > 0.01:
+                    self._metrics['lock_waits'] += 1
+                # Another worker may have refreshed the file while this one waited for the lock
+                current, fresh = self._check_shared(current)
+                if fresh:
+                    return current
+                return self._load_and_swap(current, start)
+
+    def _load_and_swap(self, current, start):
+        """Loads rows newer than current's watermark and swaps in the merged snapshot."""
+        try:
+            with stage('snapshot_db'):
+                new_rows = self._load(current.watermark)
+        except Exception as e:
+            self._metrics['failures'] += 1
+            self._metrics['last_error'] = str(e)
+            print(f"✗ Snapshot refresh failed, keeping version {current.version}: {e}")
+            return current
+
+        with stage('snapshot_merge'):
+            snapshot = self._merge(current, new_rows)
+        self._snapshot = snapshot
+        if self.shared_path:
+            # Rewritten even without new rows: the file's mtime tells other workers it is fresh
+            self._write_shared(snapshot)
+
+        duration = time.perf_counter() - start
+        m = self._metrics
+        m['refreshes'] += 1
+        m['rows_loaded'] += len(new_rows)
+        m['last_duration'] = duration
+        m['max_duration'] = max(m['max_duration'], duration)
+        m['total_duration'] += duration
+        m['last_refresh_at'] = snapshot.loaded_at
+        m['last_error'] = None
+        return snapshot
+
+    def _merge(self, current, new_rows):
+        if current.watermark is None:
+            return _snapshot(new_rows, new_rows['recorded_at'].max() if len(new_rows) else None,
+                             current.version + 1)
+        if len(new_rows):
+            unchanged = current.df[~current.df['town'].isin(new_rows['town'])]
+            # Categoricals with different categories concatenate to object columns; compact them again
+            df = compact(pd.concat([unchanged, new_rows], ignore_index=True))
+            return _snapshot(df, max(current.watermark, new_rows['recorded_at'].max()), current.version + 1)
+        return Snapshot(current.df, current.states, current.state_towns, current.watermark,
+                        current.version, time.time())
+
+    def metrics(self):
+        m = dict(self._metrics)
+        m['avg_duration'] = m['total_duration'] / m['refreshes'] if m['refreshes'] else None
+        m['coalesced'] = self._flight.coalesced
+        snapshot = self._snapshot
+        m.update(version=snapshot.version, watermark=snapshot.watermark, towns=len(snapshot.df), ttl=self.ttl)
+        return m
+
+    def _run(self):
+        while not self._stop.wait(self.ttl):
+            before = self._snapshot.version
+            snapshot = self.refresh()
+            if snapshot.version != before:
+                m = self._metrics
+                print(f"✓ Snapshot v{snapshot.version}: {len(snapshot.df)} towns up to {snapshot.watermark} "
+                      f"(refresh {m['last_duration'] * 1000:.0f} ms)")
+
+    def start(self):
+        """Starts the background refresher thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="snapshot-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
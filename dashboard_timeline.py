@@ -0,0 +1,135 @@
+"""Past ingests of all towns for the dashboard's time slider.
+
+fetch_weather.py stamps every row of one run with the same recorded_at, so a
+past snapshot is an equality lookup on the recorded_at index (see
+create_weather_records_indexes.py) instead of a window query over the whole
+table. Loaded snapshots are kept in a small LRU cache, and the neighbours of
+the selected ingest are prefetched in the background while the user scrubs.
+
+With an arrow_dir, ingests of the last 24 hours are read from the history file
+that fetch_weather.py publishes (see snapshot_arrow.py) instead of the database.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from dashboard_metrics import stage
+from dashboard_snapshot import _snapshot
+from single_flight import SingleFlight
+from snapshot_arrow import read_snapshot, snapshot_times
+from weather_loader import read_weather
+
+# Length of the slider's time window
+TIMELINE_LENGTH = timedelta(days=1)
+
+INGEST_TIMES_QUERY = """
+SELECT DISTINCT recorded_at
+FROM weather_records
+WHERE recorded_at >= :start
+ORDER BY recorded_at
+"""
+
+SNAPSHOT_AT_QUERY = """
+SELECT {columns}
+FROM verbose_weather_records
+WHERE recorded_at = :recorded_at
+"""
+
+
+class Timeline:
+    """Ingest times and per-ingest snapshots, cached in an LRU of `cache_size` entries."""
+
+    def __init__(self, engine, cache_size=32, prefetch=2, columns=None, arrow_dir=None):
+        self.engine = engine
+        self.arrow_dir = arrow_dir
+        self.columns = list(columns) if columns else ['*']
+        self.cache_size = cache_size
+        self.prefetch = prefetch
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="timeline-prefetch")
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.arrow_loads = 0
+
+    def ingest_times(self, length=TIMELINE_LENGTH, now=None):
+        """recorded_at values of the ingests within `length` before now, oldest first."""
+        start = ((now or datetime.now()) - length).isoformat()
+        try:
+            with stage('timeline_db'), self.engine.connect() as connection:
+                result = connection.execute(text(INGEST_TIMES_QUERY), {'start': start})
+                return [row[0] for row in result]
+        except Exception:
+            times = snapshot_times(start, directory=self.arrow_dir, max_age=None) if self.arrow_dir else None
+            if times is None:
+                raise
+            return times
+
+    def _cached(self, recorded_at):
+        with self._lock:
+            snapshot = self._snapshots.get(recorded_at)
+            if snapshot is not None:
+                self._snapshots.move_to_end(recorded_at)
+            return snapshot
+
+    def _load(self, recorded_at):
+        snapshot = self._cached(recorded_at)
+        if snapshot is not None:
+            return snapshot
+        df = None
+        if self.arrow_dir:
+            # A past ingest never changes, so a history file of any age will do
+            with stage('timeline_arrow'):
+                history = read_snapshot(None if self.columns == ['*'] else self.columns, kind='history',
+                                        directory=self.arrow_dir, max_age=None, recorded_at=recorded_at,
+                                        label='timeline-arrow')
+            if history is not None and len(history[0]):
+                df = history[0]
+                self.arrow_loads += 1
+        if df is None:
+            with stage('timeline_db'):
+                df = read_weather(self.engine, SNAPSHOT_AT_QUERY, self.columns, params={'recorded_at': recorded_at},
+                                  label='timeline')
+        # Version 0 marks a historical snapshot; the watermark identifies it
+        snapshot = _snapshot(df, recorded_at, 0)
+        with self._lock:
+            self._snapshots[recorded_at] = snapshot
+            self._snapshots.move_to_end(recorded_at)
+            while len(self._snapshots) > self.cache_size:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def snapshot_at(self, recorded_at):
+        """Snapshot of all towns at one ingest, from the cache or one indexed query."""
+        snapshot = self._cached(recorded_at)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        self.misses += 1
+        return self._flight.do(recorded_at, lambda: self._load(recorded_at))
+
+    def prefetch_around(self, times, index):
+        """Loads the `prefetch` ingests on either side of times[index] in the background."""
+        for offset in range(1, self.prefetch + 1):
+            for neighbour in (index - offset, index + offset):
+                if 0 <= neighbour < len(times) and self._cached(times[neighbour]) is None:
+                    self.prefetched += 1
+                    self._executor.submit(self._prefetch, times[neighbour])
+
+    def _prefetch(self, recorded_at):
+        try:
+            self._flight.do(recorded_at, lambda: self._load(recorded_at))
+        except Exception as e:
+            print(f"✗ Prefetch of {recorded_at} failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._snapshots)
+        return {'entries': entries, 'cache_size': self.cache_size, 'hits': self.hits,
+                'misses': self.misses, 'prefetched': self.prefetched, 'arrow_loads': self.arrow_loads,
+                'single_flight': self._flight.stats()}
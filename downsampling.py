@@ -0,0 +1,73 @@
+"""Server-side downsampling of time series to a fixed point budget.
+
+lttb() (Largest-Triangle-Three-Buckets) keeps the visual shape of a line;
+minmax_buckets() keeps every bucket's extremes, so peaks are never dropped.
+Both return sorted row indices, so any number of columns can be selected
+with the same result.
+"""
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """Indices of `threshold` points chosen by Largest-Triangle-Three-Buckets."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    # Inner points are split into threshold - 2 buckets of (almost) equal size
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        ax, ay = x[selected], y[selected]
+        bx, by = x[start:end], y[start:end]
+        areas = np.abs((ax - avg_x) * (by - ay) - (ax - bx) * (avg_y - ay))
+        selected = start + int(np.argmax(areas))
+        indices[i + 1] = selected
+    return indices
+
+
+def minmax_buckets(x, y, threshold):
+    """Indices of the minimum and maximum of each of threshold // 2 equal-width time buckets."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+
+    buckets = threshold // 2
+    bucket = np.minimum(((x - x[0]) / (x[-1] - x[0] or 1.0) * buckets).astype(np.int64), buckets - 1)
+    # Sort by (bucket, value) once; the first/last row of each bucket are its min/max
+    by_value = np.lexsort((y, bucket))
+    starts = np.flatnonzero(np.r_[True, np.diff(bucket[by_value]) != 0])
+    ends = np.r_[starts[1:], n] - 1
+    return np.union1d(by_value[starts], by_value[ends])
+
+
+def downsample(df, x_column, columns, threshold, method='lttb'):
+    """Returns {column: (x, y)} with at most `threshold` points per column, NaNs dropped."""
+    select = lttb if method == 'lttb' else minmax_buckets
+    x_all = df[x_column]
+    # Datetimes as integers; the time unit does not change which points are picked
+    x_numeric = x_all.astype('int64').to_numpy(dtype=float) if hasattr(x_all, 'dt') else x_all.to_numpy(dtype=float)
+    series = {}
+    for column in columns:
+        values = df[column].to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(values))
+        picked = valid[select(x_numeric[valid], values[valid], threshold)]
+        series[column] = (x_all.to_numpy()[picked], values[picked])
+    return series
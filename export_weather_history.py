@@ -0,0 +1,242 @@
+"""Streaming export of weather_records to CSV.gz, Parquet or JSONL with bounded memory.
+
+Rows are read through a server-side (unbuffered) cursor in chunks of
+--chunk-size rows and written out chunk by chunk, so peak memory depends on
+the chunk size, not on the size of the table. Time, town and state filters
+are part of the SQL query. Progress and throughput are printed per chunk.
+The output is written to a temporary file and renamed when complete.
+
+    python export_weather_history.py weather_history.csv.gz --start 2026-01-01 --town Wien --town Graz
+    python export_weather_history.py weather_history.parquet --state Tirol
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, create_engine, text
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak memory is then not reported
+    resource = None
+
+load_dotenv() # Load environment variables from .env
+
+# MySQL connection settings
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT"))
+MYSQL_DATABASE = "OpenMeteo"
+
+# Connect to database
+engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}")
+
+CHUNK_SIZE = 50_000
+FORMATS = ('csv', 'parquet', 'jsonl')
+
+
+def export_format(path):
+    """Output format from the file name: .csv(.gz), .parquet or .jsonl(.gz)."""
+    name = path[:-3] if path.endswith('.gz') else path
+    for fmt in FORMATS:
+        if name.endswith('.' + fmt):
+            return fmt
+    raise ValueError(f"Unknown export format for {path}; use .csv.gz, .parquet or .jsonl")
+
+
+def build_query(columns=None, start=None, end=None, towns=None, states=None):
+    """Returns (select statement, count statement, params) with the filters as bound parameters."""
+    conditions = []
+    params = {}
+    if start:
+        # recorded_at is stored as datetime.isoformat(), so the bounds compare as strings
+        conditions.append("recorded_at >= :start")
+        params['start'] = start
+    if end:
+        conditions.append("recorded_at < :end")
+        params['end'] = end
+    if towns:
+        conditions.append("town IN :towns")
+        params['towns'] = list(towns)
+    if states:
+        conditions.append("federal_state IN :states")
+        params['states'] = list(states)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    select_list = ', '.join(columns) if columns else '*'
+
+    def statement(sql):
+        statement = text(sql)
+        for name in ('towns', 'states'):
+            if name in params:
+                statement = statement.bindparams(bindparam(name, expanding=True))
+        return statement
+
+    return (statement(f"SELECT {select_list} FROM weather_records {where} ORDER BY recorded_at"),
+            statement(f"SELECT COUNT(*) FROM weather_records {where}"),
+            params)
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = gzip.open(path, 'wt', encoding='utf-8', newline='') if path.endswith('.gz') \
+            else open(path, 'w', encoding='utf-8', newline='')
+        self.header = True
+
+    def write(self, chunk):
+        chunk.to_csv(self.file, header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlSink:
+    def __init__(self, path):
+        self.file = gzip.open(path, 'wt', encoding='utf-8') if path.endswith('.gz') \
+            else open(path, 'w', encoding='utf-8')
+
+    def write(self, chunk):
+        if len(chunk):
+            self.file.write(chunk.to_json(orient='records', lines=True, date_format='iso', force_ascii=False))
+            self.file.write('\n')
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """One row group per chunk; the schema is fixed by the first chunk."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("✗ Parquet export needs the pyarrow package (pip install pyarrow)")
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.schema = None
+        self.writer = None
+
+    def _schema_for(self, chunk):
+        # Integers as nullable int64 and everything non-numeric as string, so later chunks
+        # with NULLs or other values still fit the schema of the first one
+        pa = self.pa
+        fields = []
+        for column, dtype in chunk.dtypes.items():
+            if pd.api.types.is_bool_dtype(dtype):
+                fields.append(pa.field(column, pa.bool_()))
+            elif pd.api.types.is_integer_dtype(dtype):
+                fields.append(pa.field(column, pa.int64()))
+            elif pd.api.types.is_numeric_dtype(dtype):
+                fields.append(pa.field(column, pa.float64()))
+            elif pd.api.types.is_datetime64_any_dtype(dtype):
+                fields.append(pa.field(column, pa.timestamp('us')))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        return pa.schema(fields)
+
+    def write(self, chunk):
+        if self.writer is None:
+            self.schema = self._schema_for(chunk)
+            self.writer = self.pq.ParquetWriter(self.path, self.schema, compression='zstd')
+        strings = [field.name for field in self.schema if field.type == self.pa.string()]
+        chunk = chunk.astype({column: 'string' for column in strings})
+        self.writer.write_table(self.pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+SINKS = {'csv': CsvSink, 'parquet': ParquetSink, 'jsonl': JsonlSink}
+
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def progress_line(rows, total, elapsed, path):
+    percent = f" ({rows / total:.0%})" if total else ""
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    line = f"  {rows:,}{f' of {total:,}' if total else ''} rows{percent}, {rate:,.0f} rows/s"
+    try:
+        line += f", {os.path.getsize(path) / (1024 * 1024):.1f} MB written"
+    except OSError:
+        pass
+    peak = peak_memory_mb()
+    if peak is not None:
+        line += f", peak memory {peak:.0f} MB"
+    return line
+
+
+def export(path, columns=None, start=None, end=None, towns=None, states=None, chunk_size=CHUNK_SIZE,
+           count=True):
+    """Streams the filtered rows of weather_records into path; returns the number of rows written."""
+    fmt = export_format(path)
+    query, count_query, params = build_query(columns, start, end, towns, states)
+
+    total = None
+    if count:
+        with engine.connect() as connection:
+            total = connection.execute(count_query, params).scalar()
+        print(f"Exporting {total:,} rows to {path} ({fmt})...")
+    else:
+        print(f"Exporting to {path} ({fmt})...")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    os.close(fd)
+    sink = SINKS[fmt](tmp_path)
+    rows = 0
+    started = time.perf_counter()
+    try:
+        # stream_results makes pymysql use an unbuffered server-side cursor
+        with engine.connect().execution_options(stream_results=True, max_row_buffer=chunk_size) as connection:
+            for chunk in pd.read_sql_query(query, connection, params=params, chunksize=chunk_size):
+                sink.write(chunk)
+                rows += len(chunk)
+                print(progress_line(rows, total, time.perf_counter() - started, tmp_path))
+        sink.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        sink.close()
+        # Never leave a partial export behind
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ Exported {rows:,} rows to {path} in {elapsed:.1f}s "
+          f"({rows / elapsed if elapsed > 0 else 0:,.0f} rows/s, {os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export weather_records in chunks to CSV.gz, Parquet or JSONL.")
+    parser.add_argument('output', help="output file: .csv.gz, .csv, .parquet, .jsonl or .jsonl.gz")
+    parser.add_argument('--start', help="first recorded_at to export (ISO, inclusive)")
+    parser.add_argument('--end', help="recorded_at to stop at (ISO, exclusive)")
+    parser.add_argument('--town', action='append', help="only this town (repeatable)")
+    parser.add_argument('--state', action='append', help="only this federal state (repeatable)")
+    parser.add_argument('--columns', help="comma-separated columns to export (default: all)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help=f"rows per chunk (default: {CHUNK_SIZE})")
+    parser.add_argument('--no-count', action='store_true', help="skip the COUNT(*) used for progress percentages")
+    args = parser.parse_args()
+    try:
+        export(args.output, args.columns.split(',') if args.columns else None, args.start, args.end,
+               args.town, args.state, args.chunk_size, count=not args.no_count)
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
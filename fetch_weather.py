@@ -2,9 +2,16 @@ import pandas as pd
 import requests
 from datetime import datetime
 from sqlalchemy import create_engine
+import argparse
 import os
+import time
 from dotenv import load_dotenv
 
+from file_utils import atomic_write_text
+from snapshot_arrow import publish_snapshot
+from weather_stats import compute_stats, save_stats
+from write_behind import WriteBehindQueue
+
 load_dotenv() # Load environment variables from .env
 
 # MySQL connection settings for geodata
@@ -15,26 +22,19 @@ MYSQL_PORT = int(os.getenv("MYSQL_PORT"))
 GEODATA_DATABASE = "geodata"
 GEODATA_TABLE = "austrian_towns_new"
 
-# Create SQLAlchemy engine for the geodata database
-geodata_engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{GEODATA_DATABASE}")
-
-print(f"Fetching towns from database {GEODATA_DATABASE}.{GEODATA_TABLE}...")
+OPENMETEO_DATABASE = "OpenMeteo" # This is the database for weather records
+WEATHER_TABLE = "weather_records"
+CSV_FILENAME = "austria_towns_current_weather.csv"
 
-try:
-    # Read towns data from the database
-    df = pd.read_sql_table(GEODATA_TABLE, con=geodata_engine)
-    
-    # Optional: sort by population descending (as in generate_towns.py and original fetch_weather.py)
-    df = df.sort_values("inhabitants", ascending=False).reset_index(drop=True)
-    
-    # Add rank column
+# Write-behind queue between the fetch and the CSV/database writes
+WRITE_QUEUE_FRAMES = int(os.getenv("FETCH_WRITE_QUEUE_FRAMES", "8"))
+WRITE_METRICS_FILE = os.path.join(".cache", "write_behind.json")
+# Batches a sink couldn't write; written again before its next batch, also after a restart
+WRITE_SPILL_DIR = os.path.join(".cache", "write_behind")
 
-    
-    print(f"✓ Successfully fetched {len(df)} towns from the database.")
-    
-except Exception as e:
-    print(f"✗ Error fetching towns from database: {e}")
-    exit() # Exit if we can't get town data
+# Create SQLAlchemy engines for the geodata and OpenMeteo databases
+geodata_engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{GEODATA_DATABASE}")
+openmeteo_engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{OPENMETEO_DATABASE}")
 
 # Open Meteo API endpoint for current weather
 API_URL = "https://api.open-meteo.com/v1/forecast"
@@ -58,23 +58,47 @@ CURRENT_PARAMS = [
     "surface_pressure"
 ]
 
-# Prepare coordinates as comma-separated strings
-latitudes = ",".join(df["latitude"].astype(str))
-longitudes = ",".join(df["longitude"].astype(str))
 
-# Make API request
-params = {
-    "latitude": latitudes,
-    "longitude": longitudes,
-    "current": ",".join(CURRENT_PARAMS),
-    "temperature_unit": "celsius",
-    "wind_speed_unit": "kmh"
-}
+def load_towns():
+    """Towns from the geodata database, largest first; None if they can't be read."""
+    print(f"Fetching towns from database {GEODATA_DATABASE}.{GEODATA_TABLE}...")
+    try:
+        # Read towns data from the database
+        # Only the town columns; the table also carries a surrogate id that weather_records doesn't have
+        df = pd.read_sql_table(GEODATA_TABLE, con=geodata_engine,
+                               columns=["town", "federal_state", "longitude", "latitude", "inhabitants"])
+
+        # Sort by population descending (as in generate_towns.py and original fetch_weather.py)
+        df = df.sort_values("inhabitants", ascending=False).reset_index(drop=True)
+
+        # Add rank column; derived here, the towns table doesn't store it
+        df.insert(0, "rank", range(1, len(df) + 1))
+
+        print(f"✓ Successfully fetched {len(df)} towns from the database.")
+        return df
+    except Exception as e:
+        print(f"✗ Error fetching towns from database: {e}")
+        return None
+
 
-print(f"Fetching current weather for {len(df)} towns...")
-print(f"API URL: {API_URL}")
+def fetch_current(df):
+    """Current weather for all towns in df, one row per town with the recorded_at columns; None on a bad response."""
+    # Prepare coordinates as comma-separated strings
+    latitudes = ",".join(df["latitude"].astype(str))
+    longitudes = ",".join(df["longitude"].astype(str))
+
+    # Make API request
+    params = {
+        "latitude": latitudes,
+        "longitude": longitudes,
+        "current": ",".join(CURRENT_PARAMS),
+        "temperature_unit": "celsius",
+        "wind_speed_unit": "kmh"
+    }
+
+    print(f"Fetching current weather for {len(df)} towns...")
+    print(f"API URL: {API_URL}")
 
-try:
     response = requests.get(API_URL, params=params)
     print(f"Full request URL: {response.url}")
     response.raise_for_status()
@@ -99,8 +123,7 @@ try:
             weather_data.append(current)
     else:
         print("✗ Unexpected API response format.")
-        exit()
-
+        return None
 
     # Create a dataframe from the weather data
     weather_df = pd.DataFrame(weather_data)
@@ -122,44 +145,120 @@ try:
             print(f"Timezone: {data.get('timezone', 'N/A')}")
         elif isinstance(data, list):
             print(f"Timezone: {data[0].get('timezone', 'N/A')}")
+    return result_df
+
+
+def write_csv(batch):
+    """CSV sink: the latest observation per town of the batch."""
+    latest = batch.drop_duplicates(subset=['town'], keep='last')
+    atomic_write_text(CSV_FILENAME, latest.to_csv(index=False))
+    print(f"✓ Saved to {CSV_FILENAME}")
+
+
+def write_db(batch):
+    """Database sink: all rows of the batch in multi-row INSERTs."""
+    batch.to_sql(WEATHER_TABLE, con=openmeteo_engine, if_exists='append', index=False, method='multi',
+                 chunksize=1000)
+    print(f"✓ Saved {len(batch)} rows to MySQL database {OPENMETEO_DATABASE}.{WEATHER_TABLE}")
 
-    # Show sample data
-    print("\n" + "="*100)
-    print("SAMPLE DATA (first 5 towns):")
-    print("="*100)
-    sample_cols = ["rank", "town", "federal_state", "temperature_2m", "relative_humidity_2m",
-                   "apparent_temperature", "wind_speed_10m", "weather_code", "cloud_cover"]
-    print(result_df[sample_cols].head())
-
-    # Show all columns available
-    print("\n" + "="*100)
-    print("ALL AVAILABLE WEATHER COLUMNS:")
-    print("="*100)
-    weather_cols = [col for col in result_df.columns if col not in df.columns]
-    print(weather_cols)
-
-    # Save to CSV
-    csv_filename = "austria_towns_current_weather.csv"
-    result_df.to_csv(csv_filename, index=False, encoding="utf-8")
-    print(f"✓ Saved to {csv_filename}")
-
-    # Save to OpenMeteo database
-    OPENMETEO_DATABASE = "OpenMeteo" # This is the database for weather records
-    openmeteo_engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{OPENMETEO_DATABASE}")
-
-    table_name = "weather_records"
-    result_df.to_sql(table_name, con=openmeteo_engine, if_exists='append', index=False)
-    print(f"✓ Saved to MySQL database {OPENMETEO_DATABASE}.{table_name}")
-
-    # Display full weather data for first town as example
-    print("\n" + "="*100)
-    print(f"DETAILED WEATHER FOR: {result_df.loc[0, 'town']}")
-    print("="*100)
-    print(f"Recorded at: {result_df.loc[0, 'recorded_at']}")
-    for col in weather_cols:
-        print(f"{col}: {result_df.loc[0, col]}")
-
-except requests.exceptions.RequestException as e:
-    print(f"✗ Error fetching data from Open-Meteo API: {e}")
-except Exception as e:
-    print(f"✗ Error processing data: {e}")
\ No newline at end of file
+
+def run_cycle(df, writer):
+    """Fetches once and queues the result for writing; True if weather was fetched."""
+    try:
+        result_df = fetch_current(df)
+        if result_df is None:
+            return False
+
+        # Show sample data
+        print("\n" + "="*100)
+        print("SAMPLE DATA (first 5 towns):")
+        print("="*100)
+        sample_cols = ["rank", "town", "federal_state", "temperature_2m", "relative_humidity_2m",
+                       "apparent_temperature", "wind_speed_10m", "weather_code", "cloud_cover"]
+        print(result_df[sample_cols].head())
+
+        # Show all columns available
+        print("\n" + "="*100)
+        print("ALL AVAILABLE WEATHER COLUMNS:")
+        print("="*100)
+        weather_cols = [col for col in result_df.columns if col not in df.columns]
+        print(weather_cols)
+
+        # CSV and database are written by the writer thread; this only waits if the queue is full
+        writer.put(result_df)
+        print(f"✓ Queued for CSV and {OPENMETEO_DATABASE}.{WEATHER_TABLE} (queue depth {writer.depth()})")
+
+        # Statistics of this ingest, read by the renderers instead of recomputing them
+        save_stats(compute_stats(result_df))
+        print("✓ Saved weather statistics")
+
+        # Latest snapshot and the last 24 hours as Arrow files; the dashboard and renderers map them instead of querying
+        snapshot = publish_snapshot(result_df)
+        print(f"✓ Published snapshot {snapshot['latest']} ({snapshot['rows']} towns, "
+              f"{snapshot['history_rows']} rows in the last 24h)")
+
+        # Display full weather data for first town as example
+        print("\n" + "="*100)
+        print(f"DETAILED WEATHER FOR: {result_df.loc[0, 'town']}")
+        print("="*100)
+        print(f"Recorded at: {result_df.loc[0, 'recorded_at']}")
+        for col in weather_cols:
+            print(f"{col}: {result_df.loc[0, col]}")
+        return True
+
+    except requests.exceptions.RequestException as e:
+        print(f"✗ Error fetching data from Open-Meteo API: {e}")
+    except Exception as e:
+        print(f"✗ Error processing data: {e}")
+    return False
+
+
+def print_write_metrics(writer):
+    m = writer.metrics()
+    lag = f"{m['last_lag']:.1f}s" if m['last_lag'] is not None else "-"
+    print(f"Write-behind: {m['frames_written']}/{m['frames_enqueued']} frames written in {m['batches']} batches, "
+          f"depth {m['depth']}, last lag {lag}, max lag {m['max_lag']:.1f}s, {m['blocked_puts']} blocked puts")
+    for name, sink in m['sinks'].items():
+        if sink['failures'] or sink['last_error']:
+            print(f"  ✗ {name}: {sink['failures']} failed batches ({sink['spilled']} spilled, "
+                  f"{sink['replayed']} written later), last error: {sink['last_error']}")
+    if m['errors']:
+        print(f"  ✗ {m['errors']} batches failed in the writer: {m['last_error']}")
+
+
+def main(interval=None):
+    """One fetch, or one every `interval` seconds until interrupted; queued writes are flushed before exiting."""
+    df = load_towns()
+    if df is None:
+        return False
+
+    writer = WriteBehindQueue({'csv': write_csv, 'db': write_db}, max_frames=WRITE_QUEUE_FRAMES,
+                              metrics_path=WRITE_METRICS_FILE, spill_dir=WRITE_SPILL_DIR).start()
+    try:
+        while True:
+            started = time.monotonic()
+            run_cycle(df, writer)
+            if not interval:
+                break
+            print_write_metrics(writer)
+            # Cycles start on a fixed grid; a cycle that overran skips to the next slot
+            elapsed = time.monotonic() - started
+            if elapsed > interval:
+                print(f"✗ Cycle took {elapsed:.0f}s, longer than the {interval}s interval")
+            time.sleep(interval - elapsed % interval)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        print(f"Flushing {writer.depth()} queued frames...")
+        writer.close()
+        print_write_metrics(writer)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch the current weather for all towns and store it.")
+    parser.add_argument('--interval', type=int, default=None,
+                        help="fetch every INTERVAL seconds until interrupted (default: fetch once)")
+    args = parser.parse_args()
+    if not main(args.interval):
+        exit()
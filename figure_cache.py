@@ -0,0 +1,70 @@
+"""Thread-safe LRU cache for pre-serialized Plotly figure JSON, optionally backed by a shared cache."""
+import threading
+from collections import OrderedDict
+
+from single_flight import SingleFlight
+
+
+class FigureCache:
+    """Maps keys such as (town, recorded_at, theme) to figure JSON strings, evicting the least recently used."""
+
+    def __init__(self, max_entries=256, backing=None):
+        self.max_entries = max_entries
+        # Optional second tier shared with other processes (e.g. shared_cache.FileCache)
+        self.backing = backing
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Concurrent misses for the same key build the figure only once
+        self._flight = SingleFlight()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_build(self, key, build):
+        """Returns the cached value for key, calling build() and caching its result on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        return self._flight.do(key, lambda: self._load_or_build(key, build))
+
+    def _load_or_build(self, key, build):
+        # Another caller may have finished building between our get() and taking the flight
+        with self._lock:
+            value = self._entries.get(key)
+        if value is not None:
+            return value
+        if self.backing is not None:
+            value = self.backing.get(key)
+            if value is not None:
+                self.put(key, value)
+                return value
+        value = build()
+        self.put(key, value)
+        if self.backing is not None:
+            self.backing.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            stats = {'entries': len(self._entries), 'max_entries': self.max_entries,
+                     'hits': self.hits, 'misses': self.misses}
+        stats['single_flight'] = self._flight.stats()
+        if self.backing is not None:
+            stats['backing'] = self.backing.stats()
+        return stats
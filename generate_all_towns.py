@@ -0,0 +1,27 @@
+import time
+
+import town_scraper
+import generate_towns
+import generate_swiss_towns
+import generate_german_towns
+
+# Per-country geocoding/CSV step of the existing generate_* scripts
+COUNTRY_SCRIPTS = {
+    'AT': generate_towns,
+    'CH': generate_swiss_towns,
+    'DE': generate_german_towns,
+}
+
+def main():
+    print("Scraping town lists for all countries in parallel...")
+    start = time.perf_counter()
+    scraped = town_scraper.scrape_all(COUNTRY_SCRIPTS)
+    print(f"✓ Scraped {sum(len(t) for t in scraped.values())} towns in {time.perf_counter() - start:.1f}s")
+
+    # Geocoding stays sequential so Nominatim only ever sees one client at a time
+    for country, towns in scraped.items():
+        print(f"\n=== {country} ===")
+        COUNTRY_SCRIPTS[country].main(towns)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Static site with a page per town in geodata.all_towns and per federal state/canton.
+
+The latest observation per town is joined onto all_towns by (country, town) (as
+on the dashboard's map), every page's inputs are hashed, and only pages whose hash
+differs from the last run's manifest are rendered, fanned out over a process
+pool. Pages of towns that disappeared are removed, and sitemap.xml lists the rest.
+
+    python generate_site.py [--force] [--workers N]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+import pandas as pd
+import plotly.graph_objects as go
+from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy import create_engine
+
+from dashboard_map import ALL_TOWNS_QUERY, join_weather
+from dashboard_snapshot import LATEST_PER_TOWN_QUERY
+from file_utils import atomic_write_text
+from static_assets import plotly_js_path, relative_url, write_file
+from weather_loader import read_weather
+
+load_dotenv() # Load environment variables from .env
+
+# MySQL connection settings
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT"))
+MYSQL_DATABASE = "OpenMeteo"
+GEODATA_DATABASE = "geodata"
+
+engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}")
+geodata_engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{GEODATA_DATABASE}")
+
+SITE_DIR = "site"
+ASSET_DIR = os.path.join(SITE_DIR, "assets")
+SITEMAP_FILE = "sitemap.xml"
+# sitemap.xml needs absolute URLs
+SITE_BASE_URL = os.getenv("SITE_BASE_URL", "http://localhost:8000/")
+
+# Page path -> input hash of the last render
+MANIFEST_FILE = os.path.join(".cache", "site_manifest.json")
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+TEMPLATE_ENV = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(['html', 'j2']))
+SITE_TEMPLATES = ['site_base.html.j2', 'site_index.html.j2', 'state.html.j2', 'town.html.j2']
+
+# Readings on a town page: (column, label, format)
+TOWN_READINGS = [
+    ('temperature_2m', "Temperature", "{:.1f}°C"),
+    ('apparent_temperature', "Feels Like", "{:.1f}°C"),
+    ('relative_humidity_2m', "Humidity", "{:.0f}%"),
+    ('wind_speed_10m', "Wind Speed", "{:.1f} km/h"),
+    ('wind_gusts_10m', "Wind Gusts", "{:.1f} km/h"),
+    ('cloud_cover', "Cloud Cover", "{:.0f}%"),
+    ('pressure_msl', "Pressure", "{:.1f} hPa"),
+    ('precipitation', "Precipitation", "{:.1f} mm"),
+]
+TEXT_COLUMNS = ['weather_description', 'recorded_at']
+
+
+def slugify(value):
+    value = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', value.lower()).strip('-') or 'x'
+
+
+def town_path(town):
+    # The ID keeps towns with the same name in different states apart
+    return f"towns/{town['ID']}-{slugify(town['town'])}.html"
+
+
+def state_path(country, state):
+    return f"states/{slugify(country)}-{slugify(state)}.html"
+
+
+def load_towns():
+    towns = pd.read_sql_query(ALL_TOWNS_QUERY, geodata_engine)
+    return towns.dropna(subset=['longitude', 'latitude']).reset_index(drop=True)
+
+
+def load_weather():
+    columns = ['town', *[column for column, _, _ in TOWN_READINGS], *TEXT_COLUMNS]
+    return read_weather(engine, LATEST_PER_TOWN_QUERY, columns, where="", label='site', verbose=True)
+
+
+def joined_frame(towns, weather):
+    """all_towns with the latest readings; missing values are None so the records hash as JSON."""
+    numeric = [column for column, _, _ in TOWN_READINGS if column in weather]
+    columns = numeric + [column for column in TEXT_COLUMNS if column in weather]
+    frame = join_weather(towns, weather, columns, numeric=numeric)
+    frame['inhabitants'] = pd.to_numeric(frame['inhabitants'], errors='coerce').astype('Int64')
+    for column in [*numeric, *TEXT_COLUMNS]:
+        if column not in frame:
+            frame[column] = None
+    frame = frame.sort_values(['country', 'state', 'town'])
+    return frame.astype(object).where(frame.notna(), None)
+
+
+def town_context(town, state_url):
+    readings = [{'label': label, 'value': value_format.format(town[column])}
+                for column, label, value_format in TOWN_READINGS if town.get(column) is not None]
+    return {'town': {**town, 'readings': readings}, 'state_url': state_url,
+            'watermark': town['recorded_at'], 'root': "../", 'plotly_js': None}
+
+
+def state_summary(country, state, towns):
+    observed = [t for t in towns if t['temperature_2m'] is not None]
+    summary = {'country': country, 'state': state, 'town_count': len(towns), 'observed_count': len(observed),
+               'mean_temperature': None, 'warmest': None, 'coldest': None}
+    if observed:
+        summary['mean_temperature'] = sum(t['temperature_2m'] for t in observed) / len(observed)
+        summary['warmest'] = max(observed, key=lambda t: t['temperature_2m'])
+        summary['coldest'] = min(observed, key=lambda t: t['temperature_2m'])
+    return summary
+
+
+def build_pages(frame, plotly_js):
+    """Returns [(page path, template name, context)] for the index, every state and every town."""
+    pages = []
+    states = []
+    for (country, state), group in frame.groupby(['country', 'state'], sort=False):
+        path = state_path(country, state)
+        towns = []
+        for town in group.to_dict('records'):
+            town['url'] = "../" + town_path(town)
+            towns.append(town)
+            pages.append((town_path(town), 'town.html.j2', town_context(town, "../" + path)))
+
+        summary = state_summary(country, state, towns)
+        watermarks = [t['recorded_at'] for t in towns if t['recorded_at'] is not None]
+        pages.append((path, 'state.html.j2', {
+            'state': summary, 'towns': towns, 'watermark': max(watermarks, default=None), 'root': "../",
+            # The worker builds the chart; the page loads the shared plotly.js bundle
+            'plotly_js': relative_url(plotly_js, os.path.join(SITE_DIR, path)) if summary['observed_count'] else None,
+        }))
+        states.append({**summary, 'url': path})
+
+    watermarks = [w for w in frame['recorded_at'] if w is not None]
+    pages.append(('index.html', 'site_index.html.j2', {
+        'states': states, 'town_count': len(frame), 'watermark': max(watermarks, default=None),
+        'root': "", 'plotly_js': None,
+    }))
+    return pages
+
+
+def template_fingerprint():
+    digest = hashlib.sha256()
+    for name in SITE_TEMPLATES:
+        with open(os.path.join(TEMPLATE_DIR, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def page_hash(fingerprint, template_name, context):
+    payload = json.dumps([fingerprint, template_name, context], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def state_figure_html(towns):
+    observed = sorted((t for t in towns if t['temperature_2m'] is not None), key=lambda t: t['temperature_2m'])
+    fig = go.Figure(go.Bar(
+        x=[t['temperature_2m'] for t in observed],
+        y=[t['town'] for t in observed],
+        orientation='h',
+        marker=dict(color=[t['temperature_2m'] for t in observed], colorscale='RdBu_r'),
+        hovertemplate='<b>%{y}</b><br>Temperature: %{x:.1f}°C<extra></extra>',
+    ))
+    fig.update_layout(height=max(300, 22 * len(observed) + 120), margin=dict(l=10, r=10, t=40, b=40),
+                      title_text='Temperature by Town', xaxis_title='Temperature (°C)', template='plotly_white')
+    return fig.to_html(full_html=False, include_plotlyjs=False, config={'responsive': True})
+
+
+def render_page(job):
+    """Renders and writes one page; runs in a worker process."""
+    path, template_name, context = job
+    figure_html = state_figure_html(context['towns']) if context.get('plotly_js') else ""
+    html = TEMPLATE_ENV.get_template(template_name).render(figure_html=figure_html, **context)
+    write_file(os.path.join(SITE_DIR, path), html)
+    return path
+
+
+def read_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def remove_page(path):
+    for suffix in ('', '.gz', '.br'):
+        try:
+            os.remove(os.path.join(SITE_DIR, path) + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def write_sitemap(paths):
+    urls = "\n".join(f"  <url><loc>{escape(SITE_BASE_URL + path)}</loc></url>" for path in sorted(paths))
+    write_file(os.path.join(SITE_DIR, SITEMAP_FILE),
+               '<?xml version="1.0" encoding="UTF-8"?>\n'
+               f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n{urls}\n</urlset>\n')
+
+
+def main(force=False, workers=None):
+    start = time.perf_counter()
+    print("Loading towns and latest weather...")
+    frame = joined_frame(load_towns(), load_weather())
+    pages = build_pages(frame, plotly_js_path(ASSET_DIR))
+
+    fingerprint = template_fingerprint()
+    previous = {} if force else read_manifest()
+    manifest = {}
+    jobs = []
+    for path, template_name, context in pages:
+        manifest[path] = page_hash(fingerprint, template_name, context)
+        if previous.get(path) != manifest[path] or not os.path.exists(os.path.join(SITE_DIR, path)):
+            jobs.append((path, template_name, context))
+
+    workers = workers or os.cpu_count() or 1
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            # Chunks amortize the pickling of contexts over several pages
+            chunksize = max(1, len(jobs) // (workers * 4))
+            for _ in executor.map(render_page, jobs, chunksize=chunksize):
+                pass
+
+    stale = set(read_manifest()) - set(manifest)
+    for path in stale:
+        remove_page(path)
+    if jobs or stale or not os.path.exists(os.path.join(SITE_DIR, SITEMAP_FILE)):
+        write_sitemap(manifest)
+    atomic_write_text(MANIFEST_FILE, json.dumps(manifest, indent=0, sort_keys=True))
+
+    print(f"✓ {len(jobs)} of {len(pages)} pages rendered, {len(pages) - len(jobs)} unchanged, "
+          f"{len(stale)} removed in {time.perf_counter() - start:.1f}s (workers: {workers})")
+    return len(jobs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the per-town and per-state static site into site/.")
+    parser.add_argument('--force', action='store_true', help="render all pages even if their data is unchanged")
+    parser.add_argument('--workers', type=int, default=None, help="render processes (default: CPU count)")
+    args = parser.parse_args()
+    main(force=args.force, workers=args.workers)
@@ -1,103 +1,12 @@
 import requests
-from bs4 import BeautifulSoup
 import time
 import json
-import re
 import pandas as pd
 
-def get_population(text):
-    # Remove references and commas/dots
-    text = re.sub(r'\[[^\]]*\]', '', text)
-    text = text.replace(',', '').replace('.', '')
-    try:
-        return int(text.strip())
-    except ValueError:
-        return 0
+import town_scraper
 
 def fetch_top_towns():
-    url = "https://en.wikipedia.org/wiki/Cities_in_Switzerland"
-    response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    towns = []
-
-    for table in soup.find_all('table', class_='wikitable'):
-        headers = [th.text.strip() for th in table.find_all('th')]
-        if not headers:
-            # Try first row as header if no th
-            headers = [td.text.strip() for td in table.find_all('tr')[0].find_all('td')]
-
-        has_population_header = False
-        for h in headers:
-            if 'Population' in h:
-                has_population_header = True
-                break
-
-        if ('Name' in headers or 'Town' in headers) and has_population_header:
-            try:
-                name_idx = -1
-                pop_idx = -1
-                canton_idx = -1
-
-                # Find Name or Town index
-                for i, h in enumerate(headers):
-                    if 'Name' in h or 'Town' in h:
-                        name_idx = i
-                        break
-
-                # Find Population index (more flexibly)
-                for i, h in enumerate(headers):
-                    if 'Population' in h:
-                        pop_idx = i
-                        break
-
-                # Find Canton index
-                for i, h in enumerate(headers):
-                    if 'Canton' in h:
-                        canton_idx = i
-                        break
-
-                if name_idx == -1 or pop_idx == -1:
-                    continue
-
-                # Iterate rows
-                for row in table.find_all('tr')[1:]:
-                    cols = row.find_all(['td', 'th'])
-                    if len(cols) > max(name_idx, pop_idx):
-                        name = re.sub(r'\[[^\]]*\]|\([^)]*\)', '', cols[name_idx].text).strip()
-                        pop_str = cols[pop_idx].text.strip()
-                        population = get_population(pop_str)
-
-                        canton = "Unknown"
-                        # Try to find canton from table column if it exists
-                        if canton_idx != -1 and len(cols) > canton_idx:
-                            canton = cols[canton_idx].text.strip()
-                        else:
-                            # Fallback to finding canton from nearby header
-                            prev = table.find_previous(['h2', 'h3'])
-                            if prev:
-                                canton_cand = prev.text.strip()
-                                if canton_cand:
-                                    canton = canton_cand
-
-                        if population > 0 and canton != "Unknown":
-                            towns.append({
-                                'town': name,
-                                'canton': canton,
-                                'inhabitants': population
-                            })
-            except Exception as e:
-                continue
-
-    # Dedup by name + canton (just in case)
-    unique_towns = {}
-    for t in towns:
-        key = (t['town'], t['canton'])
-        if key not in unique_towns or unique_towns[key]['inhabitants'] < t['inhabitants']:
-            unique_towns[key] = t
-
-    sorted_towns = sorted(unique_towns.values(), key=lambda x: x['inhabitants'], reverse=True)
-    return sorted_towns[:200]
+    return town_scraper.fetch_top_towns("CH")
 
 def get_coordinates(town, canton):
     base_url = "https://nominatim.openstreetmap.org/search"
@@ -125,9 +34,9 @@ def get_coordinates(town, canton):
         print(f"Error geocoding {town}: {e}")
     return None, None
 
-def main():
+def main(towns=None):
     print("Fetching Swiss towns...")
-    top_100 = fetch_top_towns()
+    top_100 = towns if towns is not None else fetch_top_towns()
     print(f"Found {len(top_100)} towns. Fetching coordinates...")
 
     final_data = []
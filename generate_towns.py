@@ -1,109 +1,12 @@
 import requests
-from bs4 import BeautifulSoup
 import time
 import json
-import re
 import pandas as pd
 
-def get_population(text):
-    # Remove references like [1] and commas/dotspro
-    text = re.sub(r'[[^]]*]', '', text)
-    text = text.replace(',', '').replace('.', '')
-    try:
-        return int(text.strip())
-    except ValueError:
-        return 0
+import town_scraper
 
 def fetch_top_towns():
-    url = "https://en.wikipedia.org/wiki/List_of_cities_and_towns_in_Austria"
-    response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-    # print(f"Status code: {response.status_code}") # Removed debug print
-    # print(f"Content length: {len(response.content)}") # Removed debug print
-    soup = BeautifulSoup(response.content, 'html.parser')
-    
-    towns = []
-    
-    # print(f"Number of wikitable tables found: {len(soup.find_all('table', class_='wikitable'))}") # Removed debug print
-    
-    for table in soup.find_all('table', class_='wikitable'):
-        headers = [th.text.strip() for th in table.find_all('th')]
-        if not headers:
-             # Try first row as header if no th
-            headers = [td.text.strip() for td in table.find_all('tr')[0].find_all('td')]
-
-        # print(f"Table headers: {headers}") # Removed debug print
-
-        has_population_header = False
-        for h in headers:
-            if 'Population' in h:
-                has_population_header = True
-                break
-        
-        if 'Name' in headers and has_population_header:
-            # print("Found table with 'Name' and 'Population' headers.") # Removed debug print
-            try:
-                name_idx = -1
-                pop_idx = -1
-                
-                # Find Name index
-                for i, h in enumerate(headers):
-                    if 'Name' in h:
-                        name_idx = i
-                        break 
-                
-                # Find Population index (more flexibly)
-                for i, h in enumerate(headers):
-                    if 'Population' in h:
-                        pop_idx = i
-                        break 
-                
-                # print(f"Detected Name index: {name_idx}, Population index: {pop_idx}") # Removed debug print
-                
-                if name_idx == -1 or pop_idx == -1:
-                    # print(f"Skipping table due to missing Name or Population header (Name_idx: {name_idx}, Pop_idx: {pop_idx})") # Removed debug print
-                    continue
-
-                # Iterate rows
-                for row in table.find_all('tr')[1:]:
-                    cols = row.find_all(['td', 'th'])
-                    if len(cols) > max(name_idx, pop_idx):
-                        name = cols[name_idx].text.strip()
-                        pop_str = cols[pop_idx].text.strip()
-                        population = get_population(pop_str)
-                        
-                        # print(f"  Extracted - Name: '{name}', Population Str: '{pop_str}', Population: {population}") # Removed debug print
-                        
-                        state = "Unknown"
-                        prev = table.find_previous(['h2', 'h3'])
-                        if prev:
-                            state_cand = prev.text.strip().replace('[edit]', '')
-                            if state_cand in ['Burgenland', 'Carinthia', 'Lower Austria', 'Salzburg', 'Styria', 'Tyrol', 'Upper Austria', 'Vienna', 'Vorarlberg']:
-                                state = state_cand
-                        
-                        if state == "Unknown" and name == "Vienna":
-                            state = "Vienna"
-
-                        if population > 0 and state != "Unknown":
-                            towns.append({
-                                'town': name,
-                                'federal_state': state,
-                                'inhabitants': population
-                            })
-                            # print(f"  Added town: {name} ({population})") # Removed debug print
-            except Exception as e:
-                # print(f"Error parsing table: {e}")
-                continue
-
-    # Dedup by name + state (just in case)
-    unique_towns = {}
-    for t in towns:
-        key = (t['town'], t['federal_state'])
-        if key not in unique_towns or unique_towns[key]['inhabitants'] < t['inhabitants']:
-            unique_towns[key] = t
-            
-    sorted_towns = sorted(unique_towns.values(), key=lambda x: x['inhabitants'], reverse=True)
-    # print(f"Collected {len(sorted_towns)} unique towns after deduplication and sorting.") # Removed debug print
-    return sorted_towns[:200]
+    return town_scraper.fetch_top_towns("AT")
 
 def get_coordinates(town, state):
     base_url = "https://nominatim.openstreetmap.org/search"
@@ -131,9 +34,9 @@ def get_coordinates(town, state):
         print(f"Error geocoding {town}: {e}")
     return None, None
 
-def main():
+def main(towns=None):
     print("Fetching towns...")
-    top_100 = fetch_top_towns()
+    top_100 = towns if towns is not None else fetch_top_towns()
     print(f"Found {len(top_100)} towns. Fetching coordinates...")
     
     final_data = []
@@ -0,0 +1,273 @@
+"""Preprocessed, simplified GeoJSON/TopoJSON variants of the state polygons.
+
+The polygons are first split into shared arcs (TopoJSON-style: a border between
+two states is stored once), each arc is simplified with Douglas-Peucker at a
+per-zoom pixel tolerance and its coordinates are quantized. Because neighbours
+reference the same simplified arc, no gaps or overlaps open up between states.
+Results are cached on disk, keyed by the source file hash and zoom level.
+"""
+import json
+import math
+import os
+
+import numpy as np
+
+from file_utils import atomic_write_text, file_sha256
+
+GEOJSON_PATH = "geo_data/austria_federal_states.geojson"
+CACHE_DIR = os.path.join(".cache", "geometry")
+
+# Zoom levels to preprocess and the simplification tolerance in screen pixels
+ZOOM_LEVELS = (5, 7, 9)
+PIXEL_TOLERANCE = 1.0
+TOPOJSON_QUANTIZATION = 100_000
+
+# Bump when the output format changes so stale cache files are not reused
+CACHE_VERSION = 1
+
+_memo = {}
+
+
+def degrees_per_pixel(zoom):
+    # Web-mercator tiles are 256 px wide and span 360 degrees at zoom 0
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def coordinate_decimals(zoom):
+    """Number of decimals that still resolves one pixel at this zoom."""
+    return max(0, math.ceil(-math.log10(degrees_per_pixel(zoom))))
+
+
+def _polygons_of(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def _open_ring(ring):
+    points = [tuple(p[:2]) for p in ring]
+    if len(points) > 1 and points[0] == points[-1]:
+        points = points[:-1]
+    return points
+
+
+def _find_junctions(rings):
+    """Points where the set of neighbouring points differs between rings (TopoJSON junctions)."""
+    neighbours = {}
+    junctions = set()
+    for points in rings:
+        n = len(points)
+        for i, p in enumerate(points):
+            pair = frozenset((points[i - 1], points[(i + 1) % n]))
+            seen = neighbours.setdefault(p, pair)
+            if seen != pair:
+                junctions.add(p)
+    return junctions
+
+
+def build_topology(features):
+    """Splits all rings into unique arcs.
+
+    Returns (arcs, geometries): arcs is a list of point tuples, geometries holds
+    per feature a list of polygons -> rings -> arc references (~i = reversed).
+    """
+    rings = [_open_ring(ring)
+             for feature in features
+             for polygon in _polygons_of(feature['geometry'])
+             for ring in polygon]
+    junctions = _find_junctions(rings)
+
+    arcs = []
+    arc_index = {}
+
+    def add_arc(points):
+        points = tuple(points)
+        reverse = points[::-1]
+        key = min(points, reverse)
+        if key not in arc_index:
+            arc_index[key] = len(arcs)
+            arcs.append(key)
+        index = arc_index[key]
+        return index if key == points else ~index
+
+    geometries = []
+    for feature in features:
+        polygons = []
+        for polygon in _polygons_of(feature['geometry']):
+            ring_refs = []
+            for ring in polygon:
+                points = _open_ring(ring)
+                cuts = [i for i, p in enumerate(points) if p in junctions]
+                if not cuts:
+                    # Junction-free ring: rotate to a canonical start so shared rings match
+                    start = points.index(min(points))
+                    points = points[start:] + points[:start]
+                    ring_refs.append([add_arc(points + [points[0]])])
+                    continue
+                points = points[cuts[0]:] + points[:cuts[0]]
+                points.append(points[0])
+                cuts = [i for i, p in enumerate(points) if p in junctions]
+                ring_refs.append([add_arc(points[a:b + 1]) for a, b in zip(cuts, cuts[1:])])
+            polygons.append(ring_refs)
+        geometries.append(polygons)
+    return arcs, geometries
+
+
+def simplify_line(points, tolerance):
+    """Douglas-Peucker simplification keeping both end points; points is an (n, 2) array."""
+    n = len(points)
+    if n < 3:
+        return points
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = points[first + 1:last]
+        start, end = points[first], points[last]
+        dx, dy = end - start
+        length = math.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(segment[:, 0] - start[0], segment[:, 1] - start[1])
+        else:
+            distances = np.abs(dx * (segment[:, 1] - start[1]) - dy * (segment[:, 0] - start[0])) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
+
+
+def simplify_arcs(arcs, zoom):
+    """Simplifies and quantizes every arc once for the given zoom level."""
+    tolerance = PIXEL_TOLERANCE * degrees_per_pixel(zoom)
+    decimals = coordinate_decimals(zoom)
+    simplified = []
+    for arc in arcs:
+        points = np.asarray(arc, dtype=float)
+        result = simplify_line(points, tolerance)
+        closed = len(points) > 1 and np.array_equal(points[0], points[-1])
+        if closed and len(result) < 4:
+            # A closed ring needs at least a triangle
+            result = points[np.linspace(0, len(points) - 1, 4).round().astype(int)]
+        result = np.round(result, decimals)
+        # Quantization can create consecutive duplicates
+        distinct = np.ones(len(result), dtype=bool)
+        distinct[1:] = np.any(result[1:] != result[:-1], axis=1)
+        simplified.append(result[distinct])
+    return simplified
+
+
+def _ring_from_arcs(refs, arcs):
+    coordinates = []
+    for ref in refs:
+        arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+        coordinates.extend(arc.tolist() if not coordinates else arc[1:].tolist())
+    return coordinates
+
+
+def to_geojson(source, geometries, arcs, original_arcs):
+    features = []
+    for feature, polygons in zip(source['features'], geometries):
+        out_polygons = []
+        for polygon in polygons:
+            rings = []
+            for refs in polygon:
+                ring = _ring_from_arcs(refs, arcs)
+                if len(ring) < 4:
+                    # Collapsed by simplification: keep this ring at full resolution
+                    ring = _ring_from_arcs(refs, [np.asarray(a) for a in original_arcs])
+                rings.append(ring)
+            out_polygons.append(rings)
+        geometry = ({'type': 'Polygon', 'coordinates': out_polygons[0]} if len(out_polygons) == 1
+                    else {'type': 'MultiPolygon', 'coordinates': out_polygons})
+        features.append({'type': 'Feature', 'properties': feature.get('properties', {}), 'geometry': geometry})
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def to_topojson(source, geometries, arcs, object_name='states'):
+    all_points = np.vstack(arcs)
+    x0, y0 = all_points.min(axis=0)
+    x1, y1 = all_points.max(axis=0)
+    kx = (x1 - x0) / (TOPOJSON_QUANTIZATION - 1) or 1.0
+    ky = (y1 - y0) / (TOPOJSON_QUANTIZATION - 1) or 1.0
+
+    encoded = []
+    for arc in arcs:
+        quantized = np.round((arc - (x0, y0)) / (kx, ky)).astype(np.int64)
+        # Delta-encode as TopoJSON expects
+        quantized[1:] -= quantized[:-1].copy()
+        encoded.append(quantized.tolist())
+
+    topo_geometries = []
+    for feature, polygons in zip(source['features'], geometries):
+        if len(polygons) == 1:
+            geometry = {'type': 'Polygon', 'arcs': polygons[0]}
+        else:
+            geometry = {'type': 'MultiPolygon', 'arcs': polygons}
+        geometry['properties'] = feature.get('properties', {})
+        topo_geometries.append(geometry)
+
+    return {
+        'type': 'Topology',
+        'transform': {'scale': [kx, ky], 'translate': [float(x0), float(y0)]},
+        'objects': {object_name: {'type': 'GeometryCollection', 'geometries': topo_geometries}},
+        'arcs': encoded,
+    }
+
+
+def _cache_path(path, source_hash, zoom, extension):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{stem}-v{CACHE_VERSION}-{source_hash[:16]}-z{zoom}.{extension}")
+
+
+def preprocess(path=GEOJSON_PATH, zoom_levels=ZOOM_LEVELS, topojson=False):
+    """Builds (or reuses) the simplified variants for every zoom level; returns {zoom: geojson path}."""
+    source_hash = file_sha256(path)
+    wanted = {zoom: _cache_path(path, source_hash, zoom, 'geojson') for zoom in zoom_levels}
+    missing = [zoom for zoom, p in wanted.items()
+               if not os.path.exists(p) or (topojson and not os.path.exists(_cache_path(path, source_hash, zoom, 'topojson')))]
+    if not missing:
+        return wanted
+
+    with open(path, 'r', encoding='utf-8') as f:
+        source = json.load(f)
+    # Topology is built once and shared by all zoom levels
+    original_arcs, geometries = build_topology(source['features'])
+
+    for zoom in missing:
+        arcs = simplify_arcs(original_arcs, zoom)
+        geojson_data = to_geojson(source, geometries, arcs, original_arcs)
+        atomic_write_text(wanted[zoom], json.dumps(geojson_data, separators=(',', ':'), ensure_ascii=False))
+        if topojson:
+            topo = to_topojson(source, geometries, arcs)
+            atomic_write_text(_cache_path(path, source_hash, zoom, 'topojson'),
+                              json.dumps(topo, separators=(',', ':'), ensure_ascii=False))
+    return wanted
+
+
+def load_simplified_geojson(path=GEOJSON_PATH, zoom=7):
+    """Returns the simplified GeoJSON dict for the nearest preprocessed zoom level."""
+    zoom = min(ZOOM_LEVELS, key=lambda z: abs(z - zoom))
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, zoom)
+    if key not in _memo:
+        cache_file = preprocess(path, ZOOM_LEVELS)[zoom]
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            _memo[key] = json.load(f)
+    return _memo[key]
+
+
+if __name__ == "__main__":
+    outputs = preprocess(GEOJSON_PATH, ZOOM_LEVELS, topojson=True)
+    print(f"Source {GEOJSON_PATH}: {os.path.getsize(GEOJSON_PATH) / 1024:.1f} KB")
+    for zoom, geojson_path in outputs.items():
+        topojson_path = geojson_path[:-len('geojson')] + 'topojson'
+        print(f"  zoom {zoom}: {os.path.getsize(geojson_path) / 1024:.1f} KB GeoJSON, "
+              f"{os.path.getsize(topojson_path) / 1024:.1f} KB TopoJSON")
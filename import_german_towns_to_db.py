@@ -3,6 +3,8 @@ from sqlalchemy import create_engine
 import os
 from dotenv import load_dotenv
 
+from towns_upsert import upsert_towns
+
 load_dotenv()  # Load environment variables from .env
 
 # MySQL connection settings
@@ -27,10 +29,12 @@ try:
     print("\nSample data:")
     print(df.head())
 
-    # Import to MySQL database
+    # Apply only the changes to the MySQL table, keyed on (federal_state, town)
     print(f"\n✓ Importing data to {GEODATA_DATABASE}.{TABLE_NAME}...")
-    df.to_sql(TABLE_NAME, con=engine, if_exists='replace', index=False)
-    print(f"✓ Successfully imported {len(df)} rows to {GEODATA_DATABASE}.{TABLE_NAME}")
+    counts = upsert_towns(df, TABLE_NAME, engine,
+                          key_columns=["federal_state", "town"],
+                          value_columns=["longitude", "latitude", "inhabitants"])
+    print(f"✓ {GEODATA_DATABASE}.{TABLE_NAME}: {counts['inserted']} inserted, {counts['updated']} updated, {counts['deleted']} deleted")
 
 except FileNotFoundError:
     print("✗ Error: german_towns.csv not found")
@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 from sqlalchemy import create_engine
 import pymysql # Use pymysql as the MySQL driver
 
+from towns_upsert import upsert_towns
+
 load_dotenv()
 
 # MySQL connection details from environment variables
@@ -20,11 +22,14 @@ def import_swiss_towns_to_db():
     db_connection_str = f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/geodata'
     db_connection = create_engine(db_connection_str)
 
-    # Write the data to a new table named 'swiss_towns_new' in the 'geodata' database
-    # If the table already exists, it will be replaced
-    df.to_sql('swiss_towns_new', db_connection, if_exists='replace', index=False)
+    # Apply only the changes to the 'swiss_towns_new' table in the 'geodata' database,
+    # keyed on (canton, town); existing rows keep their ids
+    counts = upsert_towns(df, 'swiss_towns_new', db_connection,
+                          key_columns=['canton', 'town'],
+                          value_columns=['longitude', 'latitude', 'inhabitants'])
 
-    print("Swiss towns data imported successfully into 'swiss_towns_new' table in 'geodata' database.")
+    print(f"Swiss towns data imported into 'swiss_towns_new' table in 'geodata' database: "
+          f"{counts['inserted']} inserted, {counts['updated']} updated, {counts['deleted']} deleted.")
 
     # No need to explicitly close connection with sqlalchemy engine in this context
     # The engine manages the connections
@@ -3,6 +3,8 @@ from sqlalchemy import create_engine
 import os
 from dotenv import load_dotenv
 
+from towns_upsert import upsert_towns
+
 load_dotenv()  # Load environment variables from .env
 
 # MySQL connection settings
@@ -26,15 +28,15 @@ try:
     print("\nSample data:")
     print(df.head())
 
-    # Add ran
-    # k column
-    df = df.sort_values("inhabitants", ascending=False).reset_index(drop=True)
-    df.insert(0, "rank", range(1, len(df) + 1))
-
-    # Import to MySQL database
+    # Apply only the changes to the MySQL table, keyed on (federal_state, town).
+    # The rank is not stored: it is positional, so one new town would renumber (and update) every
+    # smaller one. Readers derive it from inhabitants (see fetch_weather.py).
     print(f"\n✓ Importing data to {GEODATA_DATABASE}.{TABLE_NAME}...")
-    df.to_sql(TABLE_NAME, con=engine, if_exists='replace', index=False)
-    print(f"✓ Successfully imported {len(df)} rows to {GEODATA_DATABASE}.{TABLE_NAME}")
+    counts = upsert_towns(df, TABLE_NAME, engine,
+                          key_columns=["federal_state", "town"],
+                          value_columns=["longitude", "latitude", "inhabitants"],
+                          obsolete_columns=["rank"])
+    print(f"✓ {GEODATA_DATABASE}.{TABLE_NAME}: {counts['inserted']} inserted, {counts['updated']} updated, {counts['deleted']} deleted")
 
 except FileNotFoundError:
     print("✗ Error: austria_towns.csv not found")
@@ -0,0 +1,64 @@
+"""Production entry point for the Dash weather dashboard.
+
+Runs the app under gunicorn with several worker processes (waitress with
+threads on Windows, where gunicorn is unavailable), without Dash's debug mode
+and reloader, with gzip-compressed responses, and with a filesystem cache
+shared by all workers for the data snapshot and the serialized figures.
+
+    python serve_dashboard.py
+    gunicorn -w 4 -b 0.0.0.0:8050 'serve_dashboard:create_app()'
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from shared_cache import DEFAULT_DIR
+
+load_dotenv() # Load environment variables from .env
+
+HOST = os.getenv("DASHBOARD_HOST", "0.0.0.0")
+PORT = int(os.getenv("DASHBOARD_PORT", "8050"))
+WORKERS = int(os.getenv("DASHBOARD_WORKERS", str(min(4, os.cpu_count() or 1))))
+THREADS = int(os.getenv("DASHBOARD_THREADS", "4"))
+
+
+def create_app():
+    """WSGI app factory; imports the dashboard with the shared cache and compression enabled."""
+    os.environ.setdefault("DASHBOARD_SHARED_CACHE_DIR", DEFAULT_DIR)
+    os.environ.setdefault("DASHBOARD_COMPRESS", "1")
+    # Imported here so every worker process builds its own engine and refresher thread
+    import wetter_dashboard_plotly
+    return wetter_dashboard_plotly.server
+
+
+def run_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class DashboardApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{HOST}:{PORT}")
+            self.cfg.set('workers', WORKERS)
+            self.cfg.set('threads', THREADS)
+            # No preload: the snapshot refresher thread must start inside each worker
+            self.cfg.set('preload_app', False)
+
+        def load(self):
+            return create_app()
+
+    DashboardApplication().run()
+
+
+def run_waitress():
+    from waitress import serve
+
+    serve(create_app(), host=HOST, port=PORT, threads=WORKERS * THREADS)
+
+
+if __name__ == "__main__":
+    if sys.platform == "win32":
+        print(f"✓ Starte waitress auf http://{HOST}:{PORT} mit {WORKERS * THREADS} Threads")
+        run_waitress()
+    else:
+        print(f"✓ Starte gunicorn auf http://{HOST}:{PORT} mit {WORKERS} Workern à {THREADS} Threads")
+        run_gunicorn()
@@ -0,0 +1,67 @@
+"""Filesystem cache shared by all worker processes of the dashboard.
+
+Each entry is one file named after the hash of its key and written atomically,
+so concurrent workers never read partial values. Used as the second tier
+behind the in-process FigureCache and for the shared dashboard snapshot.
+"""
+import hashlib
+import os
+
+from file_utils import atomic_write_text
+
+DEFAULT_DIR = os.path.join(".cache", "dashboard")
+
+
+class FileCache:
+    """Maps keys to text values stored as files in `directory`, keeping at most `max_entries` files."""
+
+    def __init__(self, directory, max_entries=2048):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                value = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        atomic_write_text(self._path(key), value)
+        self._puts += 1
+        # Pruning lists the directory, so only do it every so often
+        if self._puts % 64 == 0:
+            self.prune()
+
+    def prune(self):
+        """Removes the oldest files beyond max_entries."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    continue  # removed by another worker
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+        for _, path in sorted(entries)[:excess]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        return {'directory': self.directory, 'max_entries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,193 @@
+"""Arrow IPC snapshot files: the hand-off from fetch_weather.py to the dashboard and the renderers.
+
+After each ingest fetch_weather.py publishes the latest observation per town
+(latest-<time>.arrow) and the observations of the last HISTORY_WINDOW
+(history-<time>.arrow) to SNAPSHOT_DIR, named by observation time. Both files
+are written completely before the pointer file current.json is atomically
+replaced, so a reader always sees a matching pair; the last KEEP_VERSIONS
+files of each kind are kept for readers still holding an older pointer.
+
+Readers memory-map the files instead of querying MySQL. The mapping itself is
+zero-copy, but the selected columns and rows are converted to a pandas frame
+on every read (strings and categoricals are materialized), so a read costs
+a copy of what it selects, not of the file. A snapshot older than
+SNAPSHOT_MAX_AGE counts as stale and the reader asks the database, but falls
+back to the file of any age when the database is unreachable.
+"""
+import glob
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from file_utils import atomic_write_bytes, atomic_write_text
+from weather_loader import LoadReport, compact, memory_bytes, record_load
+
+SNAPSHOT_DIR = os.getenv("WEATHER_SNAPSHOT_DIR", os.path.join(".cache", "snapshot"))
+POINTER_FILE = "current.json"
+# Seconds after which readers prefer the database over the file
+SNAPSHOT_MAX_AGE = int(os.getenv("WEATHER_SNAPSHOT_MAX_AGE", "7200"))
+HISTORY_WINDOW = timedelta(hours=24)
+KEEP_VERSIONS = 3
+# Bump when the file layout changes, so readers ignore old files
+FORMAT_VERSION = 1
+KINDS = ('latest', 'history')
+
+
+def _stamp(watermark):
+    """File-name-safe form of an ISO timestamp that still sorts chronologically."""
+    return re.sub(r'[^0-9T]', '', watermark)
+
+
+def _table_bytes(df, watermark):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({'watermark': watermark, 'format': str(FORMAT_VERSION)})
+    sink = pa.BufferOutputStream()
+    # Uncompressed, so readers can map the buffers instead of decoding them
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _prune(directory, keep):
+    for kind in KINDS:
+        files = sorted(glob.glob(os.path.join(directory, f"{kind}-*.arrow")))
+        for path in files[:-keep]:
+            try:
+                os.remove(path)
+            except OSError:
+                # Still mapped by a reader on Windows; removed by a later publish
+                pass
+
+
+def snapshot_info(directory=SNAPSHOT_DIR):
+    """The current pointer ({'watermark', 'latest', 'history', 'rows', ...} plus 'age' in seconds), or None."""
+    path = os.path.join(directory, POINTER_FILE)
+    try:
+        age = time.time() - os.stat(path).st_mtime
+        with open(path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if info.get('format') != FORMAT_VERSION:
+        return None
+    info['age'] = age
+    return info
+
+
+def publish_snapshot(df, directory=SNAPSHOT_DIR, history_window=HISTORY_WINDOW, keep=KEEP_VERSIONS):
+    """Writes df (one ingest, one row per town) as the latest snapshot and appends it to the history.
+
+    Returns the new pointer.
+    """
+    os.makedirs(directory, exist_ok=True)
+    watermark = str(df['recorded_at'].max())
+    latest = compact(df.copy())
+    latest_name = f"latest-{_stamp(watermark)}.arrow"
+    atomic_write_bytes(os.path.join(directory, latest_name), _table_bytes(latest, watermark))
+
+    history = latest
+    if history_window:
+        previous = read_snapshot(kind='history', directory=directory, max_age=None, label='history-append')
+        if previous is not None:
+            # recorded_at is stored as datetime.isoformat(), so the window start compares as a string
+            start = (datetime.fromisoformat(watermark) - history_window).isoformat()
+            kept = previous[0][(previous[0]['recorded_at'] >= start) & (previous[0]['recorded_at'] != watermark)]
+            # Categoricals with different categories concatenate to object columns; compact them again
+            history = compact(pd.concat([kept, latest], ignore_index=True))
+    history_name = f"history-{_stamp(watermark)}.arrow"
+    atomic_write_bytes(os.path.join(directory, history_name), _table_bytes(history, watermark))
+
+    info = {
+        'format': FORMAT_VERSION,
+        'watermark': watermark,
+        'latest': latest_name,
+        'history': history_name,
+        'rows': len(latest),
+        'history_rows': len(history),
+        'published_at': datetime.now().isoformat(),
+    }
+    # The pointer is replaced last: readers switch to the new pair in one step
+    atomic_write_text(os.path.join(directory, POINTER_FILE), json.dumps(info, indent=1))
+    _prune(directory, keep)
+    return info
+
+
+def read_snapshot(columns=None, kind='latest', directory=SNAPSHOT_DIR, max_age=SNAPSHOT_MAX_AGE,
+                  recorded_at=None, label=None):
+    """(frame, pointer) from the memory-mapped snapshot file, or None if there is none or it is stale.
+
+    Only `columns` are converted (all if None; None if one of them is missing), and with `recorded_at`
+    only the rows of that ingest. The file is written with the compact dtypes of weather_loader.py,
+    so the frame has them without another compact() pass.
+    """
+    info = snapshot_info(directory)
+    if info is None or not info.get(kind) or (max_age is not None and info['age'] > max_age):
+        return None
+    start = time.perf_counter()
+    try:
+        # The table's buffers point into the mapping, which stays open as long as they are referenced
+        table = pa.ipc.open_file(pa.memory_map(os.path.join(directory, info[kind]), 'r')).read_all()
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    if columns:
+        if any(column not in table.column_names for column in columns):
+            return None
+        table = table.select(list(columns))
+    if recorded_at is not None:
+        table = table.filter(pc.equal(table['recorded_at'], pa.scalar(recorded_at, table.schema.field('recorded_at').type)))
+    mapped_bytes = table.nbytes
+    df = table.to_pandas(split_blocks=True)
+    read_ms = (time.perf_counter() - start) * 1000
+    record_load(LoadReport(label or f'arrow-{kind}', len(df), len(df.columns), mapped_bytes, memory_bytes(df),
+                           round(read_ms, 3), 0.0))
+    return df, info
+
+
+def snapshot_times(start=None, directory=SNAPSHOT_DIR, max_age=SNAPSHOT_MAX_AGE):
+    """Sorted recorded_at values in the history file (from `start` on), or None if there is no fresh one."""
+    info = snapshot_info(directory)
+    if info is None or not info.get('history') or (max_age is not None and info['age'] > max_age):
+        return None
+    try:
+        column = pa.ipc.open_file(pa.memory_map(os.path.join(directory, info['history']), 'r')) \
+            .read_all().column('recorded_at')
+    except (FileNotFoundError, KeyError, pa.ArrowInvalid):
+        return None
+    times = sorted(str(value) for value in pc.unique(column).to_pylist() if value is not None)
+    return [value for value in times if start is None or value >= start]
+
+
+def latest_frame(columns, load_from_db, directory=SNAPSHOT_DIR, max_age=SNAPSHOT_MAX_AGE):
+    """Latest snapshot from a fresh file, else load_from_db(); a file of any age if the database fails."""
+    snapshot = read_snapshot(columns, directory=directory, max_age=max_age)
+    if snapshot is not None:
+        print(f"✓ Read snapshot {snapshot[1]['watermark']} ({len(snapshot[0])} towns) from {directory}")
+        return snapshot[0]
+    try:
+        return load_from_db()
+    except Exception as e:
+        snapshot = read_snapshot(columns, directory=directory, max_age=None)
+        if snapshot is None:
+            raise
+        print(f"✗ Database unavailable ({e}); using snapshot {snapshot[1]['watermark']} "
+              f"from {snapshot[1]['age'] / 60:.0f} minutes ago")
+        return snapshot[0]
+
+
+def latest_watermark(load_from_db, directory=SNAPSHOT_DIR, max_age=SNAPSHOT_MAX_AGE):
+    """Newest recorded_at: from a fresh snapshot pointer, else load_from_db(), else a pointer of any age."""
+    info = snapshot_info(directory)
+    if info is not None and info['age'] <= max_age:
+        return info['watermark']
+    try:
+        return load_from_db()
+    except Exception:
+        if info is None:
+            raise
+        return info['watermark']
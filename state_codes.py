@@ -0,0 +1,56 @@
+# Federal states (AT, DE) and cantons (CH): (country, abbreviation, name, English name)
+STATE_CODES = [
+    ("AT", "B", "Burgenland", "Burgenland"),
+    ("AT", "K", "Kärnten", "Carinthia"),
+    ("AT", "NÖ", "Niederösterreich", "Lower Austria"),
+    ("AT", "OÖ", "Oberösterreich", "Upper Austria"),
+    ("AT", "S", "Salzburg", "Salzburg"),
+    ("AT", "ST", "Steiermark", "Styria"),
+    ("AT", "T", "Tirol", "Tyrol"),
+    ("AT", "V", "Vorarlberg", "Vorarlberg"),
+    ("AT", "W", "Wien", "Vienna"),
+
+    ("DE", "BW", "Baden-Württemberg", "Baden-Württemberg"),
+    ("DE", "BY", "Bayern", "Bavaria"),
+    ("DE", "BE", "Berlin", "Berlin"),
+    ("DE", "BB", "Brandenburg", "Brandenburg"),
+    ("DE", "HB", "Bremen", "Bremen"),
+    ("DE", "HH", "Hamburg", "Hamburg"),
+    ("DE", "HE", "Hessen", "Hesse"),
+    ("DE", "MV", "Mecklenburg-Vorpommern", "Mecklenburg-Western Pomerania"),
+    ("DE", "NI", "Niedersachsen", "Lower Saxony"),
+    ("DE", "NW", "Nordrhein-Westfalen", "North Rhine-Westphalia"),
+    ("DE", "RP", "Rheinland-Pfalz", "Rhineland-Palatinate"),
+    ("DE", "SL", "Saarland", "Saarland"),
+    ("DE", "SN", "Sachsen", "Saxony"),
+    ("DE", "ST", "Sachsen-Anhalt", "Saxony-Anhalt"),
+    ("DE", "SH", "Schleswig-Holstein", "Schleswig-Holstein"),
+    ("DE", "TH", "Thüringen", "Thuringia"),
+
+    ("CH", "AG", "Aargau", "Aargau"),
+    ("CH", "AI", "Appenzell Innerrhoden", "Appenzell Innerrhoden"),
+    ("CH", "AR", "Appenzell Ausserrhoden", "Appenzell Ausserrhoden"),
+    ("CH", "BE", "Bern", "Bern"),
+    ("CH", "BL", "Basel-Landschaft", "Basel-Landschaft"),
+    ("CH", "BS", "Basel-Stadt", "Basel-Stadt"),
+    ("CH", "FR", "Freiburg", "Fribourg"),
+    ("CH", "GE", "Genf", "Geneva"),
+    ("CH", "GL", "Glarus", "Glarus"),
+    ("CH", "GR", "Graubünden", "Grisons"),
+    ("CH", "JU", "Jura", "Jura"),
+    ("CH", "LU", "Luzern", "Lucerne"),
+    ("CH", "NE", "Neuenburg", "Neuchâtel"),
+    ("CH", "NW", "Nidwalden", "Nidwalden"),
+    ("CH", "OW", "Obwalden", "Obwalden"),
+    ("CH", "SG", "St. Gallen", "St. Gallen"),
+    ("CH", "SH", "Schaffhausen", "Schaffhausen"),
+    ("CH", "SO", "Solothurn", "Solothurn"),
+    ("CH", "SZ", "Schwyz", "Schwyz"),
+    ("CH", "TG", "Thurgau", "Thurgau"),
+    ("CH", "TI", "Tessin", "Ticino"),
+    ("CH", "UR", "Uri", "Uri"),
+    ("CH", "VD", "Waadt", "Vaud"),
+    ("CH", "VS", "Wallis", "Valais"),
+    ("CH", "ZG", "Zug", "Zug"),
+    ("CH", "ZH", "Zürich", "Zurich"),
+]
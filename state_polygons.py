@@ -0,0 +1,208 @@
+"""Vectorized point-in-polygon assignment of coordinates to federal-state polygons.
+
+Every point is tested against the state polygons from the GeoJSON with a
+bounding-box prefilter followed by batched even-odd ray casting in numpy.
+Points are sorted by latitude and processed in chunks, and each chunk is only
+tested against the edges that overlap its latitude band, so thousands of
+points cost a handful of array operations per state. Assignments are cached
+in memory and on disk, keyed by the GeoJSON content and the coordinates.
+"""
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from file_utils import atomic_write_bytes, file_sha256
+
+GEOJSON_PATH = "geo_data/austria_federal_states.geojson"
+STATE_PROPERTY = "BL"  # 'BL' is the federal state name in the Austrian GeoJSON
+CACHE_DIR = os.path.join(".cache", "state_assignment")
+
+# Upper bound for the (points x edges) boolean matrices of one batch
+MAX_BATCH_CELLS = 2_000_000
+
+_polygon_cache = {}
+_assignment_cache = {}
+
+
+def _feature_rings(geometry):
+    if geometry['type'] == 'Polygon':
+        return geometry['coordinates']
+    if geometry['type'] == 'MultiPolygon':
+        return [ring for polygon in geometry['coordinates'] for ring in polygon]
+    return []
+
+
+def _ring_edges(rings):
+    """Stacks all rings (outer and holes) into edge arrays x0, y0, x1, y1."""
+    parts = []
+    for ring in rings:
+        ring = np.asarray(ring, dtype=float)[:, :2]
+        if len(ring) < 3:
+            continue
+        if not np.array_equal(ring[0], ring[-1]):
+            ring = np.vstack([ring, ring[:1]])
+        parts.append(np.column_stack([ring[:-1], ring[1:]]))
+    if not parts:
+        return np.empty((0, 4))
+    return np.vstack(parts)
+
+
+def load_state_polygons(path=GEOJSON_PATH, name_property=STATE_PROPERTY):
+    """Loads the state polygons as {'names', 'bboxes', 'edges', 'source_hash'} (cached per file content)."""
+    # Keyed on mtime/size so repeated calls don't re-hash the file
+    stat = os.stat(path)
+    key = (os.path.abspath(path), name_property, stat.st_mtime_ns, stat.st_size)
+    if key in _polygon_cache:
+        return _polygon_cache[key]
+    source_hash = file_sha256(path)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        geojson_data = json.load(f)
+
+    names, bboxes, edges = [], [], []
+    for feature in geojson_data['features']:
+        feature_edges = _ring_edges(_feature_rings(feature['geometry']))
+        if not len(feature_edges):
+            continue
+        xs = feature_edges[:, [0, 2]]
+        ys = feature_edges[:, [1, 3]]
+        names.append(feature['properties'].get(name_property))
+        bboxes.append((xs.min(), ys.min(), xs.max(), ys.max()))
+        edges.append(feature_edges)
+
+    polygons = {
+        'names': names,
+        'bboxes': np.asarray(bboxes).reshape(-1, 4),
+        'edges': edges,
+        'source_hash': source_hash,
+    }
+    _polygon_cache[key] = polygons
+    return polygons
+
+
+def points_in_polygon(px, py, edges):
+    """Even-odd ray casting of many points against one (multi)polygon's edges; returns a bool array."""
+    inside = np.zeros(len(px), dtype=bool)
+    if not len(px):
+        return inside
+
+    order = np.argsort(py, kind='stable')
+    sx, sy = px[order], py[order]
+    x0, y0, x1, y1 = edges.T
+    edge_ymin = np.minimum(y0, y1)
+    edge_ymax = np.maximum(y0, y1)
+
+    result = np.zeros(len(sx), dtype=bool)
+    batch = max(1, MAX_BATCH_CELLS // max(1, len(edges)))
+    for start in range(0, len(sx), batch):
+        bx = sx[start:start + batch, None]
+        by = sy[start:start + batch, None]
+
+        # Only edges overlapping this batch's latitude band can be crossed
+        band = (edge_ymax >= by[0, 0]) & (edge_ymin <= by[-1, 0])
+        ex0, ey0, ex1, ey1 = x0[band], y0[band], x1[band], y1[band]
+
+        straddles = (ey0 > by) != (ey1 > by)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = ex0 + (by - ey0) * (ex1 - ex0) / (ey1 - ey0)
+        crossings = np.count_nonzero(straddles & (bx < x_cross), axis=1)
+        result[start:start + batch] = crossings % 2 == 1
+
+    inside[order] = result
+    return inside
+
+
+def _assignment_key(lons, lats, polygons):
+    digest = hashlib.sha256(polygons['source_hash'].encode('ascii'))
+    digest.update(lons.tobytes())
+    digest.update(lats.tobytes())
+    return digest.hexdigest()
+
+
+def assign_states(lons, lats, path=GEOJSON_PATH, name_property=STATE_PROPERTY, use_cache=True):
+    """Returns the index into load_state_polygons()['names'] for every point, -1 outside all polygons."""
+    lons = np.ascontiguousarray(lons, dtype=float)
+    lats = np.ascontiguousarray(lats, dtype=float)
+    polygons = load_state_polygons(path, name_property)
+
+    key = _assignment_key(lons, lats, polygons)
+    cache_path = os.path.join(CACHE_DIR, f"{key}.npy")
+    if use_cache:
+        if key in _assignment_cache:
+            return _assignment_cache[key]
+        if os.path.exists(cache_path):
+            assignment = np.load(cache_path)
+            assignment.setflags(write=False)
+            _assignment_cache[key] = assignment
+            return assignment
+
+    assignment = np.full(len(lons), -1, dtype=np.int16)
+    valid = ~(np.isnan(lons) | np.isnan(lats))
+    for k, (bbox, edges) in enumerate(zip(polygons['bboxes'], polygons['edges'])):
+        min_x, min_y, max_x, max_y = bbox
+        candidates = np.flatnonzero(
+            valid & (assignment == -1)
+            & (lons >= min_x) & (lons <= max_x) & (lats >= min_y) & (lats <= max_y)
+        )
+        if len(candidates):
+            hits = points_in_polygon(lons[candidates], lats[candidates], edges)
+            assignment[candidates[hits]] = k
+
+    if use_cache:
+        # Shared between callers, so freeze it
+        assignment.setflags(write=False)
+        _assignment_cache[key] = assignment
+        buffer = io.BytesIO()
+        np.save(buffer, assignment)
+        atomic_write_bytes(cache_path, buffer.getvalue())
+    return assignment
+
+
+def state_names_for(lons, lats, path=GEOJSON_PATH, name_property=STATE_PROPERTY):
+    """Like assign_states(), but returns the state names (None outside all polygons)."""
+    names = np.asarray(load_state_polygons(path, name_property)['names'] + [None], dtype=object)
+    return names[assign_states(lons, lats, path, name_property)]
+
+
+def assign_towns(df, path=GEOJSON_PATH, name_property=STATE_PROPERTY, column='polygon_state'):
+    """Returns a copy of df with the polygon state of its longitude/latitude in `column`."""
+    df = df.copy()
+    df[column] = state_names_for(df['longitude'].to_numpy(), df['latitude'].to_numpy(), path, name_property)
+    return df
+
+
+def state_aggregates(lons, lats, values, path=GEOJSON_PATH, name_property=STATE_PROPERTY):
+    """Per-state count/mean/min/max of values for arbitrary points, e.g. for a choropleth."""
+    polygons = load_state_polygons(path, name_property)
+    assignment = assign_states(lons, lats, path, name_property)
+    frame = pd.DataFrame({'state': assignment, 'value': np.asarray(values, dtype=float)})
+    frame = frame[frame['state'] >= 0]
+    result = frame.groupby('state')['value'].agg(['count', 'mean', 'min', 'max'])
+    result.index = [polygons['names'][k] for k in result.index]
+    result.index.name = 'state'
+    return result
+
+
+if __name__ == "__main__":
+    from sqlalchemy import create_engine
+    from dotenv import load_dotenv
+
+    load_dotenv() # Load environment variables from .env
+
+    MYSQL_USER = os.getenv("MYSQL_USER")
+    MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+    MYSQL_HOST = os.getenv("MYSQL_HOST")
+    MYSQL_PORT = int(os.getenv("MYSQL_PORT"))
+    engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/geodata")
+
+    towns = pd.read_sql("SELECT town, state, longitude, latitude FROM all_towns WHERE country = 'AT'", engine)
+    towns = assign_towns(towns)
+    print(towns.groupby('polygon_state', dropna=False).size())
+    outside = towns[towns['polygon_state'].isna()]
+    print(f"\n{len(outside)} towns outside all state polygons")
+    if len(outside):
+        print(outside.to_string())
@@ -0,0 +1,81 @@
+"""Asset pipeline for the generated HTML pages.
+
+plotly.js is written once as a versioned, content-hashed file in ASSET_DIR and
+referenced by every page instead of being inlined (several MB per page).
+Pages and assets get gzip (and, with the brotli package, brotli) precompressed
+siblings, which static_server.py serves to clients that accept them.
+"""
+import gzip
+import hashlib
+import os
+
+import plotly
+import plotly.offline
+
+from file_utils import atomic_write_bytes
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only .gz siblings are written
+    brotli = None
+
+ASSET_DIR = "assets"
+HASH_LENGTH = 12
+
+# Only text formats benefit from compression
+COMPRESSIBLE_EXTENSIONS = ('.html', '.js', '.css', '.json', '.svg', '.xml', '.txt')
+
+_published = {}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def write_precompressed(path, data):
+    """Writes path.gz (and path.br) next to path; mtime=0 keeps the gzip output deterministic."""
+    atomic_write_bytes(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        atomic_write_bytes(path + '.br', brotli.compress(data, quality=11))
+
+
+def write_file(path, data):
+    """Atomically writes data and, for text formats, its precompressed siblings."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    atomic_write_bytes(path, data)
+    if path.endswith(COMPRESSIBLE_EXTENSIONS):
+        write_precompressed(path, data)
+
+
+def publish_asset(data, stem, extension, asset_dir=ASSET_DIR):
+    """Writes data as <stem>.<hash><extension> unless that exact file exists; returns its path."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    path = os.path.join(asset_dir, f"{stem}.{content_hash(data)}{extension}")
+    # The name is derived from the content, so an existing file is already correct
+    if not os.path.exists(path):
+        write_file(path, data)
+    return path
+
+
+def plotly_js_path(asset_dir=ASSET_DIR):
+    """Path of the published plotly.js bundle for the installed plotly version."""
+    key = (os.path.abspath(asset_dir), plotly.__version__)
+    if key not in _published:
+        _published[key] = publish_asset(plotly.offline.get_plotlyjs(), f"plotly-{plotly.__version__}", '.min.js',
+                                        asset_dir)
+    return _published[key]
+
+
+def relative_url(target, page_path):
+    """URL of target relative to the directory of page_path."""
+    page_dir = os.path.dirname(os.path.abspath(page_path))
+    return os.path.relpath(os.path.abspath(target), page_dir).replace(os.sep, '/')
+
+
+def write_figure_html(fig, path, asset_dir=ASSET_DIR, **to_html_kwargs):
+    """Writes a figure page that loads the shared plotly.js bundle; returns the HTML."""
+    html = fig.to_html(include_plotlyjs=relative_url(plotly_js_path(asset_dir), path), **to_html_kwargs)
+    write_file(path, html)
+    return html
@@ -0,0 +1,145 @@
+"""Minimal static file server for the generated pages and assets.
+
+Serves precompressed .br/.gz siblings to clients that accept them, sends
+strong ETags and answers If-None-Match with 304. Content-hashed assets
+(e.g. assets/plotly-6.5.0.3f2a9c1b7d4e.min.js) are cached for a year as
+immutable; pages are revalidated on every load.
+
+    python static_server.py [port] [directory]
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+PORT = 8000
+SITE_DIR = "."
+
+# Only generated artifacts are served, never .env or sources from the project directory
+SERVED_EXTENSIONS = ('.html', '.js', '.css', '.json', '.svg', '.xml', '.txt', '.png', '.jpg', '.ico', '.webp')
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.')
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Preferred encodings with their file suffix
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_etag_cache = {}
+_etag_lock = threading.Lock()
+
+
+def file_etag(path, stat):
+    """Strong ETag from the file content, cached per (path, mtime, size)."""
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _etag_lock:
+        etag = _etag_cache.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()[:32]}"'
+        with _etag_lock:
+            _etag_cache[key] = etag
+    return etag
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticHandler(BaseHTTPRequestHandler):
+    site_dir = SITE_DIR
+    server_version = "WetterStatic/1.0"
+
+    def _resolve(self):
+        path = unquote(urlsplit(self.path).path)
+        if path.endswith('/'):
+            path += 'index.html'
+        parts = [p for p in path.split('/') if p]
+        if any(p.startswith('.') for p in parts):
+            return None
+        full = os.path.abspath(os.path.join(self.site_dir, *parts))
+        root = os.path.abspath(self.site_dir)
+        if not full.startswith(root + os.sep) or not full.endswith(SERVED_EXTENSIONS):
+            return None
+        return full if os.path.isfile(full) else None
+
+    def _send(self, head_only):
+        path = self._resolve()
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+
+        body_path, encoding = path, None
+        accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+        for name, suffix in ENCODINGS:
+            if name in accepted and os.path.isfile(path + suffix):
+                body_path, encoding = path + suffix, name
+                break
+
+        stat = os.stat(body_path)
+        etag = file_etag(body_path, stat)
+        cache_control = IMMUTABLE_CACHE if HASHED_NAME.search(os.path.basename(path)) else REVALIDATE_CACHE
+
+        if_none_match = self.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(stat.st_size))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        if head_only:
+            return
+        with open(body_path, 'rb') as f:
+            while chunk := f.read(1 << 16):
+                self.wfile.write(chunk)
+
+    def do_GET(self):
+        self._send(head_only=False)
+
+    def do_HEAD(self):
+        self._send(head_only=True)
+
+
+def serve(port=PORT, site_dir=SITE_DIR):
+    handler = type('Handler', (StaticHandler,), {'site_dir': site_dir})
+    server = ThreadingHTTPServer(('', port), handler)
+    print(f"✓ Serving {os.path.abspath(site_dir)} on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]) if len(sys.argv) > 1 else PORT, sys.argv[2] if len(sys.argv) > 2 else SITE_DIR)
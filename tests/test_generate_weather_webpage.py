@@ -0,0 +1,33 @@
+import os
+
+import pandas as pd
+
+# The module creates its engine at import; no connection is opened by these tests
+os.environ.setdefault("MYSQL_PORT", "3306")
+
+import generate_weather_webpage
+
+
+def town(name, temperature, humidity):
+    return {'town': name, 'federal_state': 'Wien', 'inhabitants': 1000, 'recorded_at': '2026-10-19T12:00:00',
+            'temperature_2m': temperature, 'apparent_temperature': temperature - 1.0,
+            'relative_humidity_2m': humidity, 'wind_speed_10m': 8.5, 'cloud_cover': 40.0, 'pressure_msl': 1015.2}
+
+
+def test_render_index_single_town(tmp_path, monkeypatch):
+    # No persisted stats in the working directory, so they are computed from the frame
+    monkeypatch.chdir(tmp_path)
+    stats = generate_weather_webpage.compute_stats(pd.DataFrame([town('Wien', 12.3, 81.0)]))
+    assert all(metric['std'] is None for metric in stats['metrics'])
+
+    html = generate_weather_webpage.render_index(stats)
+    assert '<b>Wien</b>' in html
+    assert '<td>12.30</td>' in html
+
+
+def test_render_index_missing_humidity(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame([town('Wien', 12.3, 81.0), town('Linz', 10.1, None)])
+    html = generate_weather_webpage.render_index(generate_weather_webpage.compute_stats(df))
+    assert '<td>81%</td>' in html
+    assert '<td>–</td>' in html
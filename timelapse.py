@@ -0,0 +1,224 @@
+"""Animated time-lapse map of one weather variable from weather_records.
+
+The time range is read with one query over the recorded_at index and cut into
+intervals. Each interval becomes one Plotly animation frame: town markers, or
+the mean per federal state coloured into the state polygons. Frames are built
+in a process pool and cached per interval and data hash in FRAME_CACHE_DIR,
+so extending the range only builds the new frames.
+
+    python timelapse.py --variable temperature_2m --start 2026-10-18T00:00 --end 2026-10-19T00:00 --interval 1h
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+import plotly.graph_objects as go
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from geometry_cache import load_simplified_geojson
+from shared_cache import FileCache
+from state_polygons import GEOJSON_PATH, STATE_PROPERTY, state_aggregates
+from static_assets import write_figure_html
+from weather_loader import read_weather
+
+load_dotenv() # Load environment variables from .env
+
+# MySQL connection settings
+MYSQL_USER = os.getenv("MYSQL_USER")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
+MYSQL_HOST = os.getenv("MYSQL_HOST")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT"))
+MYSQL_DATABASE = "OpenMeteo"
+
+# Connect to database
+engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}")
+
+OUTPUT_FILE = 'timelapse.html'
+FRAME_CACHE_DIR = os.path.join(".cache", "timelapse")
+# Bump when the frame layout changes, so cached frames are rebuilt
+FRAME_VERSION = 1
+
+# Animated variables: column -> (label, colour scale)
+VARIABLES = {
+    'temperature_2m': ("Temperature (°C)", 'RdBu_r'),
+    'apparent_temperature': ("Apparent Temperature (°C)", 'RdBu_r'),
+    'relative_humidity_2m': ("Humidity (%)", 'Blues'),
+    'wind_speed_10m': ("Wind Speed (km/h)", 'YlOrRd'),
+    'wind_gusts_10m': ("Wind Gusts (km/h)", 'YlOrRd'),
+    'cloud_cover': ("Cloud Cover (%)", 'Greys'),
+    'pressure_msl': ("Pressure (hPa)", 'Viridis'),
+    'precipitation': ("Precipitation (mm)", 'Blues'),
+}
+MODES = ('markers', 'states')
+
+MAP_CENTER = {'lat': 47.6, 'lon': 13.3}
+MAP_ZOOM = 6
+# Zoom level of the simplified state polygons (see geometry_cache.py)
+MAP_GEOMETRY_ZOOM = 7
+FRAME_DURATION_MS = 500
+
+RANGE_QUERY = """
+SELECT {columns}
+FROM weather_records
+WHERE recorded_at >= :start AND recorded_at < :end
+ORDER BY recorded_at
+"""
+
+
+def load_range(variable, start, end):
+    """Observations of `variable` in [start, end), with recorded_at parsed to datetimes."""
+    # recorded_at is stored as datetime.isoformat(), so the bounds compare as strings
+    return read_weather(engine, RANGE_QUERY, ['town', 'longitude', 'latitude', 'recorded_at', variable],
+                        params={'start': start.isoformat(), 'end': end.isoformat()},
+                        parse_dates=('recorded_at',), label='timelapse', verbose=True)
+
+
+def interval_rows(df, variable, interval):
+    """[(interval start, last observation per town within the interval)], oldest first."""
+    df = df.dropna(subset=['longitude', 'latitude', variable])
+    df = df.assign(bucket=df['recorded_at'].dt.floor(interval))
+    df = df.sort_values('recorded_at', kind='stable').drop_duplicates(['bucket', 'town'], keep='last')
+    # Sorted by town, so an interval's rows (and its cache key) don't depend on the queried range
+    df = df.sort_values(['bucket', 'town'])
+    return [(bucket, rows[['town', 'longitude', 'latitude', variable]].reset_index(drop=True))
+            for bucket, rows in df.groupby('bucket', sort=True)]
+
+
+def frame_key(variable, mode, bucket, rows):
+    digest = hashlib.sha256(rows.to_csv(index=False).encode('utf-8')).hexdigest()
+    return ('timelapse', FRAME_VERSION, variable, mode, bucket.isoformat(), digest)
+
+
+def build_frame(job):
+    """Trace of one frame as plotly JSON; runs in a worker process."""
+    variable, mode, rows = job
+    label, _ = VARIABLES[variable]
+    values = rows[variable].astype(float)
+    if mode == 'states':
+        aggregates = state_aggregates(rows['longitude'].to_numpy(dtype=float), rows['latitude'].to_numpy(dtype=float),
+                                      values.to_numpy())
+        trace = go.Choroplethmap(
+            locations=list(aggregates.index),
+            z=aggregates['mean'].round(2).tolist(),
+            customdata=aggregates['count'].tolist(),
+            coloraxis='coloraxis',
+            hovertemplate=f"<b>%{{location}}</b><br>{label}: %{{z:.1f}}<br>Towns: %{{customdata}}<extra></extra>",
+        )
+    else:
+        trace = go.Scattermap(
+            lon=rows['longitude'].round(4).tolist(),
+            lat=rows['latitude'].round(4).tolist(),
+            mode='markers',
+            marker=dict(size=9, color=values.round(2).tolist(), coloraxis='coloraxis'),
+            text=rows['town'].tolist(),
+            hovertemplate=f"<b>%{{text}}</b><br>{label}: %{{marker.color:.1f}}<extra></extra>",
+        )
+    return json.dumps(trace.to_plotly_json())
+
+
+def build_frames(intervals, variable, mode, workers=None, cache=None):
+    """Returns ([trace dicts], number of frames built) for the intervals, building only uncached frames."""
+    cache = cache or FileCache(FRAME_CACHE_DIR, max_entries=10_000)
+    keys = [frame_key(variable, mode, bucket, rows) for bucket, rows in intervals]
+    frames = [cache.get(key) for key in keys]
+    missing = [i for i, frame in enumerate(frames) if frame is None]
+    if missing:
+        workers = workers or os.cpu_count() or 1
+        jobs = [(variable, mode, intervals[i][1]) for i in missing]
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            chunksize = max(1, len(jobs) // (workers * 4))
+            for i, frame in zip(missing, executor.map(build_frame, jobs, chunksize=chunksize)):
+                cache.put(keys[i], frame)
+                frames[i] = frame
+    return [json.loads(frame) for frame in frames], len(missing)
+
+
+def create_figure(intervals, traces, variable, mode, value_range):
+    label, colorscale = VARIABLES[variable]
+    names = [bucket.strftime('%Y-%m-%d %H:%M') for bucket, _ in intervals]
+    first = dict(traces[0])
+    if mode == 'states':
+        # The polygons are sent once with the first trace; frames only replace the values
+        first.update(geojson=load_simplified_geojson(GEOJSON_PATH, zoom=MAP_GEOMETRY_ZOOM),
+                     featureidkey=f"properties.{STATE_PROPERTY}", marker={'opacity': 0.7})
+
+    fig = go.Figure(
+        data=[first],
+        frames=[go.Frame(data=[trace], name=name) for trace, name in zip(traces, names)],
+    )
+    steps = [{'label': name, 'method': 'animate',
+              'args': [[name], {'mode': 'immediate', 'frame': {'duration': 0, 'redraw': True},
+                                'transition': {'duration': 0}}]}
+             for name in names]
+    fig.update_layout(
+        title_text=f"<b>{label}</b> {names[0]} – {names[-1]}",
+        map=dict(style='carto-positron', center=MAP_CENTER, zoom=MAP_ZOOM),
+        # One colour axis for all frames keeps colours comparable over time
+        coloraxis=dict(colorscale=colorscale, cmin=value_range[0], cmax=value_range[1],
+                       colorbar=dict(title=label)),
+        margin=dict(l=0, r=0, t=50, b=0),
+        height=750,
+        sliders=[{'active': 0, 'steps': steps, 'currentvalue': {'prefix': "Time: "}, 'pad': {'t': 30}}],
+        updatemenus=[{
+            'type': 'buttons', 'showactive': False, 'x': 0.05, 'y': 0, 'xanchor': 'right', 'yanchor': 'top',
+            'buttons': [
+                {'label': "▶", 'method': 'animate',
+                 'args': [None, {'frame': {'duration': FRAME_DURATION_MS, 'redraw': True},
+                                 'transition': {'duration': 0}, 'fromcurrent': True}]},
+                {'label': "❚❚", 'method': 'animate',
+                 'args': [[None], {'frame': {'duration': 0, 'redraw': False}, 'mode': 'immediate'}]},
+            ],
+        }],
+    )
+    return fig
+
+
+def main(variable, start, end, interval, mode='markers', output=OUTPUT_FILE, workers=None):
+    started = time.perf_counter()
+    df = load_range(variable, start, end)
+    intervals = interval_rows(df, variable, interval)
+    if not intervals:
+        print(f"✗ No observations of {variable} between {start} and {end}")
+        return False
+    print(f"Retrieved {len(df)} records in {len(intervals)} intervals of {interval}")
+
+    traces, built = build_frames(intervals, variable, mode, workers)
+    if mode == 'states':
+        values = [z for trace in traces for z in trace.get('z', [])]
+    else:
+        values = [c for trace in traces for c in trace['marker']['color']]
+    if not values:
+        print(f"✗ No {variable} values to draw between {start} and {end}"
+              + (" (no town lies inside a state polygon)" if mode == 'states' else ""))
+        return False
+    fig = create_figure(intervals, traces, variable, mode, (min(values), max(values)))
+    write_figure_html(fig, output, auto_play=False)
+    print(f"✓ Time-lapse saved to {output}: {len(intervals)} frames, {built} built, "
+          f"{len(intervals) - built} cached, {time.perf_counter() - started:.1f}s")
+    return True
+
+
+def _datetime(value):
+    return datetime.fromisoformat(value)
+
+
+if __name__ == "__main__":
+    now = datetime.now()
+    parser = argparse.ArgumentParser(description="Render an animated time-lapse map of one weather variable.")
+    parser.add_argument('--variable', choices=sorted(VARIABLES), default='temperature_2m')
+    parser.add_argument('--start', type=_datetime, default=now - timedelta(days=1),
+                        help="ISO start time (default: 24 hours ago)")
+    parser.add_argument('--end', type=_datetime, default=now, help="ISO end time, exclusive (default: now)")
+    parser.add_argument('--interval', default='1h', help="frame interval as a pandas offset, e.g. 15min, 1h, 1D")
+    parser.add_argument('--mode', choices=MODES, default='markers',
+                        help="town markers or the mean per federal state")
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--workers', type=int, default=None, help="frame build processes (default: CPU count)")
+    args = parser.parse_args()
+    main(args.variable, args.start, args.end, args.interval, args.mode, args.output, args.workers)
@@ -0,0 +1,254 @@
+"""Shared Wikipedia town-list scraper used by the generate_*towns.py scripts.
+
+Pages are fetched through a conditional-GET cache (ETag / Last-Modified), tables
+are extracted with lxml and every country supplies a small column adapter that
+turns the pre-extracted table rows into town records.
+"""
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import lxml.html
+import requests
+
+from file_utils import atomic_write_bytes, atomic_write_text
+
+# Directory for cached Wikipedia pages (body + validator headers)
+PAGE_CACHE_DIR = os.path.join(".cache", "pages")
+USER_AGENT = "Mozilla/5.0"
+REQUEST_TIMEOUT = 30
+
+# Only wikitables, not navigation boxes or nested layout tables
+WIKITABLE_XPATH = "//table[contains(concat(' ', normalize-space(@class), ' '), ' wikitable ')]"
+# Wikipedia always serves UTF-8; don't let lxml guess from the bytes
+HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+AUSTRIAN_STATES = ['Burgenland', 'Carinthia', 'Lower Austria', 'Salzburg', 'Styria', 'Tyrol', 'Upper Austria', 'Vienna', 'Vorarlberg']
+
+
+def get_population(text):
+    # Remove references like [1] and commas/dots
+    text = re.sub(r'\[[^\]]*\]', '', text)
+    text = text.replace(',', '').replace('.', '')
+    try:
+        return int(text.strip())
+    except ValueError:
+        return 0
+
+
+def _cache_paths(url):
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return os.path.join(PAGE_CACHE_DIR, f"{key}.html"), os.path.join(PAGE_CACHE_DIR, f"{key}.json")
+
+
+def fetch_page(url, user_agent=USER_AGENT):
+    """Downloads a page, revalidating a cached copy with If-None-Match / If-Modified-Since."""
+    body_path, meta_path = _cache_paths(url)
+    headers = {'User-Agent': user_agent}
+    meta = {}
+    if os.path.exists(body_path) and os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        if meta:
+            print(f"✗ Could not reach {url} ({e}), using cached copy")
+            with open(body_path, 'rb') as f:
+                return f.read()
+        raise
+
+    if response.status_code == 304 and meta:
+        print(f"✓ {url} not modified, using cached copy")
+        with open(body_path, 'rb') as f:
+            return f.read()
+
+    response.raise_for_status()
+    atomic_write_bytes(body_path, response.content)
+    atomic_write_text(meta_path, json.dumps({
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }))
+    return response.content
+
+
+def _cell_text(cell):
+    return cell.text_content().strip()
+
+
+def extract_tables(html):
+    """Parses all wikitables into dicts with headers, rows (cell texts) and the preceding heading.
+
+    The heading and header row are resolved once per table, not per row.
+    """
+    document = lxml.html.fromstring(html, parser=HTML_PARSER)
+    tables = []
+    for table in document.xpath(WIKITABLE_XPATH):
+        rows = table.xpath('./tr | ./thead/tr | ./tbody/tr | ./tfoot/tr')
+        if not rows:
+            continue
+
+        # The header row is the first row with <th> cells; fall back to the first row
+        header_pos = 0
+        for i, row in enumerate(rows):
+            if row.xpath('./th'):
+                header_pos = i
+                break
+        headers = [_cell_text(cell) for cell in rows[header_pos].xpath('./th | ./td')]
+
+        heading = ''
+        previous = table.xpath('preceding::*[self::h2 or self::h3][1]')
+        if previous:
+            heading = _cell_text(previous[0]).replace('[edit]', '').strip()
+
+        tables.append({
+            'headers': headers,
+            'heading': heading,
+            'rows': [[_cell_text(cell) for cell in row.xpath('./td | ./th')] for row in rows[header_pos + 1:]],
+        })
+    return tables
+
+
+def find_column(headers, *names):
+    """Returns the index of the first header containing one of names, else -1."""
+    for i, h in enumerate(headers):
+        for name in names:
+            if name in h:
+                return i
+    return -1
+
+
+# --- Country adapters: table dict -> list of town records ---
+
+def austria_adapter(table):
+    headers = table['headers']
+    name_idx = find_column(headers, 'Name')
+    pop_idx = find_column(headers, 'Population')
+    if 'Name' not in headers or name_idx == -1 or pop_idx == -1:
+        return []
+
+    state = table['heading'] if table['heading'] in AUSTRIAN_STATES else "Unknown"
+    towns = []
+    for cols in table['rows']:
+        if len(cols) <= max(name_idx, pop_idx):
+            continue
+        name = cols[name_idx]
+        population = get_population(cols[pop_idx])
+        town_state = "Vienna" if state == "Unknown" and name == "Vienna" else state
+        if population > 0 and town_state != "Unknown":
+            towns.append({'town': name, 'federal_state': town_state, 'inhabitants': population})
+    return towns
+
+
+def swiss_adapter(table):
+    headers = table['headers']
+    if not ('Name' in headers or 'Town' in headers) or find_column(headers, 'Population') == -1:
+        return []
+    name_idx = find_column(headers, 'Name', 'Town')
+    pop_idx = find_column(headers, 'Population')
+    canton_idx = find_column(headers, 'Canton')
+
+    towns = []
+    for cols in table['rows']:
+        if len(cols) <= max(name_idx, pop_idx):
+            continue
+        name = re.sub(r'\[[^\]]*\]|\([^)]*\)', '', cols[name_idx]).strip()
+        population = get_population(cols[pop_idx])
+
+        # Canton from the table column if it exists, otherwise from the nearby heading
+        if canton_idx != -1 and len(cols) > canton_idx:
+            canton = cols[canton_idx]
+        else:
+            canton = table['heading'] or "Unknown"
+
+        if population > 0 and canton != "Unknown":
+            towns.append({'town': name, 'canton': canton, 'inhabitants': population})
+    return towns
+
+
+def german_adapter(table):
+    headers = table['headers']
+    city_idx, state_idx, pop_idx = -1, -1, -1
+    for i, h in enumerate(headers):
+        if h == 'City':
+            city_idx = i
+        elif 'State' in h:
+            state_idx = i
+        elif 'estimate' in h.lower():  # More flexible matching for Population
+            pop_idx = i
+    if -1 in (city_idx, state_idx, pop_idx):
+        return []
+
+    towns = []
+    for cols in table['rows']:
+        if len(cols) <= max(city_idx, state_idx, pop_idx):
+            continue
+        city = cols[city_idx]
+        state = re.sub(r'\[[^\]]*\]', '', cols[state_idx]).strip()
+        population = get_population(cols[pop_idx])
+        if population > 0 and city and state:
+            towns.append({'town': city, 'federal_state': state, 'inhabitants': population})
+    return towns
+
+
+SOURCES = {
+    'AT': {
+        'url': "https://en.wikipedia.org/wiki/List_of_cities_and_towns_in_Austria",
+        'adapter': austria_adapter,
+        'state_field': 'federal_state',
+    },
+    'CH': {
+        'url': "https://en.wikipedia.org/wiki/Cities_in_Switzerland",
+        'adapter': swiss_adapter,
+        'state_field': 'canton',
+    },
+    'DE': {
+        'url': "https://en.wikipedia.org/wiki/List_of_cities_in_Germany_by_population",
+        'adapter': german_adapter,
+        'state_field': 'federal_state',
+    },
+}
+
+
+def fetch_top_towns(country, limit=200):
+    """Scrapes the town list for a country code in SOURCES, deduplicated and sorted by population."""
+    source = SOURCES[country]
+    tables = extract_tables(fetch_page(source['url']))
+
+    towns = []
+    for table in tables:
+        try:
+            towns.extend(source['adapter'](table))
+        except Exception as e:
+            print(f"✗ Error parsing table under '{table['heading']}': {e}")
+
+    # Dedup by name + state, keeping the larger population
+    unique_towns = {}
+    for t in towns:
+        key = (t['town'], t[source['state_field']])
+        if key not in unique_towns or unique_towns[key]['inhabitants'] < t['inhabitants']:
+            unique_towns[key] = t
+
+    sorted_towns = sorted(unique_towns.values(), key=lambda x: x['inhabitants'], reverse=True)
+    return sorted_towns[:limit]
+
+
+def scrape_all(countries=None, limit=200):
+    """Scrapes several countries in parallel and returns {country: towns}."""
+    countries = list(countries or SOURCES)
+    with ThreadPoolExecutor(max_workers=len(countries)) as executor:
+        futures = {c: executor.submit(fetch_top_towns, c, limit) for c in countries}
+        return {c: f.result() for c, f in futures.items()}
+
+
+if __name__ == "__main__":
+    for country, towns in scrape_all().items():
+        print(f"{country}: {len(towns)} towns")
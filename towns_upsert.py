@@ -0,0 +1,132 @@
+"""Incremental import of town CSVs into the geodata towns tables.
+
+Instead of DataFrame.to_sql(if_exists='replace') the CSV is diffed against the
+existing table on its natural key (state/canton + town; the country is implied
+by the table) and only the inserted, changed and removed rows are written, in
+bulk and in one transaction. Every row keeps its surrogate `id` across imports.
+
+Creating or migrating the table is DDL, which MySQL commits implicitly, so it
+runs before and outside that transaction.
+"""
+import pandas as pd
+from sqlalchemy import bindparam, inspect, text
+
+# Rows per executemany / DELETE ... IN batch
+BATCH_SIZE = 1000
+
+
+def _sql_type(dtype):
+    if pd.api.types.is_integer_dtype(dtype):
+        return "BIGINT"
+    if pd.api.types.is_float_dtype(dtype):
+        return "DOUBLE"
+    return "VARCHAR(255)"
+
+
+def _create_table(connection, table_name, df, key_columns, value_columns):
+    column_defs = ["id INT AUTO_INCREMENT PRIMARY KEY"]
+    for c in key_columns:
+        # Binary collation so the unique key agrees with pandas' exact string matching
+        column_defs.append(f"`{c}` VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL")
+    for c in value_columns:
+        column_defs.append(f"`{c}` {_sql_type(df[c].dtype)}")
+    key_list = ", ".join(f"`{c}`" for c in key_columns)
+    column_defs.append(f"UNIQUE KEY uq_natural_key ({key_list})")
+    connection.execute(text(
+        f"CREATE TABLE `{table_name}` (\n    " + ",\n    ".join(column_defs) + "\n) DEFAULT CHARSET=utf8mb4"
+    ))
+
+
+def _records(df):
+    # Plain Python objects with None for NaN, as the DB driver expects
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def _batches(items):
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+def diff_towns(df, existing, key_columns, value_columns):
+    """Splits df against existing (which has an `id` column) into inserts, updates and delete ids."""
+    merged = df.merge(existing, on=key_columns, how='outer', suffixes=('', '_db'), indicator=True)
+    # The outer join turns integer columns into floats; restore the CSV dtypes for the written rows
+    dtypes = {c: df[c].dtype for c in value_columns}
+
+    inserts = merged.loc[merged['_merge'] == 'left_only', key_columns + value_columns].astype(dtypes)
+    delete_ids = merged.loc[merged['_merge'] == 'right_only', 'id'].astype(int).tolist()
+
+    both = merged[merged['_merge'] == 'both']
+    changed = pd.Series(False, index=both.index)
+    for c in value_columns:
+        new, old = both[c], both[f"{c}_db"]
+        changed |= ~((new == old) | (new.isna() & old.isna()))
+    updates = both.loc[changed, ['id'] + value_columns].astype({'id': int, **dtypes})
+
+    return inserts, updates, delete_ids
+
+
+def migrate_table(df, table_name, engine, key_columns, value_columns, obsolete_columns=()):
+    """Creates table_name in the keyed layout, or migrates an existing table to it.
+
+    Drops `obsolete_columns` of an earlier layout if present. Runs on its own connection: DDL commits
+    implicitly in MySQL and must not be part of the data transaction.
+    """
+    inspector = inspect(engine)
+    with engine.connect() as connection:
+        if not inspector.has_table(table_name):
+            _create_table(connection, table_name, df, key_columns, value_columns)
+        else:
+            existing_columns = {c['name'] for c in inspector.get_columns(table_name)}
+            if 'id' not in existing_columns:
+                # One-time migration from the old to_sql(if_exists='replace') layout without ids;
+                # the rows are inserted again by the data transaction that follows
+                print(f"✓ Migrating {table_name} to the keyed layout (one-time rebuild)...")
+                connection.execute(text(f"DROP TABLE `{table_name}`"))
+                _create_table(connection, table_name, df, key_columns, value_columns)
+            else:
+                for c in obsolete_columns:
+                    if c in existing_columns:
+                        print(f"✓ Dropping obsolete column {table_name}.{c}")
+                        connection.execute(text(f"ALTER TABLE `{table_name}` DROP COLUMN `{c}`"))
+        connection.commit()
+
+
+def upsert_towns(df, table_name, engine, key_columns, value_columns, obsolete_columns=()):
+    """Applies only the differences between df and table_name. Returns the number of inserts, updates and deletes.
+
+    The table is created or migrated first (see migrate_table); the inserts, updates and deletes
+    are then written in one transaction.
+    """
+    df = df.dropna(subset=key_columns).drop_duplicates(subset=key_columns, keep='first')[key_columns + value_columns]
+
+    migrate_table(df, table_name, engine, key_columns, value_columns, obsolete_columns)
+
+    with engine.begin() as connection:
+        column_list = ", ".join(f"`{c}`" for c in ['id'] + key_columns + value_columns)
+        existing = pd.read_sql(text(f"SELECT {column_list} FROM `{table_name}`"), connection)
+
+        inserts, updates, delete_ids = diff_towns(df, existing, key_columns, value_columns)
+
+        if len(inserts):
+            columns = key_columns + value_columns
+            insert_sql = text(
+                f"INSERT INTO `{table_name}` (" + ", ".join(f"`{c}`" for c in columns) + ") "
+                "VALUES (" + ", ".join(f":{c}" for c in columns) + ")"
+            )
+            for batch in _batches(_records(inserts)):
+                connection.execute(insert_sql, batch)
+
+        if len(updates):
+            update_sql = text(
+                f"UPDATE `{table_name}` SET " + ", ".join(f"`{c}` = :{c}" for c in value_columns) + " WHERE id = :id"
+            )
+            for batch in _batches(_records(updates)):
+                connection.execute(update_sql, batch)
+
+        if delete_ids:
+            delete_sql = text(f"DELETE FROM `{table_name}` WHERE id IN :ids").bindparams(bindparam('ids', expanding=True))
+            for batch in _batches(delete_ids):
+                connection.execute(delete_sql, {'ids': batch})
+
+    return {'inserted': len(inserts), 'updated': len(updates), 'deleted': len(delete_ids)}
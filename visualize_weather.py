@@ -1,11 +1,37 @@
-import pandas as pd
+"""Static matplotlib charts of the latest weather snapshot.
+
+Renders headless (Agg) and in parallel: the 2x3 overview and every single
+panel, for all towns and for each federal state, as full-size PNGs plus
+low-dpi thumbnails. Each region's data is hashed, and outputs whose hash
+matches the last run are not rendered again, so the script can run after
+every ingest.
+
+    python visualize_weather.py [--force] [--workers N]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import matplotlib
+matplotlib.use('Agg')  # No display needed; must be selected before pyplot is imported
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import seaborn as sns
 from sqlalchemy import create_engine
-import numpy as np
-import os
 from dotenv import load_dotenv
 
+from dashboard_snapshot import LATEST_PER_TOWN_QUERY
+from file_utils import atomic_write_bytes, atomic_write_text
+from snapshot_arrow import latest_frame
+from weather_loader import read_weather
+from weather_stats import stats_for
+
 load_dotenv() # Load environment variables from .env
 
 # MySQL connection settings
@@ -18,118 +44,244 @@ MYSQL_DATABASE = "OpenMeteo"
 # Connect to database
 engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}")
 
-print("Fetching weather data from OpenMeteo database...")
+# The overview of all towns keeps its historical file name
+OVERVIEW_FILE = 'weather_visualization.png'
+OUTPUT_DIR = 'visualizations'
+ALL_REGION = 'all'
+
+FULL_DPI = 300
+THUMBNAIL_DPI = 40
 
-# Read weather data
-query = "SELECT * FROM weather_records ORDER BY recorded_at DESC LIMIT 100"
-df = pd.read_sql(query, engine)
+# Columns used by the charts and the statistics; nothing else is loaded
+VISUALIZE_COLUMNS = ['town', 'federal_state', 'inhabitants', 'recorded_at', 'recorded_date', 'temperature_2m',
+                     'apparent_temperature', 'relative_humidity_2m', 'wind_speed_10m', 'cloud_cover', 'pressure_msl']
 
-print(f"Retrieved {len(df)} records")
-print(f"Date range: {df['recorded_date'].min()} to {df['recorded_date'].max()}")
+# Output file -> data hash of the last render
+STATE_FILE = os.path.join(".cache", "visualize_state.json")
+# Bump when the charts change, so every output is rendered again
+RENDER_VERSION = 1
 
 # Set style
 sns.set_style("darkgrid")
-plt.rcParams['figure.figsize'] = (16, 12)
-
-# Create figure with subplots
-fig, axes = plt.subplots(2, 3, figsize=(18, 12))
-fig.suptitle('Austrian Towns Weather Analysis', fontsize=20, fontweight='bold')
-
-# Group by date if multiple records exist
-df_latest = df.drop_duplicates(subset=['town'], keep='first')
-
-# 1. Temperature Distribution
-ax1 = axes[0, 0]
-sorted_data = df_latest.sort_values('temperature_2m', ascending=True).tail(20)
-ax1.barh(sorted_data['town'], sorted_data['temperature_2m'], color='steelblue')
-ax1.set_xlabel('Temperature (°C)', fontsize=11, fontweight='bold')
-ax1.set_title('Top 20 Warmest Towns', fontsize=12, fontweight='bold')
-ax1.axvline(x=0, color='red', linestyle='--', linewidth=1, alpha=0.7)
-
-# 2. Humidity Distribution
-ax2 = axes[0, 1]
-ax2.scatter(df_latest['temperature_2m'], df_latest['relative_humidity_2m'],
-           s=100, alpha=0.6, c=df_latest['temperature_2m'], cmap='coolwarm')
-ax2.set_xlabel('Temperature (°C)', fontsize=11, fontweight='bold')
-ax2.set_ylabel('Humidity (%)', fontsize=11, fontweight='bold')
-ax2.set_title('Temperature vs Humidity', fontsize=12, fontweight='bold')
-ax2.grid(True, alpha=0.3)
-
-# 3. Wind Speed Distribution
-ax3 = axes[0, 2]
-sorted_wind = df_latest.sort_values('wind_speed_10m', ascending=False).head(15)
-colors_wind = plt.cm.YlOrRd(sorted_wind['wind_speed_10m'] / sorted_wind['wind_speed_10m'].max())
-ax3.barh(sorted_wind['town'], sorted_wind['wind_speed_10m'], color=colors_wind)
-ax3.set_xlabel('Wind Speed (km/h)', fontsize=11, fontweight='bold')
-ax3.set_title('Top 15 Windiest Towns', fontsize=12, fontweight='bold')
-
-# 4. Cloud Cover Distribution
-ax4 = axes[1, 0]
-cloud_categories = pd.cut(df_latest['cloud_cover'], bins=[0, 25, 50, 75, 100],
-                          labels=['Clear', 'Partly Cloudy', 'Mostly Cloudy', 'Overcast'])
-cloud_counts = cloud_categories.value_counts()
-colors_cloud = ['#FFD700', '#87CEEB', '#B0C4DE', '#696969']
-ax4.pie(cloud_counts.values, labels=cloud_counts.index, autopct='%1.1f%%',
-       colors=colors_cloud, startangle=90)
-ax4.set_title('Cloud Cover Distribution', fontsize=12, fontweight='bold')
-
-# 5. Apparent Temperature vs Actual Temperature
-ax5 = axes[1, 1]
-ax5.scatter(df_latest['temperature_2m'], df_latest['apparent_temperature'],
-           s=100, alpha=0.6, color='coral')
-# Add diagonal line for reference
-min_temp = min(df_latest['temperature_2m'].min(), df_latest['apparent_temperature'].min())
-max_temp = max(df_latest['temperature_2m'].max(), df_latest['apparent_temperature'].max())
-ax5.plot([min_temp, max_temp], [min_temp, max_temp], 'k--', alpha=0.5, label='Same')
-ax5.set_xlabel('Actual Temperature (°C)', fontsize=11, fontweight='bold')
-ax5.set_ylabel('Apparent Temperature (°C)', fontsize=11, fontweight='bold')
-ax5.set_title('Actual vs Apparent Temperature', fontsize=12, fontweight='bold')
-ax5.legend()
-ax5.grid(True, alpha=0.3)
-
-# 6. Federal State Statistics
-ax6 = axes[1, 2]
-state_data = df_latest.groupby('federal_state')['temperature_2m'].mean().sort_values(ascending=True)
-colors_state = plt.cm.RdYlBu_r(np.linspace(0.2, 0.8, len(state_data)))
-ax6.barh(state_data.index, state_data.values, color=colors_state)
-ax6.set_xlabel('Average Temperature (°C)', fontsize=11, fontweight='bold')
-ax6.set_title('Average Temperature by Federal State', fontsize=12, fontweight='bold')
-
-plt.tight_layout()
-
-# Save figure
-output_file = 'weather_visualization.png'
-plt.savefig(output_file, dpi=300, bbox_inches='tight')
-print(f"\n✓ Visualization saved to {output_file}")
-
-# Print statistics
-print("\n" + "="*80)
-print("WEATHER STATISTICS")
-print("="*80)
-print(f"\nTemperature Statistics:")
-print(f"  Highest: {df_latest['temperature_2m'].max()}°C ({df_latest.loc[df_latest['temperature_2m'].idxmax(), 'town']})")
-print(f"  Lowest: {df_latest['temperature_2m'].min()}°C ({df_latest.loc[df_latest['temperature_2m'].idxmin(), 'town']})")
-print(f"  Average: {df_latest['temperature_2m'].mean():.2f}°C")
-print(f"  Std Dev: {df_latest['temperature_2m'].std():.2f}°C")
-
-print(f"\nHumidity Statistics:")
-print(f"  Highest: {df_latest['relative_humidity_2m'].max()}% ({df_latest.loc[df_latest['relative_humidity_2m'].idxmax(), 'town']})")
-print(f"  Lowest: {df_latest['relative_humidity_2m'].min()}% ({df_latest.loc[df_latest['relative_humidity_2m'].idxmin(), 'town']})")
-print(f"  Average: {df_latest['relative_humidity_2m'].mean():.1f}%")
-
-print(f"\nWind Speed Statistics:")
-print(f"  Highest: {df_latest['wind_speed_10m'].max()} km/h ({df_latest.loc[df_latest['wind_speed_10m'].idxmax(), 'town']})")
-print(f"  Lowest: {df_latest['wind_speed_10m'].min()} km/h ({df_latest.loc[df_latest['wind_speed_10m'].idxmin(), 'town']})")
-print(f"  Average: {df_latest['wind_speed_10m'].mean():.2f} km/h")
-
-print(f"\nCloud Cover Statistics:")
-print(f"  Clearest: {df_latest['cloud_cover'].min()}% ({df_latest.loc[df_latest['cloud_cover'].idxmin(), 'town']})")
-print(f"  Most Cloudy: {df_latest['cloud_cover'].max()}% ({df_latest.loc[df_latest['cloud_cover'].idxmax(), 'town']})")
-print(f"  Average: {df_latest['cloud_cover'].mean():.1f}%")
-
-print(f"\nPressure Statistics:")
-print(f"  Highest: {df_latest['pressure_msl'].max()} hPa ({df_latest.loc[df_latest['pressure_msl'].idxmax(), 'town']})")
-print(f"  Lowest: {df_latest['pressure_msl'].min()} hPa ({df_latest.loc[df_latest['pressure_msl'].idxmin(), 'town']})")
-print(f"  Average: {df_latest['pressure_msl'].mean():.2f} hPa")
-
-plt.show()
+
+
+def load_latest():
+    """Latest record per town."""
+    def from_db():
+        print("Fetching weather data from OpenMeteo database...")
+        df = read_weather(engine, LATEST_PER_TOWN_QUERY, VISUALIZE_COLUMNS, where="", label='visualize',
+                          verbose=True)
+        print(f"Retrieved {len(df)} records")
+        return df
+    # The snapshot file published at ingest, if it is fresh
+    df = latest_frame(VISUALIZE_COLUMNS, from_db)
+    print(f"Date range: {df['recorded_date'].min()} to {df['recorded_date'].max()}")
+    return df.drop_duplicates(subset=['town'], keep='first')
+
+
+def plot_temperature(ax, df_latest, stats):
+    sorted_data = df_latest.sort_values('temperature_2m', ascending=True).tail(20)
+    ax.barh(sorted_data['town'], sorted_data['temperature_2m'], color='steelblue')
+    ax.set_xlabel('Temperature (°C)', fontsize=11, fontweight='bold')
+    ax.set_title('Top 20 Warmest Towns', fontsize=12, fontweight='bold')
+    ax.axvline(x=0, color='red', linestyle='--', linewidth=1, alpha=0.7)
+
+
+def plot_humidity(ax, df_latest, stats):
+    ax.scatter(df_latest['temperature_2m'], df_latest['relative_humidity_2m'],
+               s=100, alpha=0.6, c=df_latest['temperature_2m'], cmap='coolwarm')
+    ax.set_xlabel('Temperature (°C)', fontsize=11, fontweight='bold')
+    ax.set_ylabel('Humidity (%)', fontsize=11, fontweight='bold')
+    ax.set_title('Temperature vs Humidity', fontsize=12, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+
+
+def plot_wind(ax, df_latest, stats):
+    sorted_wind = df_latest.sort_values('wind_speed_10m', ascending=False).head(15)
+    colors_wind = plt.cm.YlOrRd(sorted_wind['wind_speed_10m'] / sorted_wind['wind_speed_10m'].max())
+    ax.barh(sorted_wind['town'], sorted_wind['wind_speed_10m'], color=colors_wind)
+    ax.set_xlabel('Wind Speed (km/h)', fontsize=11, fontweight='bold')
+    ax.set_title('Top 15 Windiest Towns', fontsize=12, fontweight='bold')
+
+
+def plot_cloud_cover(ax, df_latest, stats):
+    cloud_categories = pd.cut(df_latest['cloud_cover'], bins=[0, 25, 50, 75, 100],
+                              labels=['Clear', 'Partly Cloudy', 'Mostly Cloudy', 'Overcast'])
+    cloud_counts = cloud_categories.value_counts()
+    colors_cloud = ['#FFD700', '#87CEEB', '#B0C4DE', '#696969']
+    ax.pie(cloud_counts.values, labels=cloud_counts.index, autopct='%1.1f%%',
+           colors=colors_cloud, startangle=90)
+    ax.set_title('Cloud Cover Distribution', fontsize=12, fontweight='bold')
+
+
+def plot_apparent_temperature(ax, df_latest, stats):
+    ax.scatter(df_latest['temperature_2m'], df_latest['apparent_temperature'],
+               s=100, alpha=0.6, color='coral')
+    # Add diagonal line for reference
+    min_temp = min(df_latest['temperature_2m'].min(), df_latest['apparent_temperature'].min())
+    max_temp = max(df_latest['temperature_2m'].max(), df_latest['apparent_temperature'].max())
+    ax.plot([min_temp, max_temp], [min_temp, max_temp], 'k--', alpha=0.5, label='Same')
+    ax.set_xlabel('Actual Temperature (°C)', fontsize=11, fontweight='bold')
+    ax.set_ylabel('Apparent Temperature (°C)', fontsize=11, fontweight='bold')
+    ax.set_title('Actual vs Apparent Temperature', fontsize=12, fontweight='bold')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+
+def plot_state_means(ax, df_latest, stats):
+    state_means = {state: entry['metrics']['temperature_2m']['mean'] for state, entry in stats['states'].items()
+                   if 'temperature_2m' in entry['metrics']}
+    state_data = pd.Series(state_means, dtype=float).sort_values(ascending=True)
+    colors_state = plt.cm.RdYlBu_r(np.linspace(0.2, 0.8, len(state_data)))
+    ax.barh(state_data.index, state_data.values, color=colors_state)
+    ax.set_xlabel('Average Temperature (°C)', fontsize=11, fontweight='bold')
+    ax.set_title('Average Temperature by Federal State', fontsize=12, fontweight='bold')
+
+
+# Panels in overview order (2 rows x 3 columns): name -> plot function(ax, df_latest, stats)
+PANELS = {
+    'temperature': plot_temperature,
+    'humidity': plot_humidity,
+    'wind': plot_wind,
+    'cloud_cover': plot_cloud_cover,
+    'apparent_temperature': plot_apparent_temperature,
+    'state_means': plot_state_means,
+}
+# Panels that only make sense across several states
+ALL_REGION_PANELS = {'state_means'}
+OVERVIEW = 'overview'
+
+
+def slugify(value):
+    value = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', value.lower()).strip('-') or 'x'
+
+
+def output_path(region, chart):
+    if region == ALL_REGION and chart == OVERVIEW:
+        return OVERVIEW_FILE
+    return os.path.join(OUTPUT_DIR, slugify(region), f"{chart}.png")
+
+
+def thumbnail_path(path):
+    stem, extension = os.path.splitext(path)
+    return f"{stem}_thumb{extension}"
+
+
+def region_frames(df_latest):
+    """{region: towns of that region}: all towns plus one frame per federal state."""
+    regions = {ALL_REGION: df_latest}
+    for state, group in df_latest.groupby('federal_state', sort=True, observed=True):
+        regions[state] = group
+    return regions
+
+
+def data_hash(df):
+    canonical = df.sort_values('town').to_csv(index=False)
+    return hashlib.sha256(f"{RENDER_VERSION}\n{canonical}".encode('utf-8')).hexdigest()
+
+
+def build_figure(region, chart, df, stats):
+    title = 'Austrian Towns Weather Analysis' if region == ALL_REGION else f'Weather Analysis: {region}'
+    if chart == OVERVIEW:
+        fig, axes = plt.subplots(2, 3, figsize=(18, 12))
+        fig.suptitle(title, fontsize=20, fontweight='bold')
+        for ax, (name, plot) in zip(axes.flat, PANELS.items()):
+            if region != ALL_REGION and name in ALL_REGION_PANELS:
+                ax.set_axis_off()
+                continue
+            plot(ax, df, stats)
+    else:
+        fig, ax = plt.subplots(figsize=(8, 6))
+        PANELS[chart](ax, df, stats)
+        if region != ALL_REGION:
+            ax.set_title(f"{ax.get_title()} ({region})", fontsize=12, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+def render_chart(job):
+    """Renders one chart as a full-size PNG and a thumbnail; runs in a worker process."""
+    region, chart, df, stats, path = job
+    fig = build_figure(region, chart, df, stats)
+    try:
+        # The figure is laid out once and rasterized at both resolutions
+        for target, dpi in ((path, FULL_DPI), (thumbnail_path(path), THUMBNAIL_DPI)):
+            buffer = BytesIO()
+            fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+            atomic_write_bytes(target, buffer.getvalue())
+    finally:
+        plt.close(fig)
+    return path
+
+
+def read_state():
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+# Printed statistics: (metric, title, unit, lowest label, highest label, decimals of the average)
+PRINTED_METRICS = [
+    ('temperature_2m', "Temperature", "°C", "Lowest", "Highest", 2),
+    ('relative_humidity_2m', "Humidity", "%", "Lowest", "Highest", 1),
+    ('wind_speed_10m', "Wind Speed", " km/h", "Lowest", "Highest", 2),
+    ('cloud_cover', "Cloud Cover", "%", "Clearest", "Most Cloudy", 1),
+    ('pressure_msl', "Pressure", " hPa", "Lowest", "Highest", 2),
+]
+
+
+def print_statistics(stats):
+    print("\n" + "="*80)
+    print("WEATHER STATISTICS")
+    print("="*80)
+    for metric, title, unit, lowest, highest, decimals in PRINTED_METRICS:
+        summary = stats['metrics'].get(metric)
+        if summary is None:
+            continue
+        print(f"\n{title} Statistics:")
+        print(f"  {highest}: {summary['max']}{unit} ({summary['max_town']})")
+        print(f"  {lowest}: {summary['min']}{unit} ({summary['min_town']})")
+        print(f"  Average: {summary['mean']:.{decimals}f}{unit}")
+        if metric == 'temperature_2m':
+            if summary['std'] is not None:
+                print(f"  Std Dev: {summary['std']:.2f}{unit}")
+            if summary['weighted_mean'] is not None:
+                print(f"  Population-weighted Average: {summary['weighted_mean']:.2f}{unit}")
+
+
+def main(force=False, workers=None):
+    df_latest = load_latest()
+    stats = stats_for(df_latest)
+    previous = {} if force else read_state()
+    state = {}
+    jobs = []
+    for region, df in region_frames(df_latest).items():
+        region_hash = data_hash(df)
+        charts = [OVERVIEW] + [name for name in PANELS if region == ALL_REGION or name not in ALL_REGION_PANELS]
+        for chart in charts:
+            path = output_path(region, chart)
+            state[path] = region_hash
+            if previous.get(path) != region_hash or not os.path.exists(path) or not os.path.exists(thumbnail_path(path)):
+                jobs.append((region, chart, df, stats, path))
+
+    if jobs:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            for path in executor.map(render_chart, jobs):
+                print(f"✓ Visualization saved to {path}")
+    atomic_write_text(STATE_FILE, json.dumps(state, indent=0, sort_keys=True))
+    print(f"\n✓ {len(jobs)} of {len(state)} charts rendered, {len(state) - len(jobs)} unchanged")
+
+    print_statistics(stats)
+    return len(jobs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the weather charts (full size and thumbnails) headless.")
+    parser.add_argument('--force', action='store_true', help="render all charts even if their data is unchanged")
+    parser.add_argument('--workers', type=int, default=None, help="render processes (default: CPU count)")
+    args = parser.parse_args()
+    main(force=args.force, workers=args.workers)
@@ -0,0 +1,95 @@
+"""Memory-lean loading of weather rows: declared columns only, compact dtypes, timestamps parsed once.
+
+Readers declare the columns they use and pass a query with a {columns}
+placeholder instead of SELECT *. The result is compacted in place:
+repeated strings (town, federal_state, timezone, weather_description, ...)
+become categoricals and integer codes the smallest integer type.
+Measurements stay float64: they end up in persisted statistics and figure
+JSON, where float32 would show as noise (2.67 -> 2.6700000762939453).
+Every call is recorded as a LoadReport (rows, size before and after
+compaction, query and compaction time) in RECENT_LOADS, and printed when
+verbose.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+from sqlalchemy import text
+
+# Low-cardinality strings, stored once per distinct value as a categorical
+CATEGORY_COLUMNS = {'town', 'federal_state', 'country', 'state', 'timezone', 'timezone_abbreviation',
+                    'weather_description', 'recorded_date'}
+
+RECENT_LOADS = deque(maxlen=50)
+_recent_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class LoadReport:
+    label: str
+    rows: int
+    columns: int
+    raw_bytes: int          # memory of the frame as read by pandas
+    compact_bytes: int      # memory after compact()
+    query_ms: float
+    compact_ms: float
+
+    def __str__(self):
+        saved = 1 - self.compact_bytes / self.raw_bytes if self.raw_bytes else 0.0
+        return (f"{self.label}: {self.rows} rows x {self.columns} columns, "
+                f"{self.raw_bytes / 1024:.1f} KB -> {self.compact_bytes / 1024:.1f} KB ({saved:.0%} less), "
+                f"query {self.query_ms:.0f} ms, compact {self.compact_ms:.1f} ms")
+
+
+def compact(df, parse_dates=()):
+    """Converts df's columns in place to compact dtypes; `parse_dates` columns are parsed from ISO strings."""
+    for column in df.columns:
+        series = df[column]
+        if column in parse_dates:
+            df[column] = pd.to_datetime(series, format='ISO8601')
+        elif column in CATEGORY_COLUMNS:
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                df[column] = series.astype('category')
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast='integer')
+    return df
+
+
+def memory_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def read_weather(engine, query, columns, params=None, parse_dates=(), label=None, verbose=False, **placeholders):
+    """Runs `query` with its {columns} placeholder filled from `columns`; returns the compacted frame.
+
+    Further placeholders of the query (e.g. {where}) are filled from `placeholders`.
+    """
+    start = time.perf_counter()
+    query = query.format(columns=', '.join(columns), **placeholders)
+    df = pd.read_sql_query(text(query), engine, params=params)
+    query_ms = (time.perf_counter() - start) * 1000
+
+    raw_bytes = memory_bytes(df)
+    start = time.perf_counter()
+    compact(df, parse_dates)
+    compact_ms = (time.perf_counter() - start) * 1000
+
+    record_load(LoadReport(label or 'weather', len(df), len(df.columns), raw_bytes, memory_bytes(df),
+                           round(query_ms, 3), round(compact_ms, 3)), verbose)
+    return df
+
+
+def record_load(report, verbose=False):
+    """Adds a LoadReport to RECENT_LOADS (and prints it when verbose)."""
+    with _recent_lock:
+        RECENT_LOADS.append(report)
+    if verbose:
+        print(f"✓ Loaded {report}")
+
+
+def recent_loads():
+    """The last LoadReports as dicts, newest last."""
+    with _recent_lock:
+        return [asdict(report) for report in RECENT_LOADS]
@@ -0,0 +1,142 @@
+"""Statistics of the latest observation per town, computed once and shared by all renderers.
+
+fetch_weather.py computes them right after each ingest and writes them to
+STATS_FILE. generate_weather_webpage.py, visualize_weather.py and the other
+renderers read that file through stats_for() instead of aggregating the
+snapshot themselves. stats_for() only recomputes (without saving) when the
+file belongs to another snapshot, e.g. before the first ingest.
+
+Per metric (overall and per federal state): count, min, max, mean, std, the
+towns with the min/max, and the mean weighted by inhabitants. Plus the top-N
+rankings.
+"""
+import json
+import math
+import os
+
+import pandas as pd
+
+from file_utils import atomic_write_text
+
+STATS_FILE = os.path.join(".cache", "weather_stats.json")
+# Bump when the layout of the stats changes, so old files are recomputed
+STATS_VERSION = 1
+
+STATS_METRICS = ['temperature_2m', 'apparent_temperature', 'relative_humidity_2m', 'wind_speed_10m',
+                 'wind_gusts_10m', 'cloud_cover', 'pressure_msl', 'precipitation']
+STATE_COLUMN = 'federal_state'
+WEIGHT_COLUMN = 'inhabitants'
+
+# Rankings: name -> (metric, ascending)
+RANKINGS = {
+    'warmest': ('temperature_2m', False),
+    'coldest': ('temperature_2m', True),
+    'windiest': ('wind_speed_10m', False),
+}
+RANKING_COLUMNS = ['town', 'federal_state', 'temperature_2m', 'relative_humidity_2m', 'wind_speed_10m']
+TOP_N = 10
+
+_OVERALL = '__all__'
+
+
+def _value(value):
+    """JSON-safe scalar: numpy types to Python, NaN to None."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+        return None if isinstance(value, float) and math.isnan(value) else value
+    return value
+
+
+def _metric_tables(df, metrics, groups):
+    """{group: {metric: summary}} with one grouped aggregation per metric."""
+    weights = pd.to_numeric(df[WEIGHT_COLUMN], errors='coerce') if WEIGHT_COLUMN in df else None
+    tables = {}
+    for metric in metrics:
+        values = pd.to_numeric(df[metric], errors='coerce').dropna()
+        if values.empty:
+            continue
+        keys = groups[values.index]
+        described = values.groupby(keys, sort=True).agg(['count', 'min', 'max', 'mean', 'std', 'idxmin', 'idxmax'])
+        if weights is not None:
+            w = weights[values.index].where(lambda s: s > 0)
+            weighted = (values * w).groupby(keys).sum(min_count=1) / w.groupby(keys).sum(min_count=1)
+        else:
+            weighted = pd.Series(dtype=float)
+        for group, row in described.iterrows():
+            tables.setdefault(group, {})[metric] = {
+                'count': int(row['count']),
+                'min': _value(row['min']),
+                'max': _value(row['max']),
+                'mean': _value(row['mean']),
+                'std': _value(row['std']),
+                'weighted_mean': _value(weighted.get(group)),
+                'min_town': _value(df.at[row['idxmin'], 'town']),
+                'max_town': _value(df.at[row['idxmax'], 'town']),
+            }
+    return tables
+
+
+def compute_stats(df_latest, metrics=STATS_METRICS, top_n=TOP_N):
+    """Statistics of a latest-per-town frame as a JSON-serializable dict."""
+    df_latest = df_latest.reset_index(drop=True)
+    metrics = [metric for metric in metrics if metric in df_latest]
+    overall = pd.Series(_OVERALL, index=df_latest.index)
+    tables = _metric_tables(df_latest, metrics, overall)
+
+    states = {}
+    if STATE_COLUMN in df_latest:
+        state_keys = df_latest[STATE_COLUMN].astype(object).fillna('')
+        state_tables = _metric_tables(df_latest, metrics, state_keys)
+        counts = state_keys.value_counts()
+        states = {state: {'town_count': int(counts[state]), 'metrics': state_tables.get(state, {})}
+                  for state in sorted(counts.index)}
+
+    ranking_columns = [column for column in RANKING_COLUMNS if column in df_latest]
+    rankings = {}
+    for name, (metric, ascending) in RANKINGS.items():
+        if metric not in df_latest:
+            continue
+        ranked = df_latest.dropna(subset=[metric])
+        ranked = ranked.nsmallest(top_n, metric) if ascending else ranked.nlargest(top_n, metric)
+        rankings[name] = [{column: _value(value) for column, value in row.items()}
+                          for row in ranked[ranking_columns].to_dict('records')]
+
+    watermark = df_latest['recorded_at'].max() if 'recorded_at' in df_latest and len(df_latest) else None
+    return {
+        'version': STATS_VERSION,
+        'watermark': None if watermark is None else str(watermark),
+        'town_count': len(df_latest),
+        'metrics': tables.get(_OVERALL, {}),
+        'states': states,
+        'rankings': rankings,
+    }
+
+
+def save_stats(stats, path=STATS_FILE):
+    atomic_write_text(path, json.dumps(stats, indent=1, sort_keys=True))
+
+
+def load_stats(path=STATS_FILE):
+    """The persisted stats, or None if there are none in the current layout."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return stats if stats.get('version') == STATS_VERSION else None
+
+
+def stats_for(df_latest, path=STATS_FILE):
+    """Persisted stats if they belong to df_latest's snapshot, otherwise computed from df_latest.
+
+    Stats computed here are not saved: the file belongs to the ingest, and a reader with
+    another frame (older, or a subset of the towns) must not overwrite it.
+    """
+    stats = load_stats(path)
+    watermark = df_latest['recorded_at'].max() if len(df_latest) else None
+    if stats is not None and stats['watermark'] == (None if watermark is None else str(watermark)) \
+            and stats['town_count'] == len(df_latest):
+        return stats
+    return compute_stats(df_latest)
@@ -1,12 +1,23 @@
 import dash
 from dash import dcc, html
-from dash.dependencies import Input, Output
-import plotly.graph_objects as go
-import pandas as pd
+from dash.dependencies import Input, Output, State
 from sqlalchemy import create_engine
+import json
 import os
 from dotenv import load_dotenv
 
+from dashboard_figures import (DEFAULT_THEME, FIGURE_NAMES, create_town_map_figure, create_town_map_traces,
+                               history_figure_json, town_figure_patches, town_figures_json)
+from dashboard_history import DEFAULT_RANGE, HISTORY_RANGES, town_history
+from dashboard_metrics import init_app, instrument, stage
+from dashboard_map import COLOR_MODES, DEFAULT_VIEW, TownLayer, viewport_for, viewport_from_relayout
+from dashboard_timeline import Timeline
+from dashboard_snapshot import SnapshotStore
+from figure_cache import FigureCache
+from shared_cache import FileCache
+from snapshot_arrow import SNAPSHOT_DIR
+from weather_loader import recent_loads
+
 load_dotenv() # Load environment variables from .env
 
 # MySQL connection settings
@@ -16,260 +27,401 @@ MYSQL_HOST = os.getenv("MYSQL_HOST")
 MYSQL_PORT = int(os.getenv("MYSQL_PORT"))
 MYSQL_DATABASE = "OpenMeteo" # The database for weather records
 
+GEODATA_DATABASE = "geodata" # all_towns for the map
+
 # Create SQLAlchemy engine for the OpenMeteo database
 engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}")
+geodata_engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{GEODATA_DATABASE}")
 
-# Daten aus der SQLite-Datenbank laden
-def load_data():
-    """Lädt die neuesten Wetterdaten für jeden Ort aus der Datenbank."""
-    try:
-        # Use the global engine created earlier
-        query = """
-        SELECT * FROM (
-            SELECT *,
-                   ROW_NUMBER() OVER(PARTITION BY town ORDER BY recorded_at DESC) as rn
-            FROM verbose_weather_records
-        ) AS subquery
-        WHERE rn = 1;
-        """
-        df = pd.read_sql_query(query, engine) # Use the global engine
-        return df
-    except Exception as e:
-        print(f"Fehler beim Laden der Daten aus MySQL: {e}")
-        # Erstellt ein leeres DataFrame mit den erwarteten Spalten bei einem Fehler
-        return pd.DataFrame(columns=[
-            'location_name', 'federal_state', 'timestamp', 'temperature_2m', 'relative_humidity_2m',
-            'apparent_temperature', 'is_day', 'precipitation', 'rain', 'snowfall',
-            'cloud_cover', 'surface_pressure', 'wind_speed_10m', 'wind_direction_10m',
-            'wind_gusts_10m', 'weather_code_description', 'weather_code_image'
-        ])
-
-# Daten initial laden
-df = load_data()
-bundeslaender = sorted(df['federal_state'].unique().tolist())
-
-# Initialisiert die Dash-App
-app = dash.Dash(__name__)
+# Sekunden zwischen zwei Aktualisierungen des Daten-Snapshots
+REFRESH_TTL_SECONDS = int(os.getenv("DASHBOARD_REFRESH_SECONDS", "300"))
+
+# Spalten, die Anzeigen und Karte verwenden; nur diese werden geladen (kompakte Datentypen, siehe weather_loader.py)
+SNAPSHOT_COLUMNS = [
+    'town', 'federal_state', 'recorded_at', 'longitude', 'latitude', 'temperature_2m',
+    'relative_humidity_2m', 'pressure_msl', 'cloud_cover', 'wind_speed_10m', 'wind_direction_10m',
+    'wind_gusts_10m', 'weather_code'
+]
+
+# Gemeinsames Cache-Verzeichnis aller Worker-Prozesse (gesetzt von serve_dashboard.py); leer = nur im Prozess
+SHARED_CACHE_DIR = os.getenv("DASHBOARD_SHARED_CACHE_DIR")
+
+# Neueste Wetterdaten je Ort; ein Hintergrund-Thread lädt nur Zeilen nach dem letzten recorded_at nach,
+# bevorzugt aus der Arrow-Datei, die fetch_weather.py bei jeder Abholung schreibt
+snapshot_store = SnapshotStore(
+    engine, ttl=REFRESH_TTL_SECONDS, empty_columns=SNAPSHOT_COLUMNS, columns=SNAPSHOT_COLUMNS,
+    shared_path=os.path.join(SHARED_CACHE_DIR, "snapshot.pickle") if SHARED_CACHE_DIR else None,
+    arrow_dir=SNAPSHOT_DIR
+)
+
+# Daten initial laden und Aktualisierung im Hintergrund starten
+snapshot_store.refresh()
+snapshot_store.start()
+
+# Alle Orte aus geodata.all_towns für die Karte, verknüpft mit dem aktuellen Snapshot
+town_layer = TownLayer(geodata_engine)
+
+# Frühere Messläufe für den Zeitschieber der Karte, mit LRU-Cache und Vorladen der Nachbarn
+# (die letzten 24 Stunden aus der Arrow-Verlaufsdatei)
+timeline = Timeline(engine, columns=SNAPSHOT_COLUMNS, arrow_dir=SNAPSHOT_DIR)
+
+# Figuren ändern sich nur mit neuen Beobachtungen; wiederholte Auswahl kommt aus dem Cache
+FIGURE_CACHE_SIZE = int(os.getenv("DASHBOARD_FIGURE_CACHE_SIZE", "256"))
+figure_cache = FigureCache(
+    max_entries=FIGURE_CACHE_SIZE,
+    backing=FileCache(os.path.join(SHARED_CACHE_DIR, "figures")) if SHARED_CACHE_DIR else None
+)
+
+# Initialisiert die Dash-App; gzip-Komprimierung der Antworten benötigt flask-compress
+app = dash.Dash(__name__, compress=os.getenv("DASHBOARD_COMPRESS") == "1")
 app.title = "Wetter-Dashboard"
 
-# App-Layout
-app.layout = html.Div(style={'backgroundColor': '#111111', 'color': '#7FDBFF', 'font-family': 'sans-serif'}, children=[
-    html.H1(
-        children='Wetter-Dashboard Österreich',
-        style={'textAlign': 'center', 'padding': '10px', 'marginBottom': '5px', 'fontSize': '24px'}
-    ),
+# WSGI-Anwendung für gunicorn/waitress (siehe serve_dashboard.py)
+server = app.server
 
-    # Dropdowns für die Auswahl
-    html.Div([
-        html.Div([
-            html.Label('Bundesland', style={'fontSize': '12px', 'marginBottom': '2px', 'display': 'block'}),
-            dcc.Dropdown(
-                id='state-dropdown',
-                style={'color': 'black', 'fontSize': '13px'}
-            )
-        ], style={'width': '48%', 'display': 'inline-block', 'padding': '3px', 'marginRight': '2%'}),
+# Server-Timing-Header je Antwort und Latenz-Histogramme je Callback und Schritt unter /metrics
+# (mit dem gemeinsamen Cache zusammengeführt über alle Worker-Prozesse)
+init_app(server, shared_dir=os.path.join(SHARED_CACHE_DIR, "metrics") if SHARED_CACHE_DIR else None)
 
+# Zähler für Snapshot-Aktualisierungen und Figure-Cache, inkl. zusammengelegter Anfragen
+@server.route('/stats')
+def dashboard_stats():
+    return {'snapshot': snapshot_store.metrics(), 'figures': figure_cache.stats(), 'timeline': timeline.stats(),
+            'loads': recent_loads()}
+
+def town_index_data(snapshot):
+    """Bundesland -> Orte-Zuordnung des Snapshots für den dcc.Store im Browser."""
+    return {
+        'version': snapshot.version,
+        'states': [[state, list(towns)] for state, towns in snapshot.state_towns.items()],
+    }
+
+# Ansicht eines Orts: Auswahl, aktuelle Werte und Verlauf
+def town_view():
+    return html.Div([
+        # Dropdowns für die Auswahl
         html.Div([
-            html.Label('Ort', style={'fontSize': '12px', 'marginBottom': '2px', 'display': 'block'}),
-            dcc.Dropdown(id='city-dropdown', style={'color': 'black', 'fontSize': '13px'})
-        ], style={'width': '48%', 'display': 'inline-block', 'padding': '3px'})
-    ], style={'marginBottom': '5px'}),
+            html.Div([
+                html.Label('Bundesland', style={'fontSize': '12px', 'marginBottom': '2px', 'display': 'block'}),
+                dcc.Dropdown(
+                    id='state-dropdown',
+                    style={'color': 'black', 'fontSize': '13px'}
+                )
+            ], style={'width': '48%', 'display': 'inline-block', 'padding': '3px', 'marginRight': '2%'}),
+
+            html.Div([
+                html.Label('Ort', style={'fontSize': '12px', 'marginBottom': '2px', 'display': 'block'}),
+                dcc.Dropdown(id='city-dropdown', style={'color': 'black', 'fontSize': '13px'})
+            ], style={'width': '48%', 'display': 'inline-block', 'padding': '3px'})
+        ], style={'marginBottom': '5px'}),
+
+        # Container für die Visualisierungen; die Graphen bleiben bestehen und werden per Patch aktualisiert
+        html.Div(id='weather-message'),
+        html.Div(id='weather-graphs', style={'display': 'none', 'padding': '20px'}, children=[
+            html.Div([
+                html.Div([
+                    dcc.Graph(id='temperature-graph', config={'displayModeBar': False})
+                ], style={'width': '23%', 'display': 'inline-block', 'marginRight': '2%'}),
+                html.Div([
+                    dcc.Graph(id='humidity-graph', config={'displayModeBar': False})
+                ], style={'width': '23%', 'display': 'inline-block', 'marginRight': '2%'}),
+                html.Div([
+                    dcc.Graph(id='pressure-graph', config={'displayModeBar': False})
+                ], style={'width': '23%', 'display': 'inline-block', 'marginRight': '2%'}),
+                html.Div([
+                    dcc.Graph(id='cloud_cover-graph', config={'displayModeBar': False})
+                ], style={'width': '23%', 'display': 'inline-block'}),
+            ], style={'width': '100%', 'marginBottom': '20px'}),
+            html.Div([
+                dcc.Graph(id='wind_rose-graph')
+            ], style={'width': '100%'})
+        ]),
+        # Verlauf des gewählten Orts, serverseitig auf eine feste Punktzahl reduziert
+        html.Div(id='history-section', style={'display': 'none', 'padding': '20px'}, children=[
+            html.Div([
+                html.Label('Zeitraum', style={'fontSize': '12px', 'marginBottom': '2px', 'display': 'block'}),
+                dcc.Dropdown(
+                    id='history-range',
+                    options=[{'label': label, 'value': key} for key, (label, _) in HISTORY_RANGES.items()],
+                    value=DEFAULT_RANGE,
+                    clearable=False,
+                    style={'color': 'black', 'fontSize': '13px'}
+                )
+            ], style={'width': '200px', 'marginBottom': '5px'}),
+            dcc.Graph(id='history-graph', config={'displayModeBar': False})
+        ]),
+    ])
+
+# Karte aller Orte; Marker werden je Ausschnitt und Zoom serverseitig geladen
+def map_view():
+    return html.Div([
+        dcc.RadioItems(
+            id='map-color',
+            options=[{'label': label, 'value': key} for key, (label, _, _) in COLOR_MODES.items()],
+            value='temperature',
+            inline=True,
+            style={'fontSize': '13px', 'padding': '5px'}
+        ),
+        dcc.Graph(id='map-graph', config={'scrollZoom': True}),
+        # Zeitschieber über die Messläufe des letzten Tages; ganz rechts = aktuell
+        html.Div(id='time-label', style={'fontSize': '13px', 'padding': '5px'}),
+        dcc.Slider(id='time-slider', min=0, max=0, step=1, value=0, marks={}, updatemode='drag'),
+        dcc.Store(id='timeline-times'),
+        # Zuletzt geladener Kartenausschnitt
+        dcc.Store(id='map-view'),
+    ], style={'padding': '10px'})
+
+TAB_STYLE = {'backgroundColor': '#222222', 'color': '#7FDBFF', 'padding': '6px'}
+TAB_SELECTED_STYLE = {'backgroundColor': '#111111', 'color': '#FFFFFF', 'padding': '6px'}
+
+# App-Layout; als Funktion, damit jeder Seitenaufruf die aktuelle Orte-Zuordnung mitbekommt
+def serve_layout():
+    return html.Div(style={'backgroundColor': '#111111', 'color': '#7FDBFF', 'font-family': 'sans-serif'}, children=[
+        html.H1(
+            children='Wetter-Dashboard Österreich',
+            style={'textAlign': 'center', 'padding': '10px', 'marginBottom': '5px', 'fontSize': '24px'}
+        ),
 
-    # Container für die Visualisierungen
-    html.Div(id='weather-output', style={'padding': '20px'}),
-])
+        dcc.Tabs(id='view-tabs', value='town', children=[
+            dcc.Tab(label='Ort', value='town', children=town_view(),
+                    style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
+            dcc.Tab(label='Karte', value='map', children=map_view(),
+                    style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE),
+        ]),
 
-# Callback zur Initialisierung des Bundesland-Dropdowns
+        # Ort und Beobachtungszeit der Figuren, die der Browser bereits hat
+        dcc.Store(id='rendered-town'),
+
+        # Bundesland -> Orte, wird im Browser für die Dropdowns verwendet
+        dcc.Store(id='town-index', data=town_index_data(snapshot_store.get())),
+        dcc.Interval(id='town-index-interval', interval=REFRESH_TTL_SECONDS * 1000),
+    ])
+
+app.layout = serve_layout
+
+# Aktualisiert die Orte-Zuordnung nur, wenn sich der Snapshot geändert hat
 @app.callback(
+    Output('town-index', 'data'),
+    Input('town-index-interval', 'n_intervals'),
+    State('town-index', 'data'),
+    prevent_initial_call=True
+)
+@instrument
+def refresh_town_index(_, current):
+    snapshot = snapshot_store.get()
+    if current and current.get('version') == snapshot.version:
+        return dash.no_update
+    return town_index_data(snapshot)
+
+# Bundesland-Dropdown aus der Orte-Zuordnung, im Browser ohne Server-Aufruf
+app.clientside_callback(
+    """
+    function(index, current) {
+        const states = (index && index.states || []).map(entry => entry[0]);
+        const options = states.map(s => ({label: s, value: s}));
+        const value = states.includes(current) ? current : (states.length ? states[0] : null);
+        return [options, value];
+    }
+    """,
     Output('state-dropdown', 'options'),
     Output('state-dropdown', 'value'),
-    Input('state-dropdown', 'id'),
-    prevent_initial_call=False
+    Input('town-index', 'data'),
+    State('state-dropdown', 'value')
 )
-def initialize_state_dropdown(_):
-    options = [{'label': b, 'value': b} for b in bundeslaender]
-    initial_value = bundeslaender[0] if len(bundeslaender) > 0 else None
-    return options, initial_value
 
-# Callback zur Aktualisierung des Städte-Dropdowns basierend auf dem Bundesland
-@app.callback(
+# Städte-Dropdown basierend auf dem Bundesland, ebenfalls im Browser
+app.clientside_callback(
+    """
+    function(selectedState, index) {
+        const entry = (index && index.states || []).find(e => e[0] === selectedState);
+        return entry ? entry[1].map(c => ({label: c, value: c})) : [];
+    }
+    """,
     Output('city-dropdown', 'options'),
-    Input('state-dropdown', 'value')
+    Input('state-dropdown', 'value'),
+    Input('town-index', 'data')
+)
+
+GRAPHS_VISIBLE = {'display': 'block', 'padding': '20px'}
+GRAPHS_HIDDEN = {'display': 'none', 'padding': '20px'}
+
+def message(text):
+    return html.Div(text, style={'textAlign': 'center', 'padding': '50px'})
+
+def full_figures(city_data):
+    """Komplette Figuren (aus dem LRU-Cache) für den ersten Aufbau der Graphen."""
+    # Fertig serialisierte Figuren je (Ort, Beobachtungszeit, Theme)
+    cache_key = (city_data['town'], city_data['recorded_at'], DEFAULT_THEME)
+    with stage('build'):
+        serialized = figure_cache.get_or_build(cache_key, lambda: town_figures_json(city_data, DEFAULT_THEME))
+    with stage('decode'):
+        figures = json.loads(serialized)
+    return [figures[name] for name in FIGURE_NAMES]
+
+def weather_update(selected_city, rendered, df):
+    """Berechnet die Ausgaben von update_weather_dashboard; ohne Dash-Kontext, damit sie messbar ist."""
+    no_figures = [dash.no_update] * len(FIGURE_NAMES)
+    if selected_city is None:
+        return no_figures + [message("Bitte wählen Sie einen Ort aus."), GRAPHS_HIDDEN, dash.no_update]
+
+    with stage('filter'):
+        city_rows = df[df['town'] == selected_city]
+    if city_rows.empty:
+        return no_figures + [message("Keine Daten für diesen Ort."), GRAPHS_HIDDEN, dash.no_update]
+    city_data = city_rows.iloc[0]
+
+    shown = {'town': selected_city, 'recorded_at': str(city_data['recorded_at'])}
+    if rendered == shown:
+        return no_figures + [None, GRAPHS_VISIBLE, dash.no_update]
+
+    if rendered is None:
+        # Der Browser hat noch keine Figuren: einmal komplett senden
+        figures = full_figures(city_data)
+    else:
+        # Layout, Achsen und Farbstufen sind bereits im Browser; nur die Messwerte ändern sich
+        with stage('patch'):
+            patches = town_figure_patches(city_data)
+        figures = [patches[name] for name in FIGURE_NAMES]
+    return figures + [None, GRAPHS_VISIBLE, shown]
+
+# Aktualisiert die Wettervisualisierungen bei Ortswechsel und wenn neue Daten für den Ort vorliegen
+@app.callback(
+    [Output(f'{name}-graph', 'figure') for name in FIGURE_NAMES]
+    + [Output('weather-message', 'children'),
+       Output('weather-graphs', 'style'),
+       Output('rendered-town', 'data')],
+    Input('city-dropdown', 'value'),
+    Input('town-index', 'data'),
+    State('rendered-town', 'data')
 )
-def set_cities_options(selected_state):
-    if selected_state is None:
-        return []
-    filtered_df = df[df['federal_state'] == selected_state]
-    cities = sorted(filtered_df['town'].unique())
-    return [{'label': c, 'value': c} for c in cities]
-
-# Callback zur Aktualisierung der Wettervisualisierungen basierend auf der Stadtauswahl
+@instrument
+def update_weather_dashboard(selected_city, _, rendered):
+    return weather_update(selected_city, rendered, snapshot_store.get().df)
+
+HISTORY_VISIBLE = {'display': 'block', 'padding': '20px'}
+HISTORY_HIDDEN = {'display': 'none', 'padding': '20px'}
+
+# Verlaufsdiagramm für Ort und Zeitraum; neu berechnet, sobald neue Messungen im Snapshot sind
 @app.callback(
-    Output('weather-output', 'children'),
-    Input('city-dropdown', 'value')
+    Output('history-graph', 'figure'),
+    Output('history-section', 'style'),
+    Input('city-dropdown', 'value'),
+    Input('history-range', 'value'),
+    Input('town-index', 'data')
 )
-def update_weather_dashboard(selected_city):
-    if selected_city is None:
-        return html.Div("Bitte wählen Sie einen Ort aus.", style={'textAlign': 'center', 'padding': '50px'})
-
-    city_data = df[df['town'] == selected_city].iloc[0]
-
-    # --- Gauges ---
-    def create_gauge(value, title, unit, value_range, colors, bar_color):
-        min_val, max_val = value_range
-
-        fig = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=value,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={
-                'text': title,
-                'font': {'size': 16, 'color': '#FFFFFF', 'family': 'Arial Black'}
-            },
-            number={
-                'font': {'size': 44, 'color': '#FFFFFF', 'family': 'Arial Black'},
-                'suffix': f" {unit}",
-                'valueformat': '.1f'
-            },
-            gauge={
-                'axis': {
-                    'range': [min_val, max_val],
-                    'tickwidth': 3,
-                    'tickcolor': '#FFFFFF',
-                    'ticklen': 12,
-                    'tickfont': {'size': 11, 'color': '#FFFFFF', 'family': 'Arial'}
-                },
-                'bar': {
-                    'color': '#FFD700',
-                    'thickness': 1.0,
-                    'line': {'color': '#FFFFFF', 'width': 3}
-                },
-                'bgcolor': 'rgba(50,50,80,0.4)',
-                'borderwidth': 6,
-                'bordercolor': '#00D9FF',
-                'steps': colors,
-                'threshold': {
-                    'line': {'color': '#FFFFFF', 'width': 4},
-                    'thickness': 1.0,
-                    'value': value
-                }
-            }
-        ))
-
-        fig.update_layout(
-            height=320,
-            margin=dict(l=20, r=20, t=70, b=20),
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(25,25,50,0.5)',
-            font={'color': 'white', 'family': 'Arial, sans-serif'}
-        )
-
-        return fig
-
-    # Definieren der Gauges
-    temp_gauge = create_gauge(
-        city_data['temperature_2m'], "Temperatur", "°C", [-20, 40],
-        [{'range': [-20, 0], 'color': "#1E90FF"}, {'range': [0, 15], 'color': "#00CED1"}, {'range': [15, 25], 'color': "#FFD700"}, {'range': [25, 40], 'color': "#FF4500"}],
-        "#FF6B6B"
-    )
-    humidity_gauge = create_gauge(
-        city_data['relative_humidity_2m'], "Luftfeuchtigkeit", "%", [0, 100],
-        [{'range': [0, 30], 'color': "#FFD700"}, {'range': [30, 60], 'color': "#90EE90"}, {'range': [60, 100], 'color': "#00BFFF"}],
-        "#00CED1"
-    )
-    pressure_gauge = create_gauge(
-        city_data['pressure_msl'], "Luftdruck", "hPa", [990, 1040],
-        [{'range': [990, 1010], 'color': "#FF6347"}, {'range': [1010, 1025], 'color': "#FFD700"}, {'range': [1025, 1040], 'color': "#90EE90"}],
-        "#FFB6C1"
-    )
-    cloud_cover_gauge = create_gauge(
-        city_data['cloud_cover'], "Bewölkung", "%", [0, 100],
-        [{'range': [0, 33], 'color': "#87CEEB"}, {'range': [33, 66], 'color': "#B0C4DE"}, {'range': [66, 100], 'color': "#808080"}],
-        "#4169E1"
-    )
-
-
-    # --- Windrose ---
-    wind_direction = city_data['wind_direction_10m']
-    wind_speed = city_data['wind_speed_10m']
-    wind_gusts = city_data['wind_gusts_10m']
-
-    wind_rose_fig = go.Figure()
-
-    # Add wind speed bar
-    wind_rose_fig.add_trace(go.Barpolar(
-        r=[wind_speed],
-        theta=[wind_direction],
-        width=[12],
-        name='Wind Speed',
-        marker_color=["#2E91E5"],
-        marker_line_color="white",
-        marker_line_width=1,
-        opacity=0.8
-    ))
-
-    # Add wind gusts bar
-    wind_rose_fig.add_trace(go.Barpolar(
-        r=[wind_gusts],
-        theta=[wind_direction],
-        width=[12],
-        name='Wind Gusts',
-        marker_color=["#FF6B6B"],
-        marker_line_color="white",
-        marker_line_width=1,
-        opacity=0.6
-    ))
-
-    wind_rose_fig.update_layout(
-        title={'text': f"Wind: {wind_speed:.1f} km/h | Gusts: {wind_gusts:.1f} km/h", 'x': 0.5, 'font': {'color': 'white'}},
-        paper_bgcolor='rgba(0,0,0,0)',
-        font_color='white',
-        polar=dict(
-            bgcolor='rgba(0,0,0,0)',
-            angularaxis=dict(
-                tickfont_size=12,
-                rotation=90,  # 0 Grad nach oben (Norden)
-                direction="clockwise",
-                showline=True,
-                showticklabels=True,
-                ticks='outside',
-                tickvals=[0, 45, 90, 135, 180, 225, 270, 315],
-                ticktext=['N', 'NO', 'O', 'SO', 'S', 'SW', 'W', 'NW']
-            ),
-            radialaxis=dict(
-                visible=True,
-                range=[0, 20]  # Fixed maximum at 20 km/h
-            )
-        )
-    )
-
-    # Zusammenstellen des Outputs
-    return html.Div([
-        html.Div([
-            html.Div([
-                dcc.Graph(figure=temp_gauge, config={'displayModeBar': False})
-            ], style={'width': '23%', 'display': 'inline-block', 'marginRight': '2%'}),
-            html.Div([
-                dcc.Graph(figure=humidity_gauge, config={'displayModeBar': False})
-            ], style={'width': '23%', 'display': 'inline-block', 'marginRight': '2%'}),
-            html.Div([
-                dcc.Graph(figure=pressure_gauge, config={'displayModeBar': False})
-            ], style={'width': '23%', 'display': 'inline-block', 'marginRight': '2%'}),
-            html.Div([
-                dcc.Graph(figure=cloud_cover_gauge, config={'displayModeBar': False})
-            ], style={'width': '23%', 'display': 'inline-block'}),
-        ], style={'width': '100%', 'marginBottom': '20px'}),
-        html.Div([
-            dcc.Graph(figure=wind_rose_fig)
-        ], style={'width': '100%'})
-    ])
+@instrument
+def update_history(selected_city, range_key, _):
+    if selected_city is None or range_key not in HISTORY_RANGES:
+        return dash.no_update, HISTORY_HIDDEN
+
+    def build():
+        rows, series = town_history(engine, selected_city, range_key)
+        return history_figure_json(series, selected_city, rows, DEFAULT_THEME)
+
+    cache_key = ('history', selected_city, range_key, snapshot_store.get().watermark, DEFAULT_THEME)
+    try:
+        with stage('build'):
+            serialized = figure_cache.get_or_build(cache_key, build)
+        with stage('decode'):
+            figure = json.loads(serialized)
+    except Exception as e:
+        print(f"✗ Verlauf für {selected_city} konnte nicht geladen werden: {e}")
+        return dash.no_update, HISTORY_HIDDEN
+    return figure, HISTORY_VISIBLE
+
+# Messläufe des Zeitschiebers; bleibt am rechten Ende, solange der Benutzer die aktuelle Ansicht hat
+@app.callback(
+    Output('timeline-times', 'data'),
+    Output('time-slider', 'max'),
+    Output('time-slider', 'marks'),
+    Output('time-slider', 'value'),
+    Input('town-index', 'data'),
+    State('time-slider', 'value'),
+    State('timeline-times', 'data')
+)
+@instrument
+def refresh_timeline(_, value, previous_times):
+    try:
+        times = timeline.ingest_times()
+    except Exception as e:
+        print(f"✗ Messläufe konnten nicht geladen werden: {e}")
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    if not times:
+        return [], 0, {}, 0
+    step = max(1, len(times) // 8)
+    marks = {i: times[i][11:16] for i in range(0, len(times), step)}
+    if previous_times and value is not None and value < len(previous_times) - 1 \
+            and previous_times[value] in times:
+        value = times.index(previous_times[value])
+    else:
+        value = len(times) - 1
+    return times, len(times) - 1, marks, value
+
+# Beschriftung des Zeitschiebers im Browser
+app.clientside_callback(
+    """
+    function(value, times) {
+        if (!times || !times.length) { return ''; }
+        const live = value >= times.length - 1;
+        return 'Messlauf: ' + times[value].replace('T', ' ').slice(0, 16) + (live ? ' (aktuell)' : '');
+    }
+    """,
+    Output('time-label', 'children'),
+    Input('time-slider', 'value'),
+    Input('timeline-times', 'data')
+)
+
+def map_snapshot(slider_value, times):
+    """Aktueller Snapshot am rechten Ende des Zeitschiebers, sonst der gewählte Messlauf."""
+    if not times or slider_value is None or slider_value >= len(times) - 1:
+        return snapshot_store.get()
+    snapshot = timeline.snapshot_at(times[slider_value])
+    # Nachbarn vorladen, damit weiteres Schieben ohne Datenbankabfrage auskommt
+    timeline.prefetch_around(times, slider_value)
+    return snapshot
+
+# Karte: bei Pan/Zoom und Zeitschieber nur die Marker ersetzen (Patch), sonst komplett aufbauen
+@app.callback(
+    Output('map-graph', 'figure'),
+    Output('map-view', 'data'),
+    Input('map-color', 'value'),
+    Input('map-graph', 'relayoutData'),
+    Input('time-slider', 'value'),
+    Input('town-index', 'data'),
+    State('timeline-times', 'data'),
+    State('map-view', 'data')
+)
+@instrument
+def update_map(color_mode, relayout_data, slider_value, _, times, view):
+    triggered = dash.ctx.triggered_id
+    new_view = viewport_from_relayout(relayout_data, view) or viewport_for(DEFAULT_VIEW['center'], DEFAULT_VIEW['zoom'])
+    if triggered == 'map-graph' and new_view == view:
+        return dash.no_update, dash.no_update
+
+    label, column, _ = COLOR_MODES[color_mode]
+    try:
+        snapshot = map_snapshot(slider_value, times)
+        clustered, markers = town_layer.visible(snapshot, new_view, color_mode)
+    except Exception as e:
+        print(f"✗ Orte für die Karte konnten nicht geladen werden: {e}")
+        return dash.no_update, dash.no_update
+    with stage('build'):
+        traces = create_town_map_traces(clustered, markers, color_mode, label, column)
+
+    if view is not None and triggered in ('map-graph', 'time-slider'):
+        patch = dash.Patch()
+        patch['data'] = [trace.to_plotly_json() for trace in traces]
+        return patch, new_view
+    return create_town_map_figure(traces, new_view, DEFAULT_THEME), new_view
 
 if __name__ == '__main__':
     # Prüft, ob Daten geladen wurden
+    df = snapshot_store.get().df
     if df.empty:
         print("Konnte keine Daten aus der Datenbank laden. Stellen Sie sicher, dass die MySQL-Datenbank 'OpenMeteo' existiert und die View 'verbose_weather_records' Daten enthält.")
     else:
         print("Starte Dash-Server...")
-        print(f"Daten für {len(df)} Orte geladen.")
+        print(f"Daten für {len(df)} Orte geladen (Aktualisierung alle {REFRESH_TTL_SECONDS} s).")
         print("Öffnen Sie http://127.0.0.1:8050 in Ihrem Browser.")
+        print("Entwicklungsserver; für den Betrieb mit mehreren Workern: python serve_dashboard.py")
         app.run(debug=True)
\ No newline at end of file
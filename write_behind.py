@@ -0,0 +1,233 @@
+"""Write-behind queue: fetch cycles hand their frames to a writer thread instead of waiting for the sinks.
+
+put() enqueues a frame and returns at once; it only blocks while `max_frames`
+frames are waiting (backpressure, so a stuck database can't grow memory
+without bound). The writer thread takes everything queued, up to `max_batch`
+frames, concatenates it and hands the batch to all sinks in parallel. A
+failing sink is retried with backoff; the other sinks are not held up by it.
+close() writes whatever is still queued and stops the thread.
+
+A batch that still fails after the retries is not dropped: it is spilled to
+`spill_dir` as an Arrow file (kept in memory without a spill_dir) and written
+again, oldest first, before that sink's next batch, also after a restart.
+
+Queue depth, blocked puts, write lag (enqueue to completed write) and spilled
+batches are kept in metrics() and, with a metrics_path, written to a JSON
+file after each batch.
+"""
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from file_utils import atomic_write_text
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Batches frames from put() into writes to `sinks` ({name: callable(frame)}) on a background thread."""
+
+    def __init__(self, sinks, max_frames=8, max_batch=8, retries=3, retry_delay=2.0, metrics_path=None,
+                 spill_dir=None):
+        self.sinks = dict(sinks)
+        self.max_batch = max_batch
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.metrics_path = metrics_path
+        self.spill_dir = spill_dir
+        self._queue = queue.Queue(maxsize=max_frames)
+        self._executor = ThreadPoolExecutor(max_workers=len(self.sinks), thread_name_prefix="write-behind-sink")
+        self._lock = threading.Lock()
+        self._thread = None
+        # Failed batches per sink when there is no spill_dir
+        self._held = {name: [] for name in self.sinks}
+        self._metrics = {
+            'max_frames': max_frames,
+            'max_depth': 0,
+            'frames_enqueued': 0,
+            'frames_written': 0,
+            'batches': 0,
+            'rows_written': 0,
+            'blocked_puts': 0,
+            'blocked_seconds': 0.0,
+            'last_lag': None,
+            'max_lag': 0.0,
+            'last_batch_at': None,
+            'errors': 0,
+            'last_error': None,
+            'sinks': {name: {'writes': 0, 'failures': 0, 'retries': 0, 'spilled': 0, 'replayed': 0,
+                             'last_duration': None, 'last_error': None}
+                      for name in self.sinks},
+        }
+
+    def start(self):
+        """Starts the writer thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+        return self
+
+    def _enqueue(self, item):
+        """Blocks while the queue is full, but never on a writer thread that is gone."""
+        while True:
+            if self._thread is None or not self._thread.is_alive():
+                raise RuntimeError("write-behind writer thread is not running")
+            try:
+                self._queue.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                continue
+
+    def put(self, frame):
+        """Queues a frame for writing; blocks while the queue is full."""
+        item = (time.time(), frame)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            start = time.perf_counter()
+            self._enqueue(item)
+            with self._lock:
+                self._metrics['blocked_puts'] += 1
+                self._metrics['blocked_seconds'] += time.perf_counter() - start
+        with self._lock:
+            self._metrics['frames_enqueued'] += 1
+            self._metrics['max_depth'] = max(self._metrics['max_depth'], self._queue.qsize())
+
+    def close(self, timeout=None):
+        """Writes the queued frames and stops the writer thread; returns False if it didn't finish in time."""
+        if self._thread is None:
+            return True
+        if self._thread.is_alive():
+            try:
+                self._enqueue(_STOP)
+            except RuntimeError:
+                pass
+            self._thread.join(timeout)
+        finished = not self._thread.is_alive()
+        if finished:
+            self._executor.shutdown()
+        return finished
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def metrics(self):
+        with self._lock:
+            m = json.loads(json.dumps(self._metrics))
+        m['depth'] = self._queue.qsize()
+        return m
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            # Everything that piled up while the last batch was written goes into one write
+            while items[-1] is not _STOP and len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = items[-1] is _STOP
+            frames = [item for item in items if item is not _STOP]
+            if frames:
+                try:
+                    self._write(frames)
+                except Exception as e:
+                    # The thread must survive, or put() and close() would wait for it forever
+                    with self._lock:
+                        self._metrics['errors'] += 1
+                        self._metrics['last_error'] = str(e)
+                    print(f"✗ Write-behind: writing {len(frames)} frames failed: {e}")
+            if stop:
+                return
+
+    def _write(self, items):
+        batch = pd.concat([frame for _, frame in items], ignore_index=True)
+        futures = [self._executor.submit(self._write_sink, name, sink, batch) for name, sink in self.sinks.items()]
+        wait(futures)
+        for future in futures:
+            future.result()
+        lag = time.time() - items[0][0]
+        with self._lock:
+            m = self._metrics
+            m['batches'] += 1
+            m['frames_written'] += len(items)
+            m['rows_written'] += len(batch)
+            m['last_lag'] = round(lag, 3)
+            m['max_lag'] = round(max(m['max_lag'], lag), 3)
+            m['last_batch_at'] = time.time()
+        if self.metrics_path:
+            atomic_write_text(self.metrics_path, json.dumps(self.metrics(), indent=1))
+
+    def _write_sink(self, name, sink, batch):
+        """Writes the sink's spilled batches, oldest first, then `batch`; spills what can't be written."""
+        stats = self._metrics['sinks'][name]
+        for pending in self._spilled(name):
+            if not self._attempt(name, sink, self._load_spilled(pending)):
+                # Keep the order: nothing newer is written before the older batches went through
+                self._spill(name, batch)
+                return
+            self._discard_spilled(name, pending)
+            with self._lock:
+                stats['replayed'] += 1
+        if not self._attempt(name, sink, batch):
+            self._spill(name, batch)
+
+    def _attempt(self, name, sink, batch):
+        """Calls sink(batch) with retries and backoff; True on success."""
+        stats = self._metrics['sinks'][name]
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                sink(batch)
+            except Exception as e:
+                with self._lock:
+                    stats['last_error'] = str(e)
+                if attempt == self.retries:
+                    with self._lock:
+                        stats['failures'] += 1
+                    print(f"✗ {name}: writing {len(batch)} rows failed after {attempt + 1} attempts: {e}")
+                    return False
+                with self._lock:
+                    stats['retries'] += 1
+                time.sleep(self.retry_delay * 2 ** attempt)
+                continue
+            with self._lock:
+                stats['writes'] += 1
+                stats['last_duration'] = round(time.perf_counter() - start, 3)
+                stats['last_error'] = None
+            return True
+
+    def _spilled(self, name):
+        """The sink's pending batches, oldest first: file paths with a spill_dir, else frames."""
+        if self.spill_dir:
+            return sorted(glob.glob(os.path.join(self.spill_dir, f"{name}-*.arrow")))
+        return list(self._held[name])
+
+    def _load_spilled(self, pending):
+        return pd.read_feather(pending) if isinstance(pending, str) else pending
+
+    def _discard_spilled(self, name, pending):
+        if isinstance(pending, str):
+            os.remove(pending)
+        else:
+            self._held[name].remove(pending)
+
+    def _spill(self, name, batch):
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            # Zero-padded nanoseconds, so the names sort in spill order
+            path = os.path.join(self.spill_dir, f"{name}-{time.time_ns():020d}.arrow")
+            tmp_path = os.path.join(self.spill_dir, f".tmp-{os.path.basename(path)}")
+            batch.reset_index(drop=True).to_feather(tmp_path)
+            os.replace(tmp_path, path)
+            print(f"✗ {name}: {len(batch)} rows spilled to {path}; written again before the next batch")
+        else:
+            self._held[name].append(batch)
+        with self._lock:
+            self._metrics['sinks'][name]['spilled'] += 1